@@ -0,0 +1,86 @@
+"""
+This module is used to benchmark the request formats of the predict endpoint:
+JSON vs Arrow IPC stream vs Parquet. The requests are sent in-process with the
+FastAPI TestClient. It requires a trained model.
+
+Usage:
+    python -m benchmarks.bench_api_formats --sizes 1000 100000
+
+author: Chinedu Ezeofor
+"""
+import io
+import json
+import functools
+import typing as tp
+from argparse import ArgumentParser
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from fastapi.testclient import TestClient
+
+# Custom Imports
+from src.api import app
+from src.api.codecs import PARQUET_MEDIA_TYPE, ARROW_STREAM_MEDIA_TYPE
+from src.config.core import config
+from benchmarks.utilities import time_it, print_report, make_trip_data
+
+URL = "/api/v1/predict/"
+
+
+def encode_bodies(data: pd.DataFrame) -> tp.Dict[str, tp.Tuple[bytes, str]]:
+    """This returns the body and the Content-Type of each format."""
+    json_data = data.copy()
+    pickup_time = config.model_config.TEMPORAL_VAR
+    json_data[pickup_time] = json_data[pickup_time].astype(str)
+    json_body = json.dumps({"inputs": json_data.replace({np.nan: None}).to_dict(orient="records")})
+
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    parquet_file = io.BytesIO()
+    data.to_parquet(parquet_file, index=False)
+    return {
+        "json": (json_body.encode(), "application/json"),
+        "arrow": (sink.getvalue().to_pybytes(), ARROW_STREAM_MEDIA_TYPE),
+        "parquet": (parquet_file.getvalue(), PARQUET_MEDIA_TYPE),
+    }
+
+
+def send_request(client: TestClient, *, body: bytes, headers: tp.Dict[str, str]) -> None:
+    """This sends a prediction request and checks that it succeeded."""
+    response = client.post(URL, content=body, headers=headers)
+    assert response.status_code == 200  # nosec
+
+
+def run_benchmark(*, sizes: tp.List[int], repeat: int) -> tp.List[tp.Dict]:
+    """This returns the request time of each format for each size."""
+    rows = []
+    with TestClient(app) as client:
+        for n_rows in sizes:
+            data = make_trip_data(n_rows=n_rows)[config.model_config.INPUT_FEATURES]
+            row: tp.Dict[str, tp.Any] = {"n_rows": n_rows}
+            for name, (body, content_type) in encode_bodies(data).items():
+                headers = {"Content-Type": content_type, "Accept": content_type}
+                send = functools.partial(send_request, client, body=body, headers=headers)
+                row[f"{name} (MB)"] = round(len(body) / 1024**2, 2)
+                row[f"{name} (s)"] = round(time_it(send, repeat=repeat), 4)
+            rows.append(row)
+    return rows
+
+
+def main() -> None:
+    """This is the main function"""
+    parser = ArgumentParser(description="Benchmark the request formats of the predict endpoint.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = run_benchmark(sizes=args.sizes, repeat=args.repeat)
+    print_report(title="Predict endpoint: JSON vs Arrow IPC stream vs Parquet", rows=rows)
+
+
+if __name__ == "__main__":
+    main()
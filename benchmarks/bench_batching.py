@@ -0,0 +1,109 @@
+"""
+This module is used to benchmark the micro-batching of the prediction requests.
+Concurrent clients send single-ride requests to `make_predictions` directly
+or through the MicroBatcher used by the API. It requires a trained model.
+
+Usage:
+    python -m benchmarks.bench_batching --clients 1 8 32 --requests 200
+
+author: Chinedu Ezeofor
+"""
+import time
+import typing as tp
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Custom Imports
+from src.predict import make_predictions
+from src.config.core import config
+from src.api.batching import MicroBatcher
+from benchmarks.utilities import print_report, make_trip_data
+
+
+def get_records(*, n_rows: int) -> tp.List[tp.Dict]:
+    """This returns the input rows as they're received by the API."""
+    data = make_trip_data(n_rows=n_rows)[config.model_config.INPUT_FEATURES]
+    data[config.model_config.TEMPORAL_VAR] = data[config.model_config.TEMPORAL_VAR].astype(str)
+    return data.replace({np.nan: None}).to_dict(orient="records")
+
+
+def run_clients(
+    *, predict: tp.Callable, records: tp.List[tp.Dict], n_clients: int
+) -> tp.Tuple[float, np.ndarray]:
+    """This returns the wall time and the latency of each request when
+    `n_clients` threads send the single-ride requests."""
+
+    def send(record: tp.Dict) -> float:
+        start = time.perf_counter()
+        predict([record])
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_clients) as executor:
+        latencies = np.array(list(executor.map(send, records)))
+    return time.perf_counter() - start, latencies
+
+
+def run_benchmark(
+    *, clients: tp.List[int], n_requests: int, max_batch_size: int, max_delay_ms: float
+) -> tp.List[tp.Dict]:
+    """This returns the throughput and the latencies with and without micro-batching."""
+    records = get_records(n_rows=n_requests)
+    make_predictions(data=pd.DataFrame(records[:1]))  # Load the model
+
+    rows = []
+    for n_clients in clients:
+        batcher = MicroBatcher(
+            predict_fn=make_predictions, max_batch_size=max_batch_size, max_delay_ms=max_delay_ms
+        )
+        direct_time, direct_latencies = run_clients(
+            predict=batcher.predict, records=records, n_clients=n_clients
+        )
+        batcher.start()
+        batched_time, batched_latencies = run_clients(
+            predict=batcher.predict, records=records, n_clients=n_clients
+        )
+        batcher.stop()
+        stats = batcher.stats.summary()
+
+        rows.append(
+            {
+                "clients": n_clients,
+                "direct (req/s)": int(n_requests / direct_time),
+                "batched (req/s)": int(n_requests / batched_time),
+                "direct p50/p99 (ms)": "/".join(
+                    f"{x:.1f}" for x in np.percentile(direct_latencies * 1_000, [50, 99])
+                ),
+                "batched p50/p99 (ms)": "/".join(
+                    f"{x:.1f}" for x in np.percentile(batched_latencies * 1_000, [50, 99])
+                ),
+                "mean batch size": stats["batch_size"]["mean"],
+                "mean queue delay (ms)": stats["queue_delay_ms"]["mean"],
+            }
+        )
+    return rows
+
+
+def main() -> None:
+    """This is the main function"""
+    parser = ArgumentParser(description="Benchmark the micro-batching of prediction requests.")
+    parser.add_argument("--clients", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-delay-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    rows = run_benchmark(
+        clients=args.clients,
+        n_requests=args.requests,
+        max_batch_size=args.max_batch_size,
+        max_delay_ms=args.max_delay_ms,
+    )
+    print_report(title="Single-ride requests: direct vs micro-batched", rows=rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+This module is used to compare the models of the training pipeline (`build_pipeline`):
+the Random Forest vs the histogram gradient boosting model (native categorical
+location IDs, early stopping). It reports the fit time, the size of the pickled
+pipeline, the prediction latency (1 row and a batch) and the RMSE on a validation split.
+
+The synthetic trip durations depend on the distance, the pickup zone and the hour
+(with noise) so the RMSE of the models can be compared.
+
+Usage:
+    python -m benchmarks.bench_estimators --n-rows 1000000
+    python -m benchmarks.bench_estimators --filename data/yellow_tripdata_2022-01.parquet
+
+author: Chinedu Ezeofor
+"""
+import time
+import pickle  # nosec
+import tempfile
+import typing as tp
+from pathlib import Path
+from argparse import ArgumentParser
+
+import numpy as np
+import pandas as pd
+
+# Custom Imports
+from src.config.core import config
+from src.pipeline import ESTIMATORS, build_pipeline
+from benchmarks.utilities import print_report, make_trip_data
+from src.utilities.parallel import limit_threads, get_model_n_jobs
+from src.processing.data_manager import LOAD_COLUMNS, load_data, split_train_data
+
+MB = 1024**2
+N_LATENCY_CALLS = 200
+BATCH_ROWS = 100_000
+
+
+def add_duration_signal(data: pd.DataFrame, *, random_state: int = 123) -> pd.DataFrame:
+    """This replaces the (random) synthetic trip durations with durations depending
+    on the trip distance, the average speed of the pickup zone and the hour."""
+    rng = np.random.default_rng(random_state)
+    zone_speed = rng.uniform(5, 30, 266)  # mph
+    hour = data["tpep_pickup_datetime"].dt.hour.to_numpy()
+    rush_hour = np.isin(hour, [7, 8, 9, 16, 17, 18])
+    speed = zone_speed[data["PULocationID"].to_numpy()] * np.where(rush_hour, 0.7, 1.0)
+    minutes = 60 * data["trip_distance"].to_numpy() / speed + rng.gamma(2.0, 1.5, len(data))
+    data["trip_duration"] = np.log1p(np.minimum(minutes, 60))
+    return data
+
+
+def load_trips(*, filename: tp.Optional[str], n_rows: int) -> pd.DataFrame:
+    """This returns the preprocessed trips of a file or of synthetic data."""
+    if filename is not None:
+        return load_data(filename=filename, uri=True, columns=LOAD_COLUMNS, use_cache=False)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = str(Path(tmp_dir, "yellow_tripdata.parquet"))
+        make_trip_data(n_rows=n_rows).to_parquet(filename, index=False)
+        data = load_data(filename=filename, uri=True, columns=None, use_cache=False)
+    data = add_duration_signal(data)
+    return data[[*config.model_config.INPUT_FEATURES, "trip_duration"]]
+
+
+def get_latency_ms(pipe: tp.Any, X: pd.DataFrame) -> float:
+    """This returns the median latency (ms) of predicting a single row."""
+    timings = []
+    for idx in range(N_LATENCY_CALLS):
+        row = X.iloc[[idx]]
+        start = time.perf_counter()
+        pipe.predict(row)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1_000
+
+
+def run_benchmark(*, data: pd.DataFrame, estimators: tp.List[str]) -> tp.List[tp.Dict]:
+    """This returns the fit time, the size, the latency and the RMSE of each model."""
+    X_train, X_validate, y_train, y_validate = split_train_data(
+        data=data,
+        target=config.model_config.TARGET,
+        test_size=config.model_config.TEST_SIZE,
+        random_state=config.model_config.RANDOM_STATE,
+    )
+    X_batch = X_validate.sample(n=BATCH_ROWS, replace=True, random_state=0)
+    rows = []
+    for estimator in estimators:
+        pipe = build_pipeline(estimator=estimator)
+        with limit_threads(n_jobs=get_model_n_jobs(pipe)):
+            start = time.perf_counter()
+            pipe.fit(X_train, y_train)
+            fit_time = time.perf_counter() - start
+
+            y_pred = pipe.predict(X_validate)
+            latency = get_latency_ms(pipe, X_validate)
+            start = time.perf_counter()
+            pipe.predict(X_batch)
+            batch_time = time.perf_counter() - start
+
+        rows.append(
+            {
+                "estimator": estimator,
+                "fit time (s)": round(fit_time, 2),
+                "iterations/trees": (
+                    getattr(pipe.steps[-1][1], "n_iter_", None)
+                    or len(pipe.steps[-1][1].estimators_)
+                ),
+                "model size (MB)": round(len(pickle.dumps(pipe)) / MB, 2),
+                "latency 1 row (ms)": round(latency, 2),
+                f"batch {BATCH_ROWS:,} rows (s)": round(batch_time, 3),
+                "RMSE (log)": round(float(np.sqrt(np.mean((y_pred - y_validate) ** 2))), 4),
+            }
+        )
+    return rows
+
+
+def main() -> None:
+    """This is the main function"""
+    parser = ArgumentParser(description="Compare the models of the training pipeline.")
+    parser.add_argument("--filename", type=str, default=None, help="A monthly Parquet file.")
+    parser.add_argument("--n-rows", type=int, default=1_000_000, help="Rows of synthetic data.")
+    parser.add_argument("--estimators", nargs="+", choices=ESTIMATORS, default=list(ESTIMATORS))
+    args = parser.parse_args()
+
+    data = load_trips(filename=args.filename, n_rows=args.n_rows)
+    rows = run_benchmark(data=data, estimators=args.estimators)
+    print_report(title=f"Models of the training pipeline ({len(data):,} trips)", rows=rows)
+
+
+if __name__ == "__main__":
+    main()
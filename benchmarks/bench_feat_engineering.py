@@ -0,0 +1,136 @@
+"""
+This module is used to benchmark the peak memory and the time of the
+feature engineering steps. It compares the previous steps (CalculateDayOfWeek
+and CalculateHourOfDay, copying the DF at every step) against the combined
+CalculateTemporalFeatures with `copy=False` used by `rf_pipe`.
+
+Usage:
+    python -m benchmarks.bench_feat_engineering --n-rows 3000000
+    python -m benchmarks.bench_feat_engineering --filename yellow_tripdata_2022-01.parquet
+
+author: Chinedu Ezeofor
+"""
+import functools
+import typing as tp
+import tracemalloc
+from argparse import ArgumentParser
+
+import pandas as pd
+from sklearn.base import clone
+from sklearn.pipeline import Pipeline
+
+# Custom Imports
+import src.processing.feat_engineering as fe
+from src.pipeline import rf_pipe
+from src.config.core import DATA_FILEPATH, config
+from benchmarks.utilities import time_it, print_report, make_trip_data
+
+MB = 1024**2
+
+
+def build_legacy_pipeline() -> Pipeline:
+    """This returns the preprocessing steps of `rf_pipe` as they were before
+    CalculateTemporalFeatures (every custom step copies the DF)."""
+    steps = []
+    for name, step in clone(rf_pipe).steps[:-1]:
+        if isinstance(step, fe.CalculateTemporalFeatures):
+            steps.extend(
+                [
+                    ("cal day_of_week", fe.CalculateDayOfWeek(feature=step.feature)),
+                    ("cal hour_of_day", fe.CalculateHourOfDay(feature=step.feature)),
+                ]
+            )
+        elif isinstance(step, fe.SelectFeatures):
+            steps.append((name, fe.SelectFeatures(features=step.features)))
+        else:
+            steps.append((name, step))
+    return Pipeline(steps=steps)
+
+
+def build_new_pipeline() -> Pipeline:
+    """This returns a copy of the preprocessing steps of `rf_pipe`."""
+    return clone(rf_pipe)[:-1]
+
+
+def get_peak_memory(func: tp.Callable) -> float:
+    """This returns the peak memory (in MB) allocated while calling `func`."""
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / MB
+
+
+def run_benchmark(*, data: pd.DataFrame, repeat: int) -> tp.List[tp.Dict]:
+    """This returns the peak memory and the time of both versions of the steps."""
+    temporal_var = config.model_config.TEMPORAL_VAR
+    input_features = config.model_config.INPUT_FEATURES
+    legacy_steps = Pipeline(
+        steps=[
+            ("input vars", fe.SelectFeatures(features=input_features)),
+            ("cal day_of_week", fe.CalculateDayOfWeek(feature=temporal_var)),
+            ("cal hour_of_day", fe.CalculateHourOfDay(feature=temporal_var)),
+        ]
+    )
+    new_steps = Pipeline(
+        steps=[
+            ("input vars", fe.SelectFeatures(features=input_features, copy=False)),
+            (
+                "cal temporal features",
+                fe.CalculateTemporalFeatures(feature=temporal_var, copy=False),
+            ),
+        ]
+    )
+    pd.testing.assert_frame_equal(legacy_steps.transform(data), new_steps.transform(data))
+
+    benchmarks = {
+        "temporal features": (legacy_steps.transform, new_steps.transform),
+        "rf_pipe[:-1].fit_transform": (
+            lambda X: build_legacy_pipeline().fit_transform(X),
+            lambda X: build_new_pipeline().fit_transform(X),
+        ),
+    }
+
+    rows = []
+    for name, (legacy_func, new_func) in benchmarks.items():
+        legacy_peak = get_peak_memory(functools.partial(legacy_func, data))
+        new_peak = get_peak_memory(functools.partial(new_func, data))
+        legacy_time = time_it(functools.partial(legacy_func, data), repeat=repeat)
+        new_time = time_it(functools.partial(new_func, data), repeat=repeat)
+        rows.append(
+            {
+                "steps": name,
+                "n_rows": len(data),
+                "legacy peak (MB)": round(legacy_peak, 1),
+                "new peak (MB)": round(new_peak, 1),
+                "legacy (s)": round(legacy_time, 3),
+                "new (s)": round(new_time, 3),
+                "speedup": round(legacy_time / new_time, 1),
+            }
+        )
+    return rows
+
+
+def main() -> None:
+    """This is the main function"""
+    parser = ArgumentParser(description="Benchmark the feature engineering steps.")
+    parser.add_argument(
+        "--filename", type=str, default=None, help="A month of trip data in `src/data`."
+    )
+    parser.add_argument("--n-rows", type=int, default=3_000_000, help="Used without --filename.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.filename is not None:
+        data = pd.read_parquet(DATA_FILEPATH / args.filename)
+    else:
+        data = make_trip_data(n_rows=args.n_rows)
+
+    rows = run_benchmark(data=data, repeat=args.repeat)
+    print_report(title="Feature engineering: peak memory and time", rows=rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+This module is used to benchmark the flat-array Random Forest engine
+against the `predict` method of the fitted RandomForestRegressor.
+
+Usage:
+    python -m benchmarks.bench_forest --batch-sizes 1 100 10000 1000000
+
+author: Chinedu Ezeofor
+"""
+import functools
+import typing as tp
+from argparse import ArgumentParser
+
+import numpy as np
+
+# Custom Imports
+from src.train import train_model
+from src.config.core import config
+from benchmarks.utilities import time_it, print_report, load_trip_data
+from src.processing.forest import export_forest
+from src.processing.data_manager import split_into_features_n_target
+
+
+def get_features(*, n_rows: int) -> tp.Tuple:
+    """This returns a trained pipeline and the transformed features of `n_rows` rows."""
+    train_data = load_trip_data(n_rows=200_000)
+    pipe, *_ = train_model(train_data=train_data)
+
+    X, _ = split_into_features_n_target(
+        data=train_data.sample(n=n_rows, replace=True, random_state=0),
+        target=config.model_config.TARGET,
+    )
+    return pipe, pipe[:-1].transform(X)
+
+
+def run_benchmark(*, batch_sizes: tp.List[int], repeat: int) -> tp.List[tp.Dict]:
+    """This returns the latency and throughput of both engines for each batch size."""
+    pipe, features = get_features(n_rows=max(batch_sizes))
+    model, forest = pipe[-1], export_forest(pipe)
+
+    rows = []
+    for batch_size in batch_sizes:
+        batch = features[:batch_size]
+        assert np.array_equal(model.predict(batch), forest.predict(batch))
+        sklearn_time = time_it(functools.partial(model.predict, batch), repeat=repeat)
+        flat_time = time_it(functools.partial(forest.predict, batch), repeat=repeat)
+        rows.append(
+            {
+                "batch_size": batch_size,
+                "sklearn (ms)": round(sklearn_time * 1_000, 3),
+                "flat (ms)": round(flat_time * 1_000, 3),
+                "sklearn (rows/s)": int(batch_size / sklearn_time),
+                "flat (rows/s)": int(batch_size / flat_time),
+                "speedup": round(sklearn_time / flat_time, 1),
+            }
+        )
+    return rows
+
+
+def main() -> None:
+    """This is the main function"""
+    parser = ArgumentParser(description="Benchmark the flat-array Random Forest engine.")
+    parser.add_argument(
+        "--batch-sizes",
+        nargs="+",
+        type=int,
+        default=[1, 10, 100, 1_000, 10_000, 100_000, 1_000_000],
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = run_benchmark(batch_sizes=args.batch_sizes, repeat=args.repeat)
+    print_report(title="RandomForestRegressor.predict vs FlatForest.predict", rows=rows)
+
+
+if __name__ == "__main__":
+    main()
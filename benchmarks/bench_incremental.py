@@ -0,0 +1,97 @@
+"""
+This module is used to compare the in-memory training (`load_data` + `train_model`)
+with the out-of-core training (`train_model_incremental`) on several synthetic
+monthly files: the wall time, the peak RSS (VmHWM) and the validation RMSE. Each
+mode runs in a new process. It requires Linux (/proc).
+
+Usage:
+    python -m benchmarks.bench_incremental --n-months 6 --n-rows 1000000
+
+author: Chinedu Ezeofor
+"""
+import sys
+import json
+import time
+import tempfile
+import typing as tp
+import subprocess  # nosec
+from pathlib import Path
+from argparse import SUPPRESS, ArgumentParser
+
+# Custom Imports
+from src.train import train_model, train_model_incremental
+from benchmarks.utilities import print_report, make_trip_data
+from benchmarks.bench_ingestion import TIMEOUT_S, get_memory_mb
+from src.utilities.experiment import eval_metrics
+from src.processing.data_manager import LOAD_COLUMNS, load_data
+
+MODES = ("in memory", "incremental")
+
+
+def run_mode(*, filenames: tp.List[str], mode: str) -> None:
+    """This trains a pipeline and prints its time, its peak RSS and its RMSE as JSON."""
+    baseline_mb = get_memory_mb("VmRSS")
+    start = time.perf_counter()
+    if mode == "in memory":
+        train_data = load_data(filename=filenames, uri=True, columns=LOAD_COLUMNS, use_cache=False)
+        _, y_validate, y_pred = train_model(train_data=train_data)
+    else:
+        _, y_validate, y_pred = train_model_incremental(filename=filenames, uri=True)
+    elapsed = time.perf_counter() - start
+    rmse, *_ = eval_metrics(actual=y_validate, pred=y_pred)
+    result = {
+        "time (s)": round(elapsed, 1),
+        "peak RSS (MB)": round(get_memory_mb("VmHWM") - baseline_mb, 1),
+        "RMSE (log)": round(float(rmse), 4),
+    }
+    print(json.dumps(result))
+
+
+def run_benchmark(*, n_months: int, n_rows: int, timeout: float) -> tp.List[tp.Dict]:
+    """This returns the results of each mode. A mode that fails (e.g killed when
+    it runs out of memory) or times out is reported with its status."""
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filenames = []
+        for month in range(1, n_months + 1):
+            filename = str(Path(tmp_dir, f"yellow_tripdata_2022-{month:02d}.parquet"))
+            make_trip_data(n_rows=n_rows, month=month).to_parquet(filename, index=False)
+            filenames.append(filename)
+
+        for mode in MODES:
+            row: tp.Dict[str, tp.Any] = {"mode": mode, "rows": n_months * n_rows}
+            command = [sys.executable, "-m", "benchmarks.bench_incremental", "--run", mode]
+            command += ["--filenames", *filenames]
+            try:
+                output = subprocess.run(  # nosec
+                    command, check=True, capture_output=True, text=True, timeout=timeout
+                ).stdout
+                row.update(status="ok", **json.loads(output.strip().splitlines()[-1]))
+            except subprocess.TimeoutExpired:
+                row["status"] = "timeout"
+            except subprocess.CalledProcessError as err:
+                row["status"] = f"failed (exit code {err.returncode})"
+            rows.append(row)
+    return rows
+
+
+def main() -> None:
+    """This is the main function"""
+    parser = ArgumentParser(description="Compare the in-memory and the out-of-core training.")
+    parser.add_argument("--n-months", type=int, default=6, help="Monthly files.")
+    parser.add_argument("--n-rows", type=int, default=1_000_000, help="Rows per month.")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT_S, help="Seconds per mode.")
+    parser.add_argument("--run", choices=MODES, help=SUPPRESS)
+    parser.add_argument("--filenames", nargs="+", help=SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_mode(filenames=args.filenames, mode=args.run)
+        return
+
+    rows = run_benchmark(n_months=args.n_months, n_rows=args.n_rows, timeout=args.timeout)
+    print_report(title="In-memory vs out-of-core training", rows=rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+This module is used to benchmark the ingestion stages of the training data on
+synthetic monthly files (same schema as the yellow taxi trip data) of several sizes:
+`load_data` (without the dataset cache, then with the cache cold and warm),
+`validate_training_input` and `split_train_data`. Each stage runs in a new process
+and reports its wall time and its peak RSS (VmHWM, above the memory used before the
+stage). It requires Linux (/proc).
+
+The results are saved as JSON (with the commit and the library versions) so the
+report of two commits can be compared.
+
+Usage:
+    python -m benchmarks.bench_ingestion --sizes 100000 1000000 10000000
+    python -m benchmarks.bench_ingestion --output new.json --compare old.json
+
+author: Chinedu Ezeofor
+"""
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import typing as tp
+import subprocess  # nosec
+from pathlib import Path
+from datetime import datetime, timezone
+from argparse import SUPPRESS, ArgumentParser
+
+import pandas as pd
+import pyarrow as pa
+
+# Custom Imports
+from benchmarks.utilities import print_report, make_trip_data
+from src.config.core import ROOT, config
+from src.processing import cache
+from src.processing.data_manager import (
+    LOAD_COLUMNS,
+    load_data,
+    split_train_data,
+    validate_training_input,
+)
+
+STAGES = (
+    "load_data (no cache)",
+    "load_data (cold cache)",
+    "load_data (warm cache)",
+    "validate_training_input",
+    "split_train_data",
+)
+DEFAULT_SIZES = [100_000, 1_000_000, 10_000_000]
+TIMEOUT_S = 3_600  # Time allowed for a stage (incl. its setup)
+REPORT_VERSION = 1
+
+
+def get_memory_mb(field: str) -> float:
+    """This returns a memory field (e.g VmHWM) of the current process in MB."""
+    with open("/proc/self/status", encoding="utf-8") as file:
+        for line in file:
+            if line.startswith(f"{field}:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError(f"{field} not found.")
+
+
+def reset_peak_memory() -> None:
+    """This resets the peak RSS (VmHWM) of the current process to its RSS
+    so the peak of a stage doesn't include the peak of its setup."""
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="utf-8") as file:
+            file.write("5")
+    except OSError:  # pragma: no cover
+        pass  # The peak then includes the setup (older kernels)
+
+
+def setup_stage(*, filename: str, stage: str) -> tp.Callable[[], tp.Any]:
+    """This returns the function running a stage (its inputs are loaded first)."""
+    if stage.startswith("load_data"):
+        use_cache = stage != "load_data (no cache)"
+        if stage == "load_data (warm cache)":
+            load_data(filename=filename, uri=True, columns=LOAD_COLUMNS, use_cache=True)
+        return lambda: load_data(
+            filename=filename, uri=True, columns=LOAD_COLUMNS, use_cache=use_cache
+        )
+
+    if stage == "validate_training_input":
+        data = load_data(filename=filename, uri=True)
+        # The synthetic flag is missing where the RatecodeID is missing (not a str)
+        data["store_and_fwd_flag"] = data["store_and_fwd_flag"].fillna("N")
+        return lambda: validate_training_input(data=data)[0]
+
+    data = load_data(filename=filename, uri=True, columns=LOAD_COLUMNS)
+    return lambda: split_train_data(
+        data=data,
+        target=config.model_config.TARGET,
+        test_size=config.model_config.TEST_SIZE,
+        random_state=config.model_config.RANDOM_STATE,
+    )[0]
+
+
+def run_stage(*, filename: str, stage: str, cache_dir: str) -> None:
+    """This runs a stage and prints its time, its output rows and its peak RSS as JSON."""
+    cache.dataset_cache = cache.DatasetCache(cache_dir=cache_dir, max_bytes=2**40)
+    func = setup_stage(filename=filename, stage=stage)
+
+    reset_peak_memory()
+    baseline_mb = get_memory_mb("VmRSS")
+    start = time.perf_counter()
+    output = func()
+    elapsed = time.perf_counter() - start
+    result = {
+        "time (s)": round(elapsed, 3),
+        "output rows": None if output is None else len(output),
+        "peak RSS (MB)": round(get_memory_mb("VmHWM") - baseline_mb, 1),
+    }
+    print(json.dumps(result))
+
+
+def run_benchmark(*, sizes: tp.List[int], stages: tp.List[str], timeout: float) -> tp.List[tp.Dict]:
+    """This returns the results of each stage for each size. A stage that fails
+    (e.g killed when it runs out of memory) or times out is reported with its status."""
+    rows = []
+    for n_rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = str(Path(tmp_dir, "yellow_tripdata.parquet"))
+            make_trip_data(n_rows=n_rows).to_parquet(filename, index=False)
+            cache_dir = str(Path(tmp_dir, "cache"))
+            for stage in stages:
+                row: tp.Dict[str, tp.Any] = {"rows": n_rows, "stage": stage}
+                command = [sys.executable, "-m", "benchmarks.bench_ingestion", "--run", stage]
+                command += ["--filename", filename, "--cache-dir", cache_dir]
+                try:
+                    output = subprocess.run(  # nosec
+                        command, check=True, capture_output=True, text=True, timeout=timeout
+                    ).stdout
+                    row.update(status="ok", **json.loads(output.strip().splitlines()[-1]))
+                except subprocess.TimeoutExpired:
+                    row["status"] = "timeout"
+                except subprocess.CalledProcessError as err:
+                    row["status"] = f"failed (exit code {err.returncode})"
+                rows.append(row)
+    return rows
+
+
+def get_commit() -> tp.Optional[str]:
+    """This returns the current git commit (or None outside a git repository)."""
+    try:
+        return subprocess.run(  # nosec
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_report(rows: tp.List[tp.Dict]) -> tp.Dict:
+    """This returns the (JSON serializable) report of the results."""
+    return {
+        "benchmark": "ingestion",
+        "version": REPORT_VERSION,
+        "commit": get_commit(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "platform": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "pyarrow": pa.__version__,
+            "machine": platform.machine(),
+            "cpus": len(os.sched_getaffinity(0)),
+        },
+        "results": rows,
+    }
+
+
+def compare_reports(*, old: tp.Dict, new: tp.Dict) -> pd.DataFrame:
+    """This returns the time and peak RSS of each stage in both reports and their
+    ratios (new / old, i.e. above 1 is a regression)."""
+    keys = ["rows", "stage"]
+    columns = [*keys, "time (s)", "peak RSS (MB)"]
+    old_results = pd.DataFrame(old["results"]).reindex(columns=columns)
+    new_results = pd.DataFrame(new["results"]).reindex(columns=columns)
+    comparison = old_results.merge(new_results, on=keys, suffixes=(" old", " new"))
+    for metric in ["time (s)", "peak RSS (MB)"]:
+        comparison[f"{metric} ratio"] = (
+            comparison[f"{metric} new"] / comparison[f"{metric} old"]
+        ).round(2)
+    return comparison
+
+
+def main() -> None:
+    """This is the main function"""
+    parser = ArgumentParser(description="Benchmark the ingestion stages of the training data.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES, help="Rows.")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--timeout", type=float, default=TIMEOUT_S, help="Seconds per stage.")
+    parser.add_argument("--output", type=str, default=None, help="The JSON report filepath.")
+    parser.add_argument("--compare", type=str, default=None, help="A previous JSON report.")
+    parser.add_argument("--run", choices=STAGES, help=SUPPRESS)
+    parser.add_argument("--filename", help=SUPPRESS)
+    parser.add_argument("--cache-dir", help=SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_stage(filename=args.filename, stage=args.run, cache_dir=args.cache_dir)
+        return
+
+    rows = run_benchmark(sizes=args.sizes, stages=args.stages, timeout=args.timeout)
+    report = make_report(rows)
+    print_report(title="Ingestion stages: wall time and peak RSS", rows=rows)
+
+    output = args.output
+    if output is None:
+        commit = (report["commit"] or "local")[:7]
+        output = Path(ROOT, "benchmarks", "results", f"ingestion-{commit}.json")
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    Path(output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\nSaved the report to {output}")
+
+    if args.compare:
+        old = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        print(f"\n===== Compared with {old.get('commit')} (new / old) =====")
+        print(compare_reports(old=old, new=report).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+This module is used to benchmark `load_data` on a monthly trip data file: reading
+only the needed columns and pushing the row filters down into the Parquet reader
+vs reading the full file, the compact layout (`compact=True`), the dataset cache
+(cold and warm) and reading the file in batches with `iter_data`. Each variant runs in a new process so the peak memory
+(VmHWM, above the memory used after the imports) isn't shared. It requires Linux (/proc).
+
+Usage:
+    python -m benchmarks.bench_load_data --n-rows 3000000
+    python -m benchmarks.bench_load_data --filename data/yellow_tripdata_2022-01.parquet
+
+author: Chinedu Ezeofor
+"""
+import sys
+import json
+import time
+import tempfile
+import typing as tp
+import subprocess  # nosec
+from pathlib import Path
+from argparse import SUPPRESS, ArgumentParser
+
+# Custom Imports
+from benchmarks.utilities import print_report, make_trip_data
+from src.processing.memory import memory_report
+from src.processing import cache
+from src.processing.data_manager import LOAD_COLUMNS, iter_data, load_data
+
+VARIANTS = {
+    "pushdown (default)": ("load_data", {"columns": LOAD_COLUMNS, "use_cache": False}),
+    "pushdown, hash IDs": (
+        "load_data",
+        {"columns": LOAD_COLUMNS, "id_mode": "hash", "use_cache": False},
+    ),
+    "pushdown, compact layout": (
+        "load_data",
+        {"columns": LOAD_COLUMNS, "compact": True, "use_cache": False},
+    ),
+    "full read (no filters)": (
+        "load_data",
+        {"columns": None, "filters": None, "use_cache": False},
+    ),
+    # The first run saves the dataset in the (empty) cache, the second one reads it
+    "dataset cache (cold)": ("load_data", {"columns": LOAD_COLUMNS, "use_cache": True}),
+    "dataset cache (warm)": ("load_data", {"columns": LOAD_COLUMNS, "use_cache": True}),
+    "dataset cache, compact (cold)": (
+        "load_data",
+        {"columns": LOAD_COLUMNS, "compact": True, "use_cache": True},
+    ),
+    "dataset cache, compact (warm)": (
+        "load_data",
+        {"columns": LOAD_COLUMNS, "compact": True, "use_cache": True},
+    ),
+    "iter_data (100k rows)": ("iter_data", {"columns": LOAD_COLUMNS, "batch_rows": 100_000}),
+    "iter_data (10k rows)": ("iter_data", {"columns": LOAD_COLUMNS, "batch_rows": 10_000}),
+}
+
+
+def get_memory_mb(field: str) -> float:
+    """This returns a memory field (e.g VmHWM) of the current process in MB."""
+    with open("/proc/self/status", encoding="utf-8") as file:
+        for line in file:
+            if line.startswith(f"{field}:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError(f"{field} not found.")
+
+
+def run_variant(*, filename: str, variant: str, cache_dir: str) -> None:
+    """This loads the data with the arguments of a variant and prints the
+    time, the number of rows and the peak memory as JSON."""
+    cache.dataset_cache = cache.DatasetCache(cache_dir=cache_dir)
+    baseline_mb = get_memory_mb("VmRSS")
+    start = time.perf_counter()
+    function, kwargs = VARIANTS[variant]
+    if function == "iter_data":
+        n_rows = n_columns = 0
+        for data in iter_data(filename=filename, uri=True, **kwargs):  # type: ignore
+            n_rows, n_columns = n_rows + len(data), data.shape[1]
+    else:
+        data = load_data(filename=filename, uri=True, **kwargs)  # type: ignore
+        n_rows, n_columns = data.shape
+    elapsed = time.perf_counter() - start
+    result = {
+        "time (s)": round(elapsed, 2),
+        "rows": n_rows,
+        "columns": n_columns,
+        "peak memory (MB)": round(get_memory_mb("VmHWM") - baseline_mb, 1),
+        # The memory used by the (last) DF returned
+        "data memory (MB)": round(memory_report(data)["memory (MB)"].sum(), 1),
+    }
+    print(json.dumps(result))
+
+
+def run_benchmark(*, filename: str, variants: tp.List[str], cache_dir: str) -> tp.List[tp.Dict]:
+    """This returns the results of each variant (run in a new process)."""
+    rows = []
+    for variant in variants:
+        output = subprocess.run(  # nosec
+            [sys.executable, "-m", "benchmarks.bench_load_data", "--filename", filename]
+            + ["--cache-dir", cache_dir, "--run", variant],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        rows.append({"variant": variant, **json.loads(output.strip().splitlines()[-1])})
+    return rows
+
+
+def main() -> None:
+    """This is the main function"""
+    parser = ArgumentParser(description="Benchmark the column and filter pushdown of load_data.")
+    parser.add_argument("--filename", type=str, default=None, help="A monthly Parquet file.")
+    parser.add_argument("--n-rows", type=int, default=3_000_000, help="Rows of synthetic data.")
+    parser.add_argument("--variants", nargs="+", choices=list(VARIANTS), default=list(VARIANTS))
+    parser.add_argument("--run", choices=list(VARIANTS), help=SUPPRESS)
+    parser.add_argument("--cache-dir", help=SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_variant(filename=args.filename, variant=args.run, cache_dir=args.cache_dir)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = args.filename
+        if filename is None:
+            filename = str(Path(tmp_dir, "yellow_tripdata.parquet"))
+            make_trip_data(n_rows=args.n_rows).to_parquet(filename, index=False)
+        cache_dir = str(Path(tmp_dir, "cache"))
+        rows = run_benchmark(filename=filename, variants=args.variants, cache_dir=cache_dir)
+    print_report(title="load_data: column/filter pushdown vs full read", rows=rows)
+
+
+if __name__ == "__main__":
+    main()
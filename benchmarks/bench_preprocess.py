@@ -0,0 +1,125 @@
+"""
+This module is used to benchmark the ingestion preprocessing of a month of trip data:
+the previous stage (copying the DF to compute the trip_duration with `total_seconds`,
+then three chained `.loc` filters) vs the single-mask `_preprocess_trips` (int64
+nanosecond durations), and reading a CSV file with the pandas C parser (parsing the
+datetimes afterwards) vs the pyarrow reader with the explicit schema (`read_csv`).
+
+Usage:
+    python -m benchmarks.bench_preprocess --n-rows 3000000
+
+author: Chinedu Ezeofor
+"""
+import tempfile
+import typing as tp
+import tracemalloc
+from pathlib import Path
+from argparse import ArgumentParser
+
+import numpy as np
+import pandas as pd
+
+# Custom Imports
+from src.processing.ids import generate_ids
+from benchmarks.utilities import time_it, print_report, make_trip_data
+from src.processing.data_manager import (
+    MIN_THRESH,
+    LOAD_FILTERS,
+    TRIP_DUR_THRESH,
+    TOTAL_AMT_THRESH,
+    TRIP_DIST_THRESH,
+    read_csv,
+    _preprocess_trips,
+)
+
+MB = 1024**2
+DATETIME_COLUMNS = ["tpep_pickup_datetime", "tpep_dropoff_datetime"]
+
+
+def legacy_preprocess(data: pd.DataFrame) -> pd.DataFrame:
+    """This returns the trip data preprocessed like the previous `load_data`
+    (with the vectorized IDs)."""
+    trip_duration_data = data.copy()
+    trip_duration = (
+        trip_duration_data["tpep_dropoff_datetime"] - trip_duration_data["tpep_pickup_datetime"]
+    )
+    data["id"] = generate_ids(data)
+    data["trip_duration"] = round(trip_duration.dt.total_seconds() / 60, 2)
+    data = data.loc[
+        (data["trip_duration"] > MIN_THRESH) & (data["trip_duration"] <= TRIP_DUR_THRESH)
+    ]
+    data = data.loc[
+        (data["trip_distance"] > MIN_THRESH) & (data["trip_distance"] <= TRIP_DIST_THRESH)
+    ]
+    data = data.loc[
+        (data["total_amount"] > MIN_THRESH) & (data["total_amount"] <= TOTAL_AMT_THRESH)
+    ]
+    with pd.option_context("mode.chained_assignment", None):
+        data["trip_duration"] = np.log1p(data["trip_duration"])
+    return data
+
+
+def legacy_read_csv(filename: str) -> pd.DataFrame:
+    """This returns the data of a CSV file read by the pandas C parser."""
+    data = pd.read_csv(filename)
+    for col in DATETIME_COLUMNS:
+        data[col] = pd.to_datetime(data[col])
+    return data
+
+
+def get_peak_memory(func: tp.Callable) -> float:
+    """This returns the peak memory (in MB) allocated while calling `func`."""
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / MB
+
+
+def run_benchmark(*, data: pd.DataFrame, repeat: int) -> tp.List[tp.Dict]:
+    """This returns the time and the peak memory of both versions of the
+    preprocessing and of the CSV reader."""
+    expected_output = legacy_preprocess(data.copy()).drop(columns="id")
+    result = _preprocess_trips(data.copy(), id_mode="random", filters=LOAD_FILTERS)
+    pd.testing.assert_frame_equal(result.drop(columns="id"), expected_output)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = str(Path(tmp_dir, "yellow_tripdata.csv"))
+        data.to_csv(filename, index=False)
+        pd.testing.assert_frame_equal(read_csv(filename=filename), legacy_read_csv(filename))
+
+        variants = {
+            "preprocess: copy + 3 chained .loc": lambda: legacy_preprocess(data.copy()),
+            "preprocess: single mask (int64 ns)": lambda: _preprocess_trips(
+                data.copy(), id_mode="random", filters=LOAD_FILTERS
+            ),
+            "read CSV: pandas C parser": lambda: legacy_read_csv(filename),
+            "read CSV: pyarrow + schema": lambda: read_csv(filename=filename),
+        }
+        rows = [
+            {
+                "variant": variant,
+                "time (s)": round(time_it(func, repeat=repeat), 3),
+                "peak memory (MB)": round(get_peak_memory(func), 1),
+            }
+            for variant, func in variants.items()
+        ]
+    return rows
+
+
+def main() -> None:
+    """This is the main function"""
+    parser = ArgumentParser(description="Benchmark the ingestion preprocessing of the trip data.")
+    parser.add_argument("--n-rows", type=int, default=3_000_000, help="Rows of synthetic data.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data = make_trip_data(n_rows=args.n_rows)
+    rows = run_benchmark(data=data, repeat=args.repeat)
+    print_report(title="Ingestion preprocessing of a month of trip data", rows=rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+This module is used to benchmark the hyperparameter search (`run_search`) against
+the number of worker processes. The preprocessing is fitted once (its time is
+reported separately) and the speedup is relative to a single worker. It also
+reports the time of fitting every candidate on all the rows (a grid search
+without successive halving) with a single worker.
+
+Usage:
+    python -m benchmarks.bench_search --n-rows 1000000 --n-workers 1 2 4 8
+
+author: Chinedu Ezeofor
+"""
+import time
+import tempfile
+import typing as tp
+from argparse import ArgumentParser
+
+from sklearn.model_selection import ParameterGrid
+
+# Custom Imports
+from src.search import (
+    HalvingConfig,
+    run_search,
+    fit_candidate,
+    get_search_space,
+    fit_preprocessing,
+)
+from benchmarks.utilities import print_report, load_trip_data
+from src.utilities.parallel import get_n_cpus
+
+
+def run_benchmark(*, n_rows: int, n_workers: tp.List[int]) -> tp.List[tp.Dict]:
+    """This returns the search time for each number of workers."""
+    data = load_trip_data(n_rows=n_rows)
+    rows = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        start = time.perf_counter()
+        fit_preprocessing(train_data=data, data_dir=data_dir)
+        rows.append({"stage": "fit_preprocessing (once)", "time (s)": time.perf_counter() - start})
+
+        n_total = len(data)
+        start = time.perf_counter()
+        for params in ParameterGrid(get_search_space()):
+            fit_candidate(data_dir=data_dir, params=params, n_rows=n_total)
+        rows.append({"stage": "grid (all rows), 1 worker", "time (s)": time.perf_counter() - start})
+
+        for n_workers_ in n_workers:
+            start = time.perf_counter()
+            trials, _ = run_search(data_dir=data_dir, halving=HalvingConfig(n_workers=n_workers_))
+            rows.append(
+                {
+                    "stage": f"run_search, {n_workers_} workers",
+                    "time (s)": time.perf_counter() - start,
+                    "trials": len(trials),
+                }
+            )
+    for row in rows:
+        row["time (s)"] = round(row["time (s)"], 2)
+    search_rows = [row for row in rows if row["stage"].startswith("run_search")]
+    for row in search_rows:
+        row["speedup"] = round(search_rows[0]["time (s)"] / row["time (s)"], 2)
+    return rows
+
+
+def main() -> None:
+    """This is the main function"""
+    n_cpus = get_n_cpus()
+    parser = ArgumentParser(description="Benchmark the hyperparameter search against the workers.")
+    parser.add_argument("--n-rows", type=int, default=1_000_000, help="Rows of synthetic data.")
+    parser.add_argument(
+        "--n-workers",
+        nargs="+",
+        type=int,
+        default=sorted({1, *(2**idx for idx in range(n_cpus.bit_length())), n_cpus}),
+    )
+    args = parser.parse_args()
+
+    rows = run_benchmark(n_rows=args.n_rows, n_workers=args.n_workers)
+    print_report(title=f"Hyperparameter search against the workers ({n_cpus} CPUs)", rows=rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+This module is used to benchmark the memory used by worker processes reading the same
+dataset: each worker loading its own copy with `load_data` vs the workers reading the
+Arrow IPC file written once by `materialize_data` with `read_shared_data` (memory-mapped,
+zero-copy). The RSS counts the shared pages in every worker, the PSS (proportional set
+size) divides them between the workers that map them. It requires Linux (/proc).
+
+Usage:
+    python -m benchmarks.bench_shared_data --n-workers 1 4 8
+    python -m benchmarks.bench_shared_data --filename data/yellow_tripdata_2022-01.parquet
+
+author: Chinedu Ezeofor
+"""
+import time
+import tempfile
+import typing as tp
+import multiprocessing as mp
+from pathlib import Path
+from argparse import ArgumentParser
+
+import numpy as np
+import pandas as pd
+
+# Custom Imports
+from benchmarks.utilities import print_report, make_trip_data
+from src.processing import cache
+from src.processing.data_manager import (
+    LOAD_COLUMNS,
+    load_data,
+    materialize_data,
+    read_shared_data,
+)
+
+MODES = ("load_data (private)", "read_shared_data (shared)")
+MB = 1024**2
+TIMEOUT_S = 600  # Time to wait for the result of a worker
+
+
+def get_memory_mb() -> tp.Tuple[float, float]:
+    """This returns the RSS and the PSS of the current process in MB."""
+    memory = {}
+    with open("/proc/self/smaps_rollup", encoding="utf-8") as file:
+        for line in file:
+            field, *values = line.split()
+            if field in {"Rss:", "Pss:"}:
+                memory[field] = int(values[0]) * 1024 / MB
+    return memory["Rss:"], memory["Pss:"]
+
+
+def touch(data: pd.DataFrame) -> None:
+    """This reads all the values of the data (so the pages of a memory-mapped
+    file are loaded like a worker using the data would)."""
+    for col in data.columns:
+        values = data[col].array
+        if isinstance(values, pd.arrays.ArrowStringArray):
+            for chunk in values._data.chunks:  # pylint: disable=protected-access
+                for buffer in chunk.buffers():
+                    if buffer is not None:
+                        np.frombuffer(buffer, dtype=np.uint8).sum()
+        elif (array := np.asarray(values)).dtype == object:
+            sum(map(len, array))
+        else:
+            array.view(np.uint8).sum()
+
+
+def run_worker(
+    mode: str, filename: str, filepath: str, barrier: tp.Any, queue: tp.Any
+) -> None:  # pragma: no cover
+    """This loads and reads the data, then reports its memory once all the
+    workers have loaded the data (so the shared pages are mapped by all of them)."""
+    baseline_rss, baseline_pss = get_memory_mb()
+    start = time.perf_counter()
+    if mode == "load_data (private)":
+        data = load_data(filename=filename, uri=True, columns=LOAD_COLUMNS, use_cache=False)
+    else:
+        data = read_shared_data(filepath)
+    elapsed = time.perf_counter() - start
+    touch(data)
+
+    barrier.wait()
+    rss, pss = get_memory_mb()
+    queue.put((elapsed, rss - baseline_rss, pss - baseline_pss))
+    barrier.wait()  # The workers are kept alive until all of them are measured
+
+
+def run_workers(*, mode: str, filename: str, filepath: str, n_workers: int) -> np.ndarray:
+    """This returns the load time, the RSS and the PSS of each worker (one row per
+    worker) loading the data at the same time."""
+    context = mp.get_context("spawn")
+    barrier, queue = context.Barrier(n_workers), context.Queue()
+    workers = [
+        context.Process(target=run_worker, args=(mode, filename, filepath, barrier, queue))
+        for _ in range(n_workers)
+    ]
+    for worker in workers:
+        worker.start()
+    results = np.array([queue.get(timeout=TIMEOUT_S) for _ in workers])
+    for worker in workers:
+        worker.join()
+    return results
+
+
+def run_benchmark(
+    *, filename: str, filepath: str, n_workers: tp.List[int], modes: tp.List[str]
+) -> tp.List[tp.Dict]:
+    """This returns the load time and the memory per worker for each number
+    of workers and each mode."""
+    rows = []
+    for n_workers_ in n_workers:
+        for mode in modes:
+            results = run_workers(
+                mode=mode, filename=filename, filepath=filepath, n_workers=n_workers_
+            )
+            elapsed, rss, pss = results.mean(axis=0)
+            rows.append(
+                {
+                    "workers": n_workers_,
+                    "mode": mode,
+                    "load time (s)": round(elapsed, 2),
+                    "RSS per worker (MB)": round(rss, 1),
+                    "PSS per worker (MB)": round(pss, 1),
+                    "total PSS (MB)": round(results[:, 2].sum(), 1),
+                }
+            )
+    return rows
+
+
+def main() -> None:
+    """This is the main function"""
+    parser = ArgumentParser(description="Benchmark the memory of workers sharing a dataset.")
+    parser.add_argument("--filename", type=str, default=None, help="A monthly Parquet file.")
+    parser.add_argument("--n-rows", type=int, default=1_000_000, help="Rows of synthetic data.")
+    parser.add_argument("--n-workers", nargs="+", type=int, default=[1, 4, 8])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = args.filename
+        if filename is None:
+            filename = str(Path(tmp_dir, "yellow_tripdata.parquet"))
+            make_trip_data(n_rows=args.n_rows).to_parquet(filename, index=False)
+        cache.dataset_cache = cache.DatasetCache(cache_dir=Path(tmp_dir, "cache"))
+        filepath = str(materialize_data(filename=filename, uri=True, columns=LOAD_COLUMNS))
+        rows = run_benchmark(
+            filename=filename, filepath=filepath, n_workers=args.n_workers, modes=args.modes
+        )
+    print_report(title="Workers sharing a dataset: memory per worker", rows=rows)
+
+
+if __name__ == "__main__":
+    main()
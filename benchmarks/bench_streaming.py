@@ -0,0 +1,172 @@
+"""
+This module is used to benchmark the streaming (NDJSON) predict endpoint. The API
+is started with uvicorn in a subprocess and the rides are generated lazily by the
+client, so the peak memory (VmHWM) of the server process shows whether it grows
+with the number of rows. The JSON predict endpoint is used as the baseline.
+It requires a trained model and Linux (/proc).
+
+Usage:
+    python -m benchmarks.bench_streaming --sizes 100000 1000000
+
+author: Chinedu Ezeofor
+"""
+import sys
+import json
+import time
+import socket
+import threading
+import typing as tp
+import subprocess  # nosec
+from argparse import ArgumentParser
+from itertools import cycle, islice
+
+import httpx
+import numpy as np
+
+# Custom Imports
+from src.config.core import config
+from src.api.streaming import NDJSON_MEDIA_TYPE
+from benchmarks.utilities import print_report, make_trip_data
+
+HOST = "127.0.0.1"
+TEMPLATE_ROWS = 10_000  # Rows generated once and repeated
+
+
+def get_free_port() -> int:
+    """This returns a free TCP port."""
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def start_server(*, port: int) -> subprocess.Popen:
+    """This starts the API in a subprocess and waits until it's ready."""
+    process = subprocess.Popen(  # nosec pylint: disable=consider-using-with
+        [sys.executable, "-m", "uvicorn", "src.api:app", "--host", HOST, "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    for _ in range(300):
+        try:
+            httpx.get(f"http://{HOST}:{port}/", timeout=1)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("The API didn't start.")
+
+
+def get_peak_rss_mb(pid: int) -> float:
+    """This returns the peak resident set size (VmHWM) of a process in MB."""
+    with open(f"/proc/{pid}/status", encoding="utf-8") as file:
+        for line in file:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError("VmHWM not found.")
+
+
+def get_lines(*, n_rows: int) -> tp.List[bytes]:
+    """This returns the NDJSON lines of the template rides."""
+    data = make_trip_data(n_rows=min(n_rows, TEMPLATE_ROWS))[config.model_config.INPUT_FEATURES]
+    data[config.model_config.TEMPORAL_VAR] = data[config.model_config.TEMPORAL_VAR].astype(str)
+    records = data.replace({np.nan: None}).to_dict(orient="records")
+    return [json.dumps(record).encode() + b"\n" for record in records]
+
+
+def generate_body(*, lines: tp.List[bytes], n_rows: int) -> tp.Iterator[bytes]:
+    """This lazily yields an NDJSON body of `n_rows` rides (in ~1,000 row pieces)."""
+    rides = islice(cycle(lines), n_rows)
+    while piece := b"".join(islice(rides, 1_000)):
+        yield piece
+
+
+def send_stream(*, url: str, lines: tp.List[bytes], n_rows: int) -> float:
+    """This returns the time taken to stream `n_rows` rides and read the predictions.
+    The body is sent (chunked) by a thread while the predictions are read: a client
+    that reads the response only after sending the whole body blocks once the
+    unread predictions fill the socket buffers."""
+    host_port, path = url.removeprefix("http://").split("/", 1)
+    host, port = host_port.split(":")
+    start = time.perf_counter()
+    with socket.create_connection((host, int(port))) as sock:
+
+        def write_body() -> None:
+            sock.sendall(
+                f"POST /{path} HTTP/1.1\r\nHost: {host_port}\r\n"
+                f"Content-Type: {NDJSON_MEDIA_TYPE}\r\nTransfer-Encoding: chunked\r\n"
+                "Connection: close\r\n\r\n".encode()
+            )
+            for piece in generate_body(lines=lines, n_rows=n_rows):
+                sock.sendall(f"{len(piece):x}\r\n".encode() + piece + b"\r\n")
+            sock.sendall(b"0\r\n\r\n")
+
+        writer = threading.Thread(target=write_body)
+        writer.start()
+        # Each prediction line ends with "}\n" (the chunk framing uses "\r\n")
+        n_predictions, tail = 0, b""
+        while data := sock.recv(1 << 16):
+            n_predictions += (tail + data).count(b"}\n")
+            tail = data[-1:]
+        writer.join()
+    assert n_predictions == n_rows  # nosec
+    return time.perf_counter() - start
+
+
+def send_json(*, url: str, lines: tp.List[bytes], n_rows: int) -> float:
+    """This returns the time taken to send `n_rows` rides in a single JSON request."""
+    records = (line.rstrip(b"\n") for line in islice(cycle(lines), n_rows))
+    body = b'{"inputs": [' + b",".join(records) + b"]}"
+    start = time.perf_counter()
+    response = httpx.post(
+        url, content=body, headers={"Content-Type": "application/json"}, timeout=None
+    )
+    assert response.status_code == 200  # nosec
+    return time.perf_counter() - start
+
+
+def run_benchmark(*, sizes: tp.List[int], endpoints: tp.List[str]) -> tp.List[tp.Dict]:
+    """This returns the throughput and the peak memory of the server for each size.
+    A new server is started for each run so the peak memory isn't shared."""
+    senders = {"stream": ("predict/stream/", send_stream), "json": ("predict/", send_json)}
+    rows = []
+    for n_rows in sizes:
+        lines = get_lines(n_rows=n_rows)
+        for endpoint in endpoints:
+            path, send = senders[endpoint]
+            port = get_free_port()
+            process = start_server(port=port)
+            try:
+                idle_mb = get_peak_rss_mb(process.pid)
+                elapsed = send(
+                    url=f"http://{HOST}:{port}/api/v1/{path}", lines=lines, n_rows=n_rows
+                )
+                peak_mb = get_peak_rss_mb(process.pid)
+            finally:
+                process.terminate()
+                process.wait()
+            rows.append(
+                {
+                    "n_rows": n_rows,
+                    "endpoint": endpoint,
+                    "time (s)": round(elapsed, 2),
+                    "rows/s": int(n_rows / elapsed),
+                    "idle peak RSS (MB)": round(idle_mb, 1),
+                    "peak RSS (MB)": round(peak_mb, 1),
+                }
+            )
+    return rows
+
+
+def main() -> None:
+    """This is the main function"""
+    parser = ArgumentParser(description="Benchmark the streaming (NDJSON) predict endpoint.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[100_000, 1_000_000])
+    parser.add_argument("--endpoints", nargs="+", choices=["stream", "json"], default=["stream"])
+    args = parser.parse_args()
+
+    rows = run_benchmark(sizes=args.sizes, endpoints=args.endpoints)
+    print_report(title="Streaming (NDJSON) predictions: throughput and server memory", rows=rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+This module is used to benchmark the training time of `rf_pipe` against the number
+of workers (`N_JOBS`), with the BLAS/OpenMP threads limited by `limit_threads`.
+The speedup is relative to a single worker.
+
+Usage:
+    python -m benchmarks.bench_training --n-rows 1000000 --n-jobs 1 2 4 8 16 32
+
+author: Chinedu Ezeofor
+"""
+import functools
+import typing as tp
+from argparse import ArgumentParser
+
+import pandas as pd
+from sklearn.base import clone
+
+# Custom Imports
+from src.pipeline import rf_pipe
+from src.config.core import config
+from benchmarks.utilities import time_it, print_report, load_trip_data
+from src.utilities.parallel import get_n_cpus, set_n_jobs, limit_threads
+from src.processing.data_manager import split_train_data
+
+
+def fit_pipeline(*, X_train: pd.DataFrame, y_train: pd.Series, n_jobs: int) -> None:
+    """This fits a copy of `rf_pipe` with `n_jobs` workers."""
+    pipe = set_n_jobs(clone(rf_pipe), n_jobs)
+    with limit_threads(n_jobs=n_jobs):
+        pipe.fit(X_train, y_train)
+
+
+def run_benchmark(*, data: pd.DataFrame, n_jobs: tp.List[int], repeat: int) -> tp.List[tp.Dict]:
+    """This returns the training time for each number of workers."""
+    X_train, _, y_train, _ = split_train_data(
+        data=data,
+        target=config.model_config.TARGET,
+        test_size=config.model_config.TEST_SIZE,
+        random_state=config.model_config.RANDOM_STATE,
+    )
+    rows = []
+    for n_jobs_ in n_jobs:
+        elapsed = time_it(
+            functools.partial(fit_pipeline, X_train=X_train, y_train=y_train, n_jobs=n_jobs_),
+            repeat=repeat,
+        )
+        rows.append({"n_jobs": n_jobs_, "time (s)": round(elapsed, 2)})
+    for row in rows:
+        row["speedup"] = round(rows[0]["time (s)"] / row["time (s)"], 2)
+    return rows
+
+
+def main() -> None:
+    """This is the main function"""
+    n_cpus = get_n_cpus()
+    parser = ArgumentParser(description="Benchmark the training time against the workers.")
+    parser.add_argument("--n-rows", type=int, default=1_000_000, help="Rows of synthetic data.")
+    parser.add_argument(
+        "--n-jobs",
+        nargs="+",
+        type=int,
+        default=sorted({1, *(2**idx for idx in range(n_cpus.bit_length())), n_cpus}),
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data = load_trip_data(n_rows=args.n_rows)
+    rows = run_benchmark(data=data, n_jobs=args.n_jobs, repeat=args.repeat)
+    print_report(title=f"rf_pipe training time against the workers ({n_cpus} CPUs)", rows=rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+This module is used to benchmark the transformer cache (the `memory` of the pipelines
+built by `build_pipeline`): the time of fitting the preprocessing steps without the
+cache, with the cache cold (fitted and saved) and with the cache warm (loaded), and
+the time of training the pipeline again with other model hyperparameters.
+
+Usage:
+    python -m benchmarks.bench_transformer_cache --n-rows 1000000
+
+author: Chinedu Ezeofor
+"""
+import time
+import functools
+import tempfile
+import typing as tp
+from argparse import ArgumentParser
+
+import pandas as pd
+
+# Custom Imports
+from src.pipeline import build_pipeline
+from src.config.core import config
+from benchmarks.utilities import time_it, print_report, load_trip_data
+from src.processing import cache
+from src.utilities.parallel import limit_threads
+from src.processing.cache import TransformerCache
+from src.processing.data_manager import split_train_data
+
+MODES = ("no cache", "cold cache", "warm cache")
+
+
+def fit_pipeline(
+    *, X_train: pd.DataFrame, y_train: pd.Series, use_cache: bool, preprocessing: bool
+) -> None:
+    """This fits a new pipeline (or only its preprocessing steps) with a smaller
+    `max_depth` than the config."""
+    pipe = build_pipeline(model_params={"max_depth": 6}, use_cache=use_cache)
+    with limit_threads():
+        (pipe[:-1] if preprocessing else pipe).fit(X_train, y_train)
+
+
+def run_benchmark(*, data: pd.DataFrame, repeat: int) -> tp.List[tp.Dict]:
+    """This returns the time of the preprocessing and of the whole pipeline per mode."""
+    X_train, _, y_train, _ = split_train_data(
+        data=data,
+        target=config.model_config.TARGET,
+        test_size=config.model_config.TEST_SIZE,
+        random_state=config.model_config.RANDOM_STATE,
+    )
+    rows = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache.transformer_cache = TransformerCache(cache_dir=cache_dir)
+        for mode in MODES:
+            row: tp.Dict[str, tp.Any] = {"mode": mode}
+            for stage, preprocessing in [("preprocessing", True), ("pipeline", False)]:
+                kwargs = {
+                    "X_train": X_train,
+                    "y_train": y_train,
+                    "use_cache": mode != "no cache",
+                    "preprocessing": preprocessing,
+                }
+                if mode == "cold cache":
+                    cache.transformer_cache.clear()
+                    start = time.perf_counter()
+                    fit_pipeline(**kwargs)
+                    row[f"{stage} (s)"] = round(time.perf_counter() - start, 3)
+                else:
+                    row[f"{stage} (s)"] = round(
+                        time_it(functools.partial(fit_pipeline, **kwargs), repeat=repeat), 3
+                    )
+            rows.append(row)
+        row["cache size (KB)"] = round(cache.transformer_cache.total_bytes / 1024, 1)
+    return rows
+
+
+def main() -> None:
+    """This is the main function"""
+    parser = ArgumentParser(description="Benchmark the cache of the fitted preprocessing steps.")
+    parser.add_argument("--n-rows", type=int, default=1_000_000, help="Rows of synthetic data.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per mode (best time).")
+    args = parser.parse_args()
+
+    data = load_trip_data(n_rows=args.n_rows)
+    rows = run_benchmark(data=data, repeat=args.repeat)
+    print_report(title=f"Transformer cache ({len(data):,} rows)", rows=rows)
+
+
+if __name__ == "__main__":
+    main()
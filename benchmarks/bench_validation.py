@@ -0,0 +1,63 @@
+"""
+This module is used to benchmark the validation of the input data.
+It compares the columnar validation used by `validate_input` against
+validating one Pydantic object per row.
+
+Usage:
+    python -m benchmarks.bench_validation --sizes 1 1000 100000 1000000
+
+author: Chinedu Ezeofor
+"""
+import functools
+import typing as tp
+from argparse import ArgumentParser
+
+import numpy as np
+import pandas as pd
+
+# Custom Imports
+from src.config.core import config
+from src.config.schema import ValidateInputSchema
+from benchmarks.utilities import time_it, print_report, make_trip_data
+from src.processing.data_manager import validate_input
+
+
+def validate_input_per_row(*, data: pd.DataFrame) -> pd.DataFrame:
+    """This validates the data with one Pydantic object per row."""
+    validated_data = ValidateInputSchema(
+        inputs=data.replace({np.nan: None}).to_dict(orient="records")
+    )
+    return pd.DataFrame(data=validated_data.dict().get("inputs"))
+
+
+def run_benchmark(*, sizes: tp.List[int], repeat: int) -> tp.List[tp.Dict]:
+    """This returns the timings of both validation paths for each size."""
+    rows = []
+    for n_rows in sizes:
+        data = make_trip_data(n_rows=n_rows)[config.model_config.INPUT_FEATURES]
+        per_row = time_it(functools.partial(validate_input_per_row, data=data), repeat=repeat)
+        columnar = time_it(functools.partial(validate_input, data=data), repeat=repeat)
+        rows.append(
+            {
+                "n_rows": n_rows,
+                "per_row (s)": round(per_row, 5),
+                "columnar (s)": round(columnar, 5),
+                "speedup": round(per_row / columnar, 1),
+            }
+        )
+    return rows
+
+
+def main() -> None:
+    """This is the main function"""
+    parser = ArgumentParser(description="Benchmark the validation of the input data.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1, 1_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = run_benchmark(sizes=args.sizes, repeat=args.repeat)
+    print_report(title="validate_input", rows=rows)
+
+
+if __name__ == "__main__":
+    main()
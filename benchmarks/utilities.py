@@ -0,0 +1,96 @@
+"""
+This module contains helper functions used for benchmarking.
+
+author: Chinedu Ezeofor
+"""
+import time
+import typing as tp
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+MINS = 60 * 10**9  # A minute in nanoseconds
+
+
+def make_trip_data(*, n_rows: int, random_state: int = 123, month: int = 1) -> pd.DataFrame:
+    """This returns a synthetic DF with the same schema (columns and dtypes)
+    as the NYC yellow taxi trip data.
+
+    Params:
+    -------
+    n_rows (int): The number of rows.
+    random_state (int, default=123): Seed used for generating the data.
+    month (int, default=1): The month (2022) of the pickup times.
+
+    Returns:
+    --------
+    data (Pandas DF): The synthetic trip data.
+    """
+    rng = np.random.default_rng(random_state)
+    start = pd.Timestamp(year=2022, month=month, day=1).value
+    pickup = start + rng.integers(0, 28 * 24 * 60 * MINS, n_rows)
+    duration = (rng.gamma(2.0, 6.0, n_rows) * MINS).astype("int64")
+    duration[rng.random(n_rows) < 0.01] *= -1  # Invalid trips
+    trip_distance = np.round(rng.gamma(1.5, 2.0, n_rows), 2)
+    ratecode_id = rng.choice([1.0, 2.0, 5.0, 99.0, np.nan], n_rows, p=[0.9, 0.03, 0.01, 0.01, 0.05])
+    is_na = np.isnan(ratecode_id)
+    fare_amount = np.round(2.5 + 2.5 * trip_distance + rng.normal(0, 1, n_rows), 2)
+    tip_amount = np.round(rng.gamma(1, 1.5, n_rows), 2)
+
+    data = pd.DataFrame(
+        {
+            "VendorID": rng.choice([1, 2], n_rows),
+            "tpep_pickup_datetime": pd.to_datetime(pickup),
+            "tpep_dropoff_datetime": pd.to_datetime(pickup + duration),
+            "passenger_count": np.where(is_na, np.nan, rng.integers(1, 5, n_rows)),
+            "trip_distance": trip_distance,
+            "RatecodeID": ratecode_id,
+            "store_and_fwd_flag": np.where(
+                is_na, None, rng.choice(["N", "Y"], n_rows, p=[0.98, 0.02])
+            ).astype(object),
+            "PULocationID": rng.integers(1, 266, n_rows),
+            "DOLocationID": rng.integers(1, 266, n_rows),
+            "payment_type": rng.choice([1, 2, 3, 4], n_rows),
+            "fare_amount": fare_amount,
+            "extra": rng.choice([0.0, 0.5, 1.0], n_rows),
+            "mta_tax": np.full(n_rows, 0.5),
+            "tip_amount": tip_amount,
+            "tolls_amount": np.zeros(n_rows),
+            "improvement_surcharge": np.full(n_rows, 0.3),
+            "total_amount": np.round(fare_amount + tip_amount + 3.3, 2),
+            "congestion_surcharge": np.where(is_na, np.nan, 2.5),
+            "airport_fee": np.where(is_na, np.nan, 0.0),
+        }
+    )
+    return data
+
+
+def load_trip_data(*, n_rows: int, random_state: int = 123) -> pd.DataFrame:
+    """This returns synthetic trip data preprocessed by `load_data`
+    (trip_duration, IDs and filtering)."""
+    # pylint: disable=import-outside-toplevel
+    from src.processing.data_manager import LOAD_COLUMNS, load_data
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = Path(tmp_dir, "yellow_tripdata.parquet")
+        make_trip_data(n_rows=n_rows, random_state=random_state).to_parquet(filename, index=False)
+        data = load_data(filename=filename, uri=True, columns=LOAD_COLUMNS)
+    return data
+
+
+def time_it(func: tp.Callable, *, repeat: int = 5) -> float:
+    """This returns the best wall time (in seconds) of calling `func`."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def print_report(*, title: str, rows: tp.List[tp.Dict]) -> None:
+    """This prints the benchmark results as a table."""
+    print(f"\n===== {title} =====")
+    print(pd.DataFrame(rows).to_string(index=False))
@@ -14,6 +14,8 @@ from prefect.task_runners import ConcurrentTaskRunner
 from dateutil.relativedelta import relativedelta  # type: ignore
 
 # Custom Imports
+from src.utilities.parallel import CPU_BOUND_TAG
+from src.orchestrate import check_concurrency_limit
 from src.processing.data_manager import load_data
 from model_deployment.batch_deploy.utilities import save_data_to_s3, compare_predictions
 
@@ -27,6 +29,7 @@ load_data = task(  # type: ignore
 )
 compare_predictions = task(  # type: ignore
     compare_predictions,
+    tags=[CPU_BOUND_TAG],
     retries=3,
     retry_delay_seconds=5,
     cache_key_fn=task_input_hash,
@@ -60,17 +63,26 @@ def get_paths(*, taxi_type: str, run_id: str, run_date: datetime) -> tp.Tuple:
 
 
 @flow(name="apply_batch_prediction", task_runner=ConcurrentTaskRunner)  # type: ignore
-def batch_preprocess(*, taxi_type: str, run_id: str, run_date: datetime) -> None:
+def batch_preprocess(
+    *, taxi_type: str, run_id: str, run_date: datetime, compiled: bool = False
+) -> None:
     """This is a wrapper function used to load the data,
-    make predictions and save the results to S3."""
+    make predictions and save the results to S3.
+
+    Note:
+    -----
+    If `compiled` is True, the Random Forest is scored with the flat-array
+    engine (`src.processing.forest`) instead of Scikit-learn.
+    """
     logger = get_run_logger()
     input_file, output_file = get_paths(  # type: ignore
         run_date=run_date, taxi_type=taxi_type, run_id=run_id
     )
     logger.info("Loading data using input filepath ...")
-    data = load_data(filename=input_file, uri=True)  # type: ignore
+    # The IDs are computed from the trips so a backfill gives the same IDs
+    data = load_data(filename=input_file, uri=True, id_mode="hash")  # type: ignore
     logger.info("Making predictions on input data ...")
-    result_df = compare_predictions(data=data, run_id=run_id)
+    result_df = compare_predictions(data=data, run_id=run_id, compiled=compiled)
     logger.info("Saving data to S3 ...")
     save_data_to_s3(data=result_df, output=output_file)  # type: ignore
     logger.info("Batch Prediction processing done!")
@@ -78,7 +90,11 @@ def batch_preprocess(*, taxi_type: str, run_id: str, run_date: datetime) -> None
 
 @flow(name="batch_prediction", task_runner=ConcurrentTaskRunner)  # type: ignore
 def batch_predict_flow(
-    *, run_id: str, taxi_type: str, run_date: tp.Optional[datetime] = None
+    *,
+    run_id: str,
+    taxi_type: str,
+    run_date: tp.Optional[datetime] = None,
+    compiled: bool = False,
 ) -> None:
     """This is the workflow for making batch predictions.
 
@@ -88,25 +104,27 @@ def batch_predict_flow(
     `get_run_context` is used to obtain the current date as the run_date.
     """
     logger = get_run_logger()
+    check_concurrency_limit()
     logger.info("Starting batch predictions ...")
     if run_date is None:
         ctx = get_run_context()  # It works ONLY w/flows
         run_date = ctx.flow_run.expected_start_time  # type: ignore
 
-    batch_preprocess(run_id=run_id, taxi_type=taxi_type, run_date=run_date)
+    batch_preprocess(run_id=run_id, taxi_type=taxi_type, run_date=run_date, compiled=compiled)
 
 
 @flow(name="backfill_batch_prediction", task_runner=ConcurrentTaskRunner)  # type: ignore
-def batch_predict_backfill_flow(*, run_id: str, taxi_type: str) -> None:
+def batch_predict_backfill_flow(*, run_id: str, taxi_type: str, compiled: bool = False) -> None:
     """This is the workflow for making batch predictions on previous
     NYC Taxi data."""
     logger = get_run_logger()
+    check_concurrency_limit()
     logger.info("Starting batch predictions ...")
     start_date = datetime(year=2022, month=6, day=1)
     end_date = datetime(year=2022, month=8, day=1)
 
     while start_date <= end_date:
-        batch_preprocess(run_id=run_id, taxi_type=taxi_type, run_date=start_date)
+        batch_preprocess(run_id=run_id, taxi_type=taxi_type, run_date=start_date, compiled=compiled)
         start_date += relativedelta(months=1)  # Increment month
 
 
@@ -137,10 +155,15 @@ def main() -> None:
         type=str,
         required=True,
     )
+    parser.add_argument(
+        "--compiled",
+        help="Score the Random Forest with the flat-array engine",
+        action="store_true",
+    )
     args = parser.parse_args()
 
     # Extract the variables
-    run_id, taxi_type = (args.run_id, args.taxi_type)
+    run_id, taxi_type, compiled = (args.run_id, args.taxi_type, args.compiled)
     if args.run_date:
         run_date = args.run_date.lower()
         date = run_date.split("-")
@@ -149,7 +172,7 @@ def main() -> None:
     else:
         run_date = None
     # batch_predict_flow(run_id=run_id, run_date=run_date, taxi_type=taxi_type)
-    batch_predict_backfill_flow(run_id=run_id, taxi_type=taxi_type)
+    batch_predict_backfill_flow(run_id=run_id, taxi_type=taxi_type, compiled=compiled)
 
 
 if __name__ == "__main__":
@@ -9,16 +9,22 @@ import numpy as np
 import pandas as pd
 
 # Custom Imports
+from src.processing.forest import export_forest
+from src.processing.inference_plan import compile_pipeline
+from src.utilities.parallel import limit_threads
 from src.processing.data_manager import logger
 
 
-def get_predictions(*, data: pd.DataFrame, run_id: str) -> np.ndarray:
+def get_predictions(*, data: pd.DataFrame, run_id: str, compiled: bool = False) -> np.ndarray:
     """This returns the predicted trip duration using the model
     from the model registry on S3.
 
     Params:
+        data (Pandas DF): DF containing the NYC taxi data.
         run_id (str): The run id associated with the model.
-        run_id (str): The run id associated with the model.
+        compiled (bool, default=False): If True, the features are computed with the
+            fused inference plan and the Random Forest is scored with the
+            flat-array engine (`src.processing.forest`).
 
     Returns:
         pred (ndarray): The predicted trip duration.
@@ -27,21 +33,34 @@ def get_predictions(*, data: pd.DataFrame, run_id: str) -> np.ndarray:
     # Load the model from the model registry
     logger.info("Fetching model from registry ...")
     try:
-        model = mlflow.pyfunc.load_model(model_uri=f"{S3_BUCKET_NAME}")
+        if compiled:
+            model = mlflow.sklearn.load_model(model_uri=f"{S3_BUCKET_NAME}")
+        else:
+            model = mlflow.pyfunc.load_model(model_uri=f"{S3_BUCKET_NAME}")
     except ValueError as err:
         logger.info(err)
     logger.info("Making predictions ...")
-    pred = model.predict(data)
+    with limit_threads():  # The model predicts with N_JOBS workers
+        if compiled:
+            plan = compile_pipeline(model)
+            try:
+                pred = export_forest(model).predict(plan.transform(data))
+            except NotImplementedError:  # Not a Random Forest (e.g gradient boosting)
+                pred = plan.predict(data)
+        else:
+            pred = model.predict(data)
     pred = [(round(x, 1)) for x in list(np.expm1(pred))]  # Convert from log to minutes
     return np.array(pred)
 
 
-def compare_predictions(*, data: pd.DataFrame, run_id: str) -> pd.DataFrame:
+def compare_predictions(*, data: pd.DataFrame, run_id: str, compiled: bool = False) -> pd.DataFrame:
     """This compares the actual vs predicted trip duration.
 
     Params:
         data (Pandas DF): DF containing the NYC taxi data.
         run_id (str): The run id associated with the model.
+        compiled (bool, default=False): If True, the flat-array engine is used
+            to make the predictions.
 
     Returns:
         result_df (Pandas DF): DF containing the predicted trip
@@ -49,7 +68,7 @@ def compare_predictions(*, data: pd.DataFrame, run_id: str) -> pd.DataFrame:
     """
     result_df = pd.DataFrame()
     try:
-        pred_trip_duration = get_predictions(data=data, run_id=run_id)
+        pred_trip_duration = get_predictions(data=data, run_id=run_id, compiled=compiled)
     except ValueError as err:
         logger.info(err)
 
@@ -0,0 +1,240 @@
+"""
+This module is used to compile a fitted pipeline into a single inference plan.
+The plan reads the learned parameters of each step (imputation values,
+Yeo-Johnson lambdas, scaler mean and scale, column order, etc) and computes
+the feature matrix directly from the raw input columns with NumPy, without
+creating intermediate DataFrames.
+
+Note:
+-----
+This module must NOT depend on the `src` package because it's also used by the
+streaming service (`model_deployment/streaming`). The steps are identified by
+their class names so it works with any copy of the custom transformers.
+
+author: Chinedu Ezeofor
+"""
+import typing as tp
+
+# Standard imports
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+NS_PER_HOUR = 3_600 * 10**9
+NS_PER_DAY = 24 * NS_PER_HOUR
+EPOCH_DAY_OF_WEEK = 3  # 1970-01-01 was a Thursday (Monday=0)
+
+# A node is a tuple: (operation, input node or column name, *parameters)
+Node = tp.Tuple[tp.Any, ...]
+# The temporal features (and their operations) added by the custom transformers
+TEMPORAL_FEATURES = {
+    "CalculateDayOfWeek": ["day_of_week"],
+    "CalculateHourOfDay": ["hour_of_day"],
+    "CalculateTemporalFeatures": ["day_of_week", "hour_of_day"],
+}
+
+
+def _to_datetime64(values: tp.Any) -> np.ndarray:
+    """This returns the values as a datetime64[ns] array. Timezone-aware
+    values are converted to their local (wall) time, same as the `.dt` accessor."""
+    if isinstance(values, pd.Series) and isinstance(values.dtype, pd.DatetimeTZDtype):
+        values = values.dt.tz_localize(None)
+    return np.asarray(values, dtype="datetime64[ns]")
+
+
+def _to_float(values: tp.Any) -> np.ndarray:
+    """This returns the values as a float array. Float32 values are kept as float32
+    and missing values in object arrays (e.g. None) are converted to NaN."""
+    values = np.asarray(values)
+    if values.dtype.kind == "f":
+        return values
+    if values.dtype.kind == "O":
+        return pd.Series(values).astype(np.float64).to_numpy()
+    return values.astype(np.float64)
+
+
+def _calendar_feature(values: tp.Any, *, unit: int, period: int, offset: int = 0) -> np.ndarray:
+    """This returns ((datetime // unit) + offset) % period computed on the
+    int64 nanoseconds. Missing datetimes (NaT) return NaN."""
+    dates = _to_datetime64(values)
+    nanoseconds = dates.view(np.int64)
+    result = ((nanoseconds // unit + offset) % period).astype(np.float64)
+    result[np.isnat(dates)] = np.nan
+    return result
+
+
+class InferencePlan:
+    """Fused plan used to compute the feature matrix of a fitted pipeline.
+
+    Params:
+    -------
+    nodes (List[Node]): The computation of each column of the feature matrix.
+    feature_names (List[str]): The names of the columns of the feature matrix.
+    input_features (List[str]): The raw input columns used by the plan.
+    mean (ndarray or None): The mean removed by the StandardScaler.
+    scale (ndarray or None): The scale used by the StandardScaler.
+    estimator (Estimator): The final step of the pipeline.
+    """
+
+    def __init__(
+        self,
+        *,
+        nodes: tp.List[Node],
+        feature_names: tp.List[str],
+        input_features: tp.List[str],
+        mean: tp.Optional[np.ndarray],
+        scale: tp.Optional[np.ndarray],
+        estimator: tp.Any,
+    ) -> None:
+        self.nodes = nodes
+        self.feature_names = feature_names
+        self.input_features = input_features
+        self.mean = mean
+        self.scale = scale
+        self.estimator = estimator
+
+    def _evaluate(self, node: Node, data: tp.Any, cache: tp.Dict) -> np.ndarray:
+        """This returns the values of a node. Shared nodes are computed once."""
+        key = id(node)
+        if key in cache:
+            return cache[key]
+
+        operation, source, *params = node
+        if operation == "column":
+            result = data[source]
+        else:
+            values = self._evaluate(source, data, cache)
+            if operation == "float":
+                result = _to_float(values)
+            elif operation == "is_missing":
+                result = pd.isna(values).astype(np.float64)
+            elif operation == "impute":
+                result = np.where(np.isnan(values), values.dtype.type(params[0]), values)
+            elif operation == "day_of_week":
+                result = _calendar_feature(
+                    values, unit=NS_PER_DAY, period=7, offset=EPOCH_DAY_OF_WEEK
+                )
+            elif operation == "hour_of_day":
+                result = _calendar_feature(values, unit=NS_PER_HOUR, period=24)
+            elif operation == "yeo_johnson":
+                result = stats.yeojohnson(values, lmbda=params[0])
+            elif operation == "ordinal":
+                result = pd.Index(params[0]).get_indexer(values).astype(np.float64)
+                result[result < 0] = np.nan  # Rare or unknown categories
+            else:
+                raise NotImplementedError(f"Unsupported operation: {operation!r}")
+        cache[key] = result
+        return result
+
+    def transform(self, data: tp.Any) -> np.ndarray:
+        """This returns the feature matrix. It's the same as the output of all
+        the steps of the pipeline except the final estimator.
+
+        Params:
+        -------
+        data (Pandas DF or Mapping): The raw input columns.
+
+        Returns:
+        --------
+        X (ndarray): The feature matrix. Shape: (n_rows, n_features).
+        """
+        cache: tp.Dict = {}
+        n_rows = len(data[self.input_features[0]])
+        X = np.empty((n_rows, len(self.nodes)), dtype=np.float64)
+        for idx, node in enumerate(self.nodes):
+            X[:, idx] = self._evaluate(node, data, cache)
+
+        # Same operations as StandardScaler.transform
+        if self.mean is not None:
+            X -= self.mean
+        if self.scale is not None:
+            X /= self.scale
+        return X
+
+    def predict(self, data: tp.Any) -> np.ndarray:
+        """This returns the predictions of the final estimator."""
+        X = self.transform(data)
+        if hasattr(self.estimator, "feature_names_in_"):  # Fitted on a DF
+            X = pd.DataFrame(X, columns=self.feature_names, copy=False)
+        return self.estimator.predict(X)
+
+
+def _add_step_nodes(step: tp.Any, columns: tp.Dict[str, Node]) -> None:
+    """This updates the columns (in place) with the nodes computing the output
+    of a transformer (except SelectFeatures and StandardScaler)."""
+    name = type(step).__name__
+    if name == "AddMissingIndicator":
+        columns.update({f"{feat}_na": ("is_missing", columns[feat]) for feat in step.variables_})
+    elif name == "MeanMedianImputer":
+        columns.update(
+            {
+                feat: ("impute", ("float", columns[feat]), value)
+                for feat, value in step.imputer_dict_.items()
+            }
+        )
+    elif name in TEMPORAL_FEATURES:
+        columns.update({feat: (feat, columns[step.feature]) for feat in TEMPORAL_FEATURES[name]})
+    elif name == "DropFeatures":
+        for feat in step.features_to_drop_:
+            columns.pop(feat)
+    elif name == "YeoJohnsonTransformer":
+        columns.update(
+            {
+                feat: ("yeo_johnson", ("float", columns[feat]), lmbda)
+                for feat, lmbda in step.lambda_dict_.items()
+            }
+        )
+    elif name == "OrdinalEncodeFrequent":
+        columns.update(
+            {
+                feat: ("ordinal", columns[feat], categories)
+                for feat, categories in step.encoder_dict_.items()
+            }
+        )
+    else:
+        raise NotImplementedError(f"Unsupported step: {name!r}")
+
+
+def compile_pipeline(pipe: tp.Any) -> InferencePlan:
+    """This returns the inference plan of a fitted pipeline.
+
+    Params:
+    -------
+    pipe (Pipeline): The fitted pipeline. e.g `src.pipeline.rf_pipe`
+
+    Returns:
+    --------
+    plan (InferencePlan): The compiled plan.
+    """
+    steps = [step for _, step in pipe.steps]
+    columns: tp.Dict[str, Node] = {}  # The columns (in order) after each step
+    input_features: tp.List[str] = []
+    mean, scale = None, None
+
+    if not steps or type(steps[0]).__name__ != "SelectFeatures":
+        raise NotImplementedError("The first step must select the input features")
+
+    for step in steps[:-1]:
+        if mean is not None or scale is not None:
+            raise NotImplementedError("The StandardScaler must be the last transformer")
+        name = type(step).__name__
+
+        if name == "SelectFeatures":
+            if not input_features:
+                input_features = list(step.features)
+                columns = {feat: ("column", feat) for feat in input_features}
+            columns = {feat: columns[feat] for feat in step.features}
+        elif name == "StandardScaler":
+            mean = step.mean_ if step.with_mean else None
+            scale = step.scale_ if step.with_std else None
+        else:
+            _add_step_nodes(step, columns)
+
+    return InferencePlan(
+        nodes=[("float", node) if node[0] == "column" else node for node in columns.values()],
+        feature_names=list(columns),
+        input_features=input_features,
+        mean=mean,
+        scale=scale,
+        estimator=steps[-1],
+    )
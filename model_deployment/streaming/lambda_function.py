@@ -16,21 +16,37 @@ import numpy as np
 import joblib
 import pandas as pd
 
+try:
+    from inference_plan import InferencePlan, compile_pipeline
+except ModuleNotFoundError:  # Imported as a package (e.g. by the unit tests)
+    from .inference_plan import InferencePlan, compile_pipeline  # type: ignore
+
 # Environment variables
 RIDE_PREDICTIONS_STREAM_NAME = os.getenv("RIDE_PREDICTIONS", "ride_predictions")
 TEST_RUN = os.getenv("TEST_RUN", "False") == "True"
 
+MODEL_FILEPATH = "./trained_models/model.pkl"
+
 kinesis_client = boto3.client("kinesis")
+_inference_plan: tp.Optional[InferencePlan] = None
+
+
+def load_inference_plan() -> InferencePlan:
+    """This returns the inference plan of the trained model. The model is
+    loaded and compiled once and reused by the subsequent invocations."""
+    global _inference_plan  # pylint: disable=global-statement
+    if _inference_plan is None:
+        with open(MODEL_FILEPATH, "rb") as file:
+            model = joblib.load(file)
+        _inference_plan = compile_pipeline(model)
+    return _inference_plan
 
 
 def predict(*, data: pd.DataFrame) -> float:
     """This is used to make predictions on unseen data using
     the trained model."""
-    fp = "./trained_models/model.pkl"
-    with open(fp, "rb") as file:
-        model = joblib.load(file)
-
-    result = model.predict(data)[0]
+    plan = load_inference_plan()
+    result = plan.predict(data)[0]
     result = np.expm1(result)
     return round(float(result), 2)
 
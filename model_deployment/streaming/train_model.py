@@ -5,7 +5,6 @@ the custom package `src`
 
 author: Chinedu Ezeofor
 """
-import uuid
 import typing as tp
 import logging
 import warnings
@@ -16,6 +15,7 @@ import numpy as np
 import joblib
 import pandas as pd
 import feat_engineering as fe
+from ids import generate_ids
 from sklearn.ensemble import RandomForestRegressor
 
 # From Scikit-learn
@@ -39,12 +39,6 @@ def _set_up_logger(delim: str = "::") -> tp.Any:
     return logger
 
 
-def get_unique_IDs(feat: str) -> str:
-    """This returns a universally unique generated ID."""
-    if feat is not None:
-        return str(uuid.uuid4())
-
-
 def load_data(*, filename: str, uri: bool = False) -> pd.DataFrame:
     """This returns the data as a Pandas DF.
 
@@ -81,7 +75,7 @@ def load_data(*, filename: str, uri: bool = False) -> pd.DataFrame:
             trip_duration = round(trip_duration.dt.total_seconds() / MINS, 2)
             return trip_duration
 
-        data["id"] = data["VendorID"].apply(get_unique_IDs)  # Generate IDs
+        data["id"] = generate_ids(data)  # Generate IDs
         data["trip_duration"] = calculate_trip_duration(data)
         data = data.loc[
             (data["trip_duration"] > MIN_THRESH) & (data["trip_duration"] <= TRIP_DUR_THRESH)
@@ -0,0 +1,267 @@
+"""
+This module is used to merge concurrent prediction requests into micro-batches.
+The requests are queued and a worker thread collects them for up to `max_delay_ms`
+(or until the batch contains `max_batch_size` rows). The predictions are made once
+for the merged batch and each request receives its own slice of the result.
+
+author: Chinedu Ezeofor
+"""
+import time
+import queue
+import typing as tp
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+STATS_WINDOW = 1_000  # Number of recent batches used for the percentiles
+
+
+class PendingRequest:
+    """A prediction request waiting in the queue.
+
+    Params:
+    -------
+    records (List[Dict]): The input rows of the request.
+    """
+
+    def __init__(self, records: tp.List[tp.Dict]) -> None:
+        self.records = records
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class BatchingStats:
+    """Thread-safe metrics of the realized batch sizes and queueing delays."""
+
+    def __init__(self, window: int = STATS_WINDOW) -> None:
+        self._lock = threading.Lock()
+        self.n_batches = 0
+        self.n_requests = 0
+        self.n_rows = 0
+        self.n_fallbacks = 0
+        self._batch_sizes: tp.Deque[int] = deque(maxlen=window)
+        self._queue_delays: tp.Deque[float] = deque(maxlen=window)
+
+    def record(self, *, n_rows: int, queue_delays: tp.List[float], fallback: bool) -> None:
+        """This records a processed batch."""
+        with self._lock:
+            self.n_batches += 1
+            self.n_requests += len(queue_delays)
+            self.n_rows += n_rows
+            self.n_fallbacks += int(fallback)
+            self._batch_sizes.append(n_rows)
+            self._queue_delays.extend(queue_delays)
+
+    def summary(self) -> tp.Dict[str, tp.Any]:
+        """This returns the metrics. The percentiles are computed over the
+        most recent batches and the delays are in milliseconds."""
+        with self._lock:
+            batch_sizes = np.array(self._batch_sizes, dtype=np.float64)
+            queue_delays = np.array(self._queue_delays, dtype=np.float64) * 1_000
+            result = {
+                "n_batches": self.n_batches,
+                "n_requests": self.n_requests,
+                "n_rows": self.n_rows,
+                "n_fallbacks": self.n_fallbacks,
+            }
+
+        for name, values in (("batch_size", batch_sizes), ("queue_delay_ms", queue_delays)):
+            if len(values) == 0:
+                result[name] = None
+                continue
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            result[name] = {
+                "mean": round(float(values.mean()), 3),
+                "p50": round(float(p50), 3),
+                "p95": round(float(p95), 3),
+                "p99": round(float(p99), 3),
+                "max": round(float(values.max()), 3),
+            }
+        return result
+
+
+class MicroBatcher:  # pylint: disable=too-many-instance-attributes
+    """Merges concurrent prediction requests into micro-batches.
+
+    Params:
+    -------
+    predict_fn (Callable): Function used to make the predictions. It takes the
+        input DF (`data=`) and returns a dict containing the `trip_duration`,
+        `model_version` and `errors`. e.g `src.predict.make_predictions`
+    max_batch_size (int): The maximum number of rows in a batch. Larger requests
+        are predicted directly.
+    max_delay_ms (float): The maximum time (in milliseconds) the first request of
+        a batch waits for other requests.
+    executor (InferenceExecutor, default=None): The executor used to make the
+        predictions. If None, they're made by the worker thread (batches) or
+        the calling thread (direct requests).
+    """
+
+    def __init__(
+        self,
+        *,
+        predict_fn: tp.Callable[..., tp.Dict],
+        max_batch_size: int,
+        max_delay_ms: float,
+        executor: tp.Optional[tp.Any] = None,
+    ) -> None:
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_delay_ms = max_delay_ms
+        self.executor = executor
+        self.stats = BatchingStats()
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: tp.Optional[threading.Thread] = None
+        self._lock = threading.Lock()  # No request is queued after the sentinel
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        """This starts the worker thread."""
+        with self._lock:
+            if self.is_running:
+                return
+            self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+            self._thread.start()
+        logger.info(
+            f"Started micro-batching (max_batch_size={self.max_batch_size}, "
+            f"max_delay_ms={self.max_delay_ms}) ..."
+        )
+
+    def stop(self) -> None:
+        """This processes the queued requests and stops the worker thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            self._queue.put(None)  # Sentinel
+        thread.join()
+        logger.info("Stopped micro-batching ...")
+
+    def submit(self, records: tp.List[tp.Dict]) -> Future:
+        """This schedules the predictions of the input rows and returns a Future.
+        The rows are merged with the concurrent requests when the batcher is running.
+        Cancelling the Future before the batch starts drops the request.
+
+        Params:
+        -------
+        records (List[Dict]): The input rows.
+
+        Returns:
+        --------
+        future (Future): The Future of the result. i.e. a dict containing the
+            trip_duration, model_version and the possible errors.
+        """
+        request = PendingRequest(records)
+        with self._lock:
+            is_queued = self.is_running and len(records) < self.max_batch_size
+            if is_queued:
+                self._queue.put(request)
+
+        if not is_queued:
+            self._dispatch(self._predict_directly, [request])
+        return request.future
+
+    def predict(self, records: tp.List[tp.Dict]) -> tp.Dict:
+        """This returns the predictions of the input rows. (Blocking version of `submit`)"""
+        return self.submit(records).result()
+
+    def _dispatch(self, func: tp.Callable, batch: tp.List[PendingRequest]) -> None:
+        """This calls `func(batch)` on the executor (if any)."""
+        if self.executor is None:
+            func(batch)
+            return
+        try:
+            self.executor.submit(func, batch)
+        except Exception as err:  # pylint: disable=broad-except
+            for request in batch:
+                if request.future.set_running_or_notify_cancel():
+                    request.future.set_exception(err)
+
+    def _predict_directly(self, batch: tp.List[PendingRequest]) -> None:
+        """This makes the predictions of a request that isn't batched."""
+        (request,) = batch
+        if not request.future.set_running_or_notify_cancel():
+            return
+        try:
+            request.future.set_result(self.predict_fn(data=pd.DataFrame(request.records)))
+        except Exception as err:  # pylint: disable=broad-except
+            request.future.set_exception(err)
+
+    def _collect_batch(self, first: PendingRequest) -> tp.Tuple[tp.List[PendingRequest], bool]:
+        """This returns the requests of the batch started by `first` and
+        True if the sentinel was received."""
+        batch, n_rows = [first], len(first.records)
+        deadline = first.enqueued_at + self.max_delay_ms / 1_000
+
+        while n_rows < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                request = (
+                    self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+            if request is None:
+                return batch, True
+            batch.append(request)
+            n_rows += len(request.records)
+        return batch, False
+
+    def _run(self) -> None:
+        """This is the loop of the worker thread."""
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch, stop = self._collect_batch(first)
+            self._dispatch(self._process, batch)
+
+    def _process(self, batch: tp.List[PendingRequest]) -> None:
+        """This makes the predictions of a batch and sends each request its result."""
+        # Drop the cancelled requests (e.g. timed out while queued)
+        batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        started_at = time.perf_counter()
+        queue_delays = [started_at - request.enqueued_at for request in batch]
+        records = [record for request in batch for record in request.records]
+        fallback = False
+
+        try:
+            result = self.predict_fn(data=pd.DataFrame(records))
+            if result.get("errors") and len(batch) > 1:
+                # The row indices of the errors refer to the merged batch.
+                # Predict each request separately so every caller gets its own errors.
+                fallback = True
+                results = [self.predict_fn(data=pd.DataFrame(request.records)) for request in batch]
+            elif result.get("errors"):
+                results = [result]
+            else:
+                results = self._split_result(result=result, batch=batch)
+        except Exception as err:  # pylint: disable=broad-except
+            for request in batch:
+                request.future.set_exception(err)
+            return
+        finally:
+            self.stats.record(n_rows=len(records), queue_delays=queue_delays, fallback=fallback)
+
+        for request, request_result in zip(batch, results):
+            request.future.set_result(request_result)
+
+    @staticmethod
+    def _split_result(*, result: tp.Dict, batch: tp.List[PendingRequest]) -> tp.List[tp.Dict]:
+        """This returns the slice of the merged result that belongs to each request."""
+        results, start = [], 0
+        for request in batch:
+            stop = start + len(request.records)
+            results.append({**result, "trip_duration": result["trip_duration"][start:stop]})
+            start = stop
+        return results
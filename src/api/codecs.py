@@ -0,0 +1,110 @@
+"""
+This module contains the helper functions used to decode the prediction requests
+(JSON, Arrow IPC stream and Parquet) and to encode the predictions as JSON or as
+an Arrow IPC stream.
+
+author: Chinedu Ezeofor
+"""
+import typing as tp
+
+import numpy as np
+import orjson
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPE = "application/x-parquet"
+JSON_MEDIA_TYPE = "application/json"
+BINARY_MEDIA_TYPES = (ARROW_STREAM_MEDIA_TYPE, PARQUET_MEDIA_TYPE)
+
+
+def get_media_type(content_type: tp.Optional[str]) -> str:
+    """This returns the media type of a Content-Type header (without the
+    parameters). It defaults to JSON."""
+    if not content_type:
+        return JSON_MEDIA_TYPE
+    return content_type.split(";")[0].strip().lower()
+
+
+def accepts_arrow(accept: tp.Optional[str]) -> bool:
+    """This returns True if the Accept header asks for an Arrow IPC stream."""
+    return accept is not None and ARROW_STREAM_MEDIA_TYPE in accept.lower()
+
+
+def read_table(*, body: bytes, media_type: str, columns: tp.List[str]) -> pd.DataFrame:
+    """This returns the input columns of an Arrow IPC stream or a Parquet body.
+
+    Params:
+    -------
+    body (bytes): The request body.
+    media_type (str): The media type of the body.
+    columns (List[str]): The input features. Missing columns are ignored
+        (they're reported by the validation).
+
+    Returns:
+    --------
+    data (Pandas DF): The input data. The columns are converted without
+        copying when possible (numeric columns without nulls).
+
+    Raises:
+    -------
+    ValueError: If the body can't be decoded.
+    """
+    buffer = pa.py_buffer(body)
+    try:
+        if media_type == ARROW_STREAM_MEDIA_TYPE:
+            table = pa.ipc.open_stream(buffer).read_all()
+        elif media_type == PARQUET_MEDIA_TYPE:
+            schema = pq.read_schema(pa.BufferReader(buffer))
+            table = pq.read_table(
+                pa.BufferReader(buffer), columns=[col for col in columns if col in schema.names]
+            )
+        else:
+            raise ValueError(f"Unsupported media type: {media_type!r}")
+    except pa.ArrowException as err:
+        raise ValueError(f"Invalid {media_type} body: {err}") from err
+
+    table = table.select([col for col in columns if col in table.column_names])
+    # split_blocks: don't consolidate the columns into 2D blocks (i.e. no extra copy)
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def read_json_columns(*, rows: tp.List[tp.Dict], columns: tp.List[str]) -> pd.DataFrame:
+    """This returns the input columns of the decoded JSON rows. Each column is
+    built from a list of values (instead of creating the DF from the list of
+    dicts). Missing values are set to None.
+
+    Params:
+    -------
+    rows (List[Dict]): The input rows.
+    columns (List[str]): The input features. The other keys are ignored.
+
+    Returns:
+    --------
+    data (Pandas DF): The input data (not validated).
+    """
+    return pd.DataFrame({col: [row.get(col) for row in rows] for col in columns})
+
+
+def write_json(*, result: tp.Dict) -> bytes:
+    """This returns the predictions as JSON. It's used instead of the
+    `response_model` validation and serialization of FastAPI."""
+    return orjson.dumps(result)  # pylint: disable=no-member  # C extension
+
+
+def write_arrow_stream(*, result: tp.Dict) -> bytes:
+    """This returns the predictions as an Arrow IPC stream. The table contains
+    the `trip_duration` column and the model version is stored in the
+    schema metadata."""
+    trip_duration = pa.array(np.asarray(result["trip_duration"], dtype=np.float64))
+    schema = pa.schema(
+        [pa.field("trip_duration", pa.float64())],
+        metadata={"model_version": str(result["model_version"])},
+    )
+    table = pa.Table.from_arrays([trip_duration], schema=schema)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -17,6 +17,19 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "New York Taxi Trip Duration Prediction API"
     logging: LoggingSettings = LoggingSettings()
 
+    # Micro-batching of the concurrent prediction requests
+    PREDICT_BATCHING_ENABLED: bool = True
+    PREDICT_MAX_BATCH_SIZE: int = 64  # rows
+    PREDICT_MAX_DELAY_MS: float = 5.0
+
+    # Dedicated executor used for the model inference
+    INFERENCE_MAX_WORKERS: int = 4
+    INFERENCE_MAX_QUEUE_SIZE: int = 64  # Pending tasks. Further requests get a 503
+    INFERENCE_TIMEOUT_S: float = 10.0  # Requests taking longer get a 504
+
+    # Streaming (NDJSON) predictions
+    STREAM_CHUNK_ROWS: int = 10_000
+
     # BACKEND_CORS_ORIGINS is a comma-separated list of origins
     BACKEND_CORS_ORIGINS: tp.List[AnyHttpUrl] = [
         "http://localhost:3000",  # type: ignore
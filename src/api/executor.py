@@ -0,0 +1,107 @@
+"""
+This module contains the executor used to run the model inference. It's a
+dedicated thread pool (separate from the default threadpool that serves the
+other endpoints) with a limit on the number of pending tasks and a timeout.
+
+author: Chinedu Ezeofor
+"""
+import asyncio
+import typing as tp
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from loguru import logger
+
+
+class ExecutorBusyError(RuntimeError):
+    """Raised when the inference executor has too many pending tasks."""
+
+
+class InferenceTimeoutError(TimeoutError):
+    """Raised when an inference task doesn't complete before the timeout."""
+
+
+class InferenceExecutor:
+    """Bounded thread pool used to run the model inference.
+
+    Params:
+    -------
+    max_workers (int): The number of threads.
+    max_queue_size (int): The maximum number of tasks waiting for a thread.
+        New tasks are rejected with ExecutorBusyError when the queue is full.
+    timeout (float): The time (in seconds) to wait for the result of a task.
+    """
+
+    def __init__(self, *, max_workers: int, max_queue_size: int, timeout: float) -> None:
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.timeout = timeout
+        self._executor: tp.Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._n_pending = 0  # Queued + running tasks
+
+    @property
+    def n_pending(self) -> int:
+        return self._n_pending
+
+    def start(self) -> None:
+        """This creates the thread pool."""
+        with self._lock:
+            self._start()
+
+    def _start(self) -> ThreadPoolExecutor:
+        """This creates the thread pool if it doesn't exist and returns it. The
+        caller must hold the lock."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="inference"
+            )
+            logger.info(
+                f"Started inference executor (max_workers={self.max_workers}, "
+                f"max_queue_size={self.max_queue_size}) ..."
+            )
+        return self._executor
+
+    def shutdown(self) -> None:
+        """This waits for the pending tasks and shuts down the thread pool."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+            logger.info("Stopped inference executor ...")
+
+    def submit(self, func: tp.Callable, *args: tp.Any, **kwargs: tp.Any) -> Future:
+        """This schedules `func(*args, **kwargs)` and returns its Future.
+
+        Raises:
+        -------
+        ExecutorBusyError: If the queue of the executor is full.
+        """
+        with self._lock:
+            if self._n_pending >= self.max_workers + self.max_queue_size:
+                raise ExecutorBusyError("The inference queue is full")
+            future = self._start().submit(func, *args, **kwargs)
+            self._n_pending += 1
+        future.add_done_callback(self._task_done)
+        return future
+
+    def _task_done(self, future: Future) -> None:  # pylint: disable=unused-argument
+        with self._lock:
+            self._n_pending -= 1
+
+    async def wait(self, future: Future) -> tp.Any:
+        """This waits (without blocking the event loop) for the result of a Future.
+
+        Raises:
+        -------
+        InferenceTimeoutError: If the result isn't available before the timeout.
+            The task is cancelled if it hasn't started.
+        """
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+        except asyncio.TimeoutError as err:
+            raise InferenceTimeoutError(f"Inference timed out after {self.timeout}s") from err
+
+    async def run(self, func: tp.Callable, *args: tp.Any, **kwargs: tp.Any) -> tp.Any:
+        """This runs `func(*args, **kwargs)` on the executor and returns the result."""
+        return await self.wait(self.submit(func, *args, **kwargs))
@@ -4,7 +4,7 @@ from fastapi.middleware.cors import CORSMiddleware
 
 # Custom imports
 from src.api.config import settings, setup_app_logging
-from src.api.routes import api_router
+from src.api.routes import batcher, api_router, inference_executor
 
 # Setup logging
 setup_app_logging(config=settings)
@@ -17,6 +17,23 @@ app = FastAPI(
 root_router = APIRouter()
 
 
+@app.on_event("startup")
+def start_inference() -> None:
+    """This starts the inference executor and the micro-batching
+    of the prediction requests."""
+    inference_executor.start()
+    if settings.PREDICT_BATCHING_ENABLED:
+        batcher.start()
+
+
+@app.on_event("shutdown")
+def stop_inference() -> None:
+    """This processes the queued prediction requests and shuts down
+    the micro-batching and the inference executor."""
+    batcher.stop()
+    inference_executor.shutdown()
+
+
 @root_router.get(path="/", status_code=status.HTTP_200_OK)
 def home():
     """This is the default endpoint"""
@@ -4,19 +4,65 @@ and checking the health of the API.
 
 author: Chinedu Ezeofor
 """
+import json
+import asyncio
+import typing as tp
+
 import pandas as pd
 from loguru import logger
-from fastapi import APIRouter, status
+from fastapi import Request, Response, APIRouter, HTTPException, status
+from pydantic import ValidationError  # pylint: disable=no-name-in-module
+from pydantic.errors import DictError, MissingError  # pylint: disable=no-name-in-module
 from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from pydantic.error_wrappers import ErrorWrapper  # pylint: disable=no-name-in-module
 
 # Custom imports
 from src import __version__ as model_version
 from src.predict import make_predictions
+from src.processing.cache import model_registry
+from src.processing.data_manager import validate_input
+from src.api.codecs import (
+    JSON_MEDIA_TYPE,
+    PARQUET_MEDIA_TYPE,
+    BINARY_MEDIA_TYPES,
+    ARROW_STREAM_MEDIA_TYPE,
+    read_table,
+    accepts_arrow,
+    get_media_type,
+    write_json,
+    write_arrow_stream,
+    read_json_columns,
+)
+from src.config.core import config
+from src.api.streaming import (
+    NDJSON_MEDIA_TYPE,
+    NDJSONStreamingResponse,
+    score_chunk,
+    iter_ndjson_chunks,
+)
 from src.api.config import settings
+from src.api.batching import MicroBatcher
+from src.api.executor import ExecutorBusyError, InferenceExecutor, InferenceTimeoutError
 from src.api.schema import APIDetails, InputDataSchema, ResponsePredictSchema
 
 api_router = APIRouter()
 
+# Both are started/stopped with the app.
+# Runs the model inference (separately from the default threadpool).
+inference_executor = InferenceExecutor(
+    max_workers=settings.INFERENCE_MAX_WORKERS,
+    max_queue_size=settings.INFERENCE_MAX_QUEUE_SIZE,
+    timeout=settings.INFERENCE_TIMEOUT_S,
+)
+# Merges the concurrent prediction requests.
+batcher = MicroBatcher(
+    predict_fn=make_predictions,
+    max_batch_size=settings.PREDICT_MAX_BATCH_SIZE,
+    max_delay_ms=settings.PREDICT_MAX_DELAY_MS,
+    executor=inference_executor,
+)
+
 
 @api_router.get(
     path="/health/",
@@ -33,15 +79,101 @@ def health():  # pragma: no cover
     }
 
 
+def _inline_definitions(schema: tp.Dict) -> tp.Dict:
+    """This returns the JSON schema of a Pydantic Model with the nested
+    models inlined (instead of `$ref`s to `definitions`)."""
+    definitions = schema.pop("definitions", {})
+
+    def resolve(node: tp.Any) -> tp.Any:
+        if isinstance(node, dict):
+            if "$ref" in node:
+                return resolve(definitions[node["$ref"].split("/")[-1]])
+            return {key: resolve(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [resolve(value) for value in node]
+        return node
+
+    return resolve(schema)
+
+
+BINARY_SCHEMA = {"schema": {"type": "string", "format": "binary"}}
+PREDICT_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            JSON_MEDIA_TYPE: {"schema": _inline_definitions(InputDataSchema.schema())},
+            ARROW_STREAM_MEDIA_TYPE: BINARY_SCHEMA,
+            PARQUET_MEDIA_TYPE: BINARY_SCHEMA,
+        },
+    }
+}
+
+
+def parse_json_body(body: bytes) -> tp.Union[tp.List[tp.Dict], pd.DataFrame]:
+    """This returns the input data of a JSON body. The errors are raised
+    exactly as FastAPI does for an `InputDataSchema` body parameter.
+
+    The large bodies (at least `PREDICT_MAX_BATCH_SIZE` rows) are decoded straight
+    into columns and validated column by column (`validate_input`). The other
+    bodies are validated row by row with `InputDataSchema` (it's faster for a few
+    rows) and their rows are returned so they can be micro-batched. The large
+    invalid bodies are also validated with `InputDataSchema` to get the errors.
+    """
+    if not body:
+        raise RequestValidationError([ErrorWrapper(MissingError(), loc=("body",))])
+    try:
+        json_body = json.loads(body)
+    except json.JSONDecodeError as err:
+        raise RequestValidationError([ErrorWrapper(err, ("body", err.pos))], body=err.doc) from err
+    if not isinstance(json_body, dict):
+        raise RequestValidationError([ErrorWrapper(DictError(), loc=("body",))], body=json_body)
+
+    rows = json_body.get("inputs")
+    if (
+        isinstance(rows, list)
+        and len(rows) >= settings.PREDICT_MAX_BATCH_SIZE
+        and all(isinstance(row, dict) for row in rows)
+    ):
+        data, errors = validate_input(
+            data=read_json_columns(rows=rows, columns=config.model_config.INPUT_FEATURES)
+        )
+        if not errors:
+            return data
+    try:
+        input_data = InputDataSchema.parse_obj(json_body)
+    except ValidationError as err:
+        raise RequestValidationError([ErrorWrapper(err, ("body",))], body=json_body) from err
+    return jsonable_encoder(input_data.inputs)
+
+
+def predict_binary_body(*, body: bytes, media_type: str) -> tp.Dict:
+    """This returns the predictions of an Arrow IPC stream or a Parquet body."""
+    try:
+        data = read_table(
+            body=body, media_type=media_type, columns=config.model_config.INPUT_FEATURES
+        )
+    except ValueError as err:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(err)) from err
+    return make_predictions(data=data)
+
+
 @api_router.post(
     path="/predict/",
     response_model=ResponsePredictSchema,
     status_code=status.HTTP_200_OK,
+    openapi_extra=PREDICT_REQUEST_BODY,
+    responses={status.HTTP_200_OK: {"content": {ARROW_STREAM_MEDIA_TYPE: BINARY_SCHEMA}}},
 )
-def predict_trip_duration(input_data: InputDataSchema) -> ResponsePredictSchema:
+async def predict_trip_duration(request: Request) -> tp.Any:
     """This endpoint is used for predicting the trip
     duration in minutes.
 
+    The input data can be sent as JSON (`InputDataSchema`), as an Arrow IPC
+    stream (`application/vnd.apache.arrow.stream`) or as a Parquet file
+    (`application/x-parquet`). The binary bodies are validated column by
+    column and aren't micro-batched. The predictions are returned as an Arrow
+    IPC stream (`trip_duration` column) if the Accept header asks for it.
+
     Example:
         >>> "inputs": [
                     {
@@ -58,19 +190,114 @@ def predict_trip_duration(input_data: InputDataSchema) -> ResponsePredictSchema:
         result: 3.12
 
     Params:
-        input_data (InputDataSchema): This is a Pydantic schema for validating
-        the input data.
+        request (Request): The request. Its body contains the input data.
 
     Returns:
-        pred (ResponsePredictSchema): This is a Pydantic schema for validating
-        the output data.
+        pred (Response): The predictions as JSON (`ResponsePredictSchema`)
+        serialized without revalidation. (Or an Arrow IPC stream)
     """
-    # Get the input data
-    input_data = input_data.inputs  # type: ignore
+    media_type = get_media_type(request.headers.get("content-type"))
     logger.info("Fetching data ...")
-    data = pd.DataFrame(jsonable_encoder(input_data))  # Convert to DF
+    body = await request.body()
 
-    # Get prediction
     logger.info("Making predictions on data ...")
-    pred = make_predictions(data=data)
-    return pred  # type: ignore
+    try:
+        if media_type in BINARY_MEDIA_TYPES:
+            future = inference_executor.submit(
+                predict_binary_body, body=body, media_type=media_type
+            )
+        elif media_type == JSON_MEDIA_TYPE or media_type.endswith("+json"):
+            # Decoded and validated off the event loop (large bodies take a while)
+            data = await inference_executor.run(parse_json_body, body)
+            if isinstance(data, pd.DataFrame):
+                future = inference_executor.submit(make_predictions, data=data, validated=True)
+            else:
+                # Merged with the concurrent requests
+                future = batcher.submit(data)
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail=f"Unsupported media type: {media_type!r}",
+            )
+        pred = await inference_executor.wait(future)
+    except ExecutorBusyError as err:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(err)
+        ) from err
+    except InferenceTimeoutError as err:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(err)) from err
+
+    if accepts_arrow(request.headers.get("accept")) and not pred["errors"]:
+        return Response(content=write_arrow_stream(result=pred), media_type=ARROW_STREAM_MEDIA_TYPE)
+    return Response(content=write_json(result=pred), media_type=JSON_MEDIA_TYPE)
+
+
+@api_router.post(
+    path="/predict/stream/",
+    status_code=status.HTTP_200_OK,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {NDJSON_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}}},
+        }
+    },
+    response_class=NDJSONStreamingResponse,
+)
+async def predict_trip_duration_stream(request: Request) -> NDJSONStreamingResponse:
+    """This endpoint is used for predicting the trip duration (in minutes) of
+    a large number of rides. The request body contains one ride (JSON object
+    with the `InputSchema` fields) per line. The rides are scored in chunks of
+    `STREAM_CHUNK_ROWS` rows and the predictions are streamed back as they're
+    ready: one line per ride, in the same order.
+
+    The predictions are sent while the body is read, so the clients sending
+    large bodies must read the response while sending (e.g. in another thread).
+
+    Example:
+        >>> {"DOLocationID": 122, "payment_type": 1, ..., "VendorID": 2}
+            {"DOLocationID": 48, "payment_type": 2, ..., "VendorID": 1}
+        result:
+            {"trip_duration": 3.1}
+            {"trip_duration": 12.4}
+
+    Params:
+        request (Request): The request. Its body contains the NDJSON rides.
+
+    Returns:
+        pred (NDJSONStreamingResponse): The NDJSON predictions. The invalid rides
+        have a null `trip_duration` and their `errors`.
+    """
+
+    async def predictions() -> tp.AsyncIterator[bytes]:
+        offset = 0
+        chunks = iter_ndjson_chunks(request.stream(), chunk_rows=settings.STREAM_CHUNK_ROWS)
+        async for records in chunks:
+            while True:
+                try:
+                    future = inference_executor.submit(
+                        score_chunk, records=records, offset=offset, predict_fn=make_predictions
+                    )
+                    break
+                except ExecutorBusyError:
+                    await asyncio.sleep(0.01)  # Backpressure (the status is already sent)
+            try:
+                yield await inference_executor.wait(future)
+            except InferenceTimeoutError as err:
+                yield json.dumps({"detail": str(err)}).encode() + b"\n"
+                return
+            offset += len(records)
+
+    logger.info("Streaming predictions ...")
+    return NDJSONStreamingResponse(
+        predictions(), headers={"X-Model-Version": model_registry.get_version()}
+    )
+
+
+@api_router.get(
+    path="/metrics/batching/",
+    status_code=status.HTTP_200_OK,
+)
+def batching_metrics() -> tp.Dict:
+    """This displays the realized batch sizes (rows) and the queueing
+    delays (milliseconds) of the micro-batched prediction requests."""
+    return {"enabled": batcher.is_running, **batcher.stats.summary()}
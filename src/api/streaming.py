@@ -0,0 +1,131 @@
+"""
+This module contains the helper functions used by the streaming (NDJSON)
+prediction endpoint. The request body is read in chunks of rows, each chunk is
+scored with `make_predictions` and the predictions are streamed back (one line
+per input ride, in the same order) so the memory doesn't grow with the input size.
+
+author: Chinedu Ezeofor
+"""
+import json
+import typing as tp
+
+import pandas as pd
+from starlette.types import Send, Scope, Receive
+from starlette.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Error of the lines that aren't JSON objects (Pydantic format)
+INVALID_ROW_ERROR = {"msg": "value is not a valid dict", "type": "type_error.dict"}
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """StreamingResponse used when the request body is read while the response
+    is streamed. The default StreamingResponse listens for the client disconnect
+    (by reading the request messages) which would discard the request body.
+    A disconnect is detected while reading the body instead."""
+
+    media_type = NDJSON_MEDIA_TYPE
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def _parse_lines(lines: tp.List[bytes]) -> tp.List[tp.Any]:
+    """This returns the decoded JSON lines. The invalid lines are returned as None."""
+    try:
+        return json.loads(b"[" + b",".join(lines) + b"]")
+    except json.JSONDecodeError:
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                records.append(None)
+        return records
+
+
+async def iter_ndjson_chunks(
+    stream: tp.AsyncIterator[bytes], *, chunk_rows: int
+) -> tp.AsyncIterator[tp.List[tp.Any]]:
+    """This yields the rows of an NDJSON body in chunks of (at most) `chunk_rows` rows.
+
+    Params:
+    -------
+    stream (AsyncIterator[bytes]): The request body. e.g `request.stream()`
+    chunk_rows (int): The number of rows in a chunk.
+
+    Returns:
+    --------
+    records (AsyncIterator[List]): The decoded rows. The lines that aren't
+        valid JSON are returned as None.
+    """
+    buffer, lines = b"", []
+    async for data in stream:
+        buffer += data
+        *complete_lines, buffer = buffer.split(b"\n")
+        lines.extend(line for line in complete_lines if line.strip())
+        while len(lines) >= chunk_rows:
+            yield _parse_lines(lines[:chunk_rows])
+            lines = lines[chunk_rows:]
+
+    if buffer.strip():
+        lines.append(buffer)
+    if lines:
+        yield _parse_lines(lines)
+
+
+def score_chunk(
+    *, records: tp.List[tp.Any], offset: int, predict_fn: tp.Callable[..., tp.Dict]
+) -> bytes:
+    """This returns the NDJSON predictions of a chunk of rows. Each line contains the
+    `trip_duration` of a row, or `null` and the `errors` of the row. The valid rows
+    are scored even if other rows of the chunk are invalid.
+
+    Params:
+    -------
+    records (List): The rows of the chunk.
+    offset (int): The index of the first row of the chunk in the request. It's
+        used in the location of the errors.
+    predict_fn (Callable): Function used to make the predictions.
+        e.g `src.predict.make_predictions`
+
+    Returns:
+    --------
+    lines (bytes): The NDJSON predictions.
+    """
+    errors: tp.Dict[int, tp.List[tp.Dict]] = {
+        row: [{"loc": ["inputs", row], **INVALID_ROW_ERROR}]
+        for row, record in enumerate(records)
+        if not isinstance(record, dict)
+    }
+    predictions: tp.Dict[int, float] = {}
+
+    # The validation errors are reported for every invalid row, so the
+    # valid rows can be scored on the second attempt.
+    for _ in range(2):
+        valid_rows = [row for row in range(len(records)) if row not in errors]
+        if not valid_rows:
+            break
+        result = predict_fn(data=pd.DataFrame([records[row] for row in valid_rows]))
+        if not result["errors"]:
+            predictions = dict(zip(valid_rows, result["trip_duration"]))
+            break
+        for error in json.loads(result["errors"]):
+            row = valid_rows[error["loc"][1]]
+            errors.setdefault(row, []).append({**error, "loc": ["inputs", row, *error["loc"][2:]]})
+
+    lines = []
+    for row in range(len(records)):
+        if row in predictions:
+            lines.append(f'{{"trip_duration": {float(predictions[row])}}}\n')
+            continue
+        row_errors = errors.get(row) or [
+            {"loc": ["inputs", row], "msg": "not scored", "type": "value_error"}
+        ]
+        for error in row_errors:
+            error["loc"][1] += offset  # Index of the row in the request
+        lines.append(json.dumps({"trip_duration": None, "errors": row_errors}) + "\n")
+    return "".join(lines).encode()
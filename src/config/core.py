@@ -37,3 +37,6 @@ def validate_config_file(*, filename: tp.Optional[Path] = None) -> ConfigVars:
 
 
 config = validate_config_file(filename=None)
+DATA_CACHE_FILEPATH = ROOT / config.path_config.DATA_CACHE_DIR
+REMOTE_CACHE_FILEPATH = ROOT / config.path_config.REMOTE_CACHE_DIR
+TRANSFORMER_CACHE_FILEPATH = ROOT / config.path_config.TRANSFORMER_CACHE_DIR
@@ -79,8 +79,23 @@ class ModelConfig(BaseModel):
 
     RANDOM_STATE: int
     TEST_SIZE: float
+    ESTIMATOR: tp.Literal["random_forest", "hist_gradient_boosting"]
     N_ESTIMATORS: int
     MAX_DEPTH: int
+    HGB_MAX_ITER: int
+    HGB_LEARNING_RATE: float
+    HGB_MAX_LEAF_NODES: int
+    HGB_N_ITER_NO_CHANGE: int
+    HGB_VALIDATION_FRACTION: float
+    HGB_CATEGORICAL_VARS: tp.List[str]
+    INCREMENTAL_CHUNK_ROWS: int
+    SEARCH_N_ESTIMATORS: tp.List[int]
+    SEARCH_MAX_DEPTH: tp.List[int]
+    SEARCH_MIN_ROWS: int
+    SEARCH_FACTOR: int
+    EXPERIMENT_NAME: str
+    N_JOBS: int
+    THREAD_LIMIT: tp.Optional[int]
     TARGET: str
     NUMERICAL_VARS: tp.List[str]
     INPUT_FEATURES: tp.List[str]
@@ -102,6 +117,13 @@ class PathConfig(BaseModel):
     MODEL_PATH: str
     TEST_MODEL_PATH: str
     TEST_DATA_WF_NO_TARGET: str
+    DATA_CACHE_DIR: str
+    DATA_CACHE_MAX_BYTES: int
+    REMOTE_CACHE_DIR: str
+    REMOTE_CACHE_MAX_BYTES: int
+    TRANSFORMER_CACHE_DIR: str
+    TRANSFORMER_CACHE_MAX_BYTES: int
+    TRACKING_URI: str
 
 
 class ConfigVars(BaseModel):
@@ -3,71 +3,127 @@ This module is used to orchestrate the model training.
 
 author: Chinedu Ezeofor
 """
+import tempfile
 import typing as tp
 from pathlib import Path
-from datetime import timedelta
 
-from prefect import flow, task, get_run_logger
-from prefect.tasks import task_input_hash
+from prefect import flow, task, get_client, get_run_logger
+from prefect.exceptions import ObjectNotFound
 from prefect.task_runners import ConcurrentTaskRunner
+from prefect.utilities.asyncutils import sync_compatible
 
-from src.train import train_model
+from sklearn.pipeline import Pipeline
+
+from src.train import train_model, train_model_incremental
+from src.search import HalvingConfig, run_search, fit_preprocessing
 
 # Custom Imports
 from src.config.core import config
-from src.utilities.experiment import eval_metrics
-from src.processing.data_manager import load_data, save_model
+from src.utilities.parallel import CPU_BOUND_TAG
+from src.utilities.experiment import Experiment, log_trial, eval_metrics
+from src.processing.data_manager import LOAD_COLUMNS, load_data, save_model
 
 # Create task(s). Use this syntax since the functions were imported.
 load_data = task(load_data, retries=3, retry_delay_seconds=3)  # type: ignore
+# Not cached with `task_input_hash`: the data has new random IDs on each run (so the
+# key never matched) and the key ignored the config. The fitted preprocessing steps
+# are reused by the transformer cache instead (see `train_ML_model_flow`).
 train_model = task(
-    train_model,
-    retries=3,
-    retry_delay_seconds=3,
-    cache_key_fn=task_input_hash,
-    cache_expiration=timedelta(days=1),
+    train_model, tags=[CPU_BOUND_TAG], retries=3, retry_delay_seconds=3
+)  # type: ignore
+train_model_incremental = task(
+    train_model_incremental, tags=[CPU_BOUND_TAG], retries=3, retry_delay_seconds=3
 )  # type: ignore
+fit_preprocessing = task(fit_preprocessing, tags=[CPU_BOUND_TAG])  # type: ignore
+run_search = task(run_search, tags=[CPU_BOUND_TAG])  # type: ignore
+log_trial = task(log_trial, retries=3, retry_delay_seconds=3)  # type: ignore
 eval_metrics = task(eval_metrics, retries=3, retry_delay_seconds=3)  # type: ignore
 save_model = task(save_model, retries=3, retry_delay_seconds=3)  # type: ignore
 
 
+@sync_compatible
+async def ensure_concurrency_limit(*, tag: str = CPU_BOUND_TAG, limit: int = 1) -> bool:
+    """This creates the Prefect concurrency limit of a tag if it's missing. Without
+    it, the tasks tagged with `CPU_BOUND_TAG` of concurrent flows run at the same time.
+
+    Params:
+    -------
+    tag (str, default=CPU_BOUND_TAG): The tag of the tasks.
+    limit (int, default=1): The number of tasks running at the same time.
+
+    Returns:
+    --------
+    created (bool): True if the concurrency limit was missing (and created) else False.
+        An existing limit isn't changed.
+    """
+    async with get_client() as client:
+        try:
+            await client.read_concurrency_limit_by_tag(tag)
+        except ObjectNotFound:
+            await client.create_concurrency_limit(tag=tag, concurrency_limit=limit)
+            return True
+    return False
+
+
+def check_concurrency_limit() -> None:
+    """This creates the concurrency limit of the CPU-bound tasks if it's missing
+    (with a warning in the logs of the flow run)."""
+    if ensure_concurrency_limit(tag=CPU_BOUND_TAG):
+        get_run_logger().warning(
+            f"The concurrency limit of the {CPU_BOUND_TAG!r} tag was missing: created with 1 slot"
+        )
+
+
 @flow(task_runner=ConcurrentTaskRunner)  # type: ignore
 def train_ML_model_flow(
     *,
     filename: Path,
+    incremental: bool = False,
 ) -> tp.Tuple:  # pragma: no cover
     """This is the subflow for training the model.
 
     Params:
     -------
-    filename (Path): Input data filepath.
+    filename (Path): Input data filepath (or glob pattern, e.g. several months).
+    incremental (bool, default=False): If True, the model is trained out of core
+        (see `train_model_incremental`) instead of loading all the data.
 
     Returns:
     --------
     pipe, y_validate, y_pred (Tuple): Tuple containing the pipeline (estimator),
         validation y_values and the predicted values (obtaiined from the estimator)
     """
-    train_data = load_data(filename=filename)
-    pipe, y_validate, y_pred = train_model(train_data=train_data)
+    if incremental:
+        pipe, y_validate, y_pred = train_model_incremental(filename=filename)
+        return pipe, y_validate, y_pred
+
+    # Cached so the retries (and the next runs) don't preprocess the file again
+    train_data = load_data(filename=filename, columns=LOAD_COLUMNS, use_cache=True)
+    # The fitted preprocessing steps are cached too, so retraining only fits the model
+    pipe, y_validate, y_pred = train_model(train_data=train_data, use_cache=True)
     return pipe, y_validate, y_pred
 
 
 @flow(task_runner=ConcurrentTaskRunner)  # type: ignore
-def run_flow(*, filename: Path, save_estimator: bool = True) -> tp.Dict:  # pragma: no cover
+def run_flow(
+    *, filename: Path, save_estimator: bool = True, incremental: bool = False
+) -> tp.Dict:  # pragma: no cover
     """This is the pipeline for running the workflow.
 
     Params:
     -------
     filename (Path): Input data filepath.
     save_estimator (bool) default=True: If true, it saves the model.
+    incremental (bool, default=False): If True, the model is trained out of core.
 
     Returns:
     --------
     None
     """
     logger = get_run_logger()
+    check_concurrency_limit()
     logger.info("Training model ...")
-    pipe, y_validate, y_pred = train_ML_model_flow(filename=filename)
+    pipe, y_validate, y_pred = train_ML_model_flow(filename=filename, incremental=incremental)
 
     if save_estimator:
         save_model(filename=config.path_config.MODEL_PATH, pipe=pipe)
@@ -81,5 +137,70 @@ def run_flow(*, filename: Path, save_estimator: bool = True) -> tp.Dict:  # prag
     return {"status": "success"}
 
 
+@flow(task_runner=ConcurrentTaskRunner)  # type: ignore
+def search_flow(
+    *,
+    filename: Path,
+    halving: tp.Optional[HalvingConfig] = None,
+    tracking_uri: tp.Optional[str] = None,
+    save_estimator: bool = False,
+) -> tp.Dict:  # pragma: no cover
+    """This is the pipeline for searching the hyperparameters of the model (see
+    `run_search`). The preprocessing steps are fitted once, then the candidates are
+    fitted by a pool of processes with successive halving on the training rows.
+    Every trial is logged as an MLFlow run.
+
+    Params:
+    -------
+    filename (Path): Input data filepath.
+    halving (HalvingConfig, default=None): The search space, e.g.
+        `HalvingConfig(search_space={"n_estimators": [10, 100], "max_depth": [6, 10]})`,
+        and the settings of the successive halving. If None, the `SEARCH_*` and the
+        `N_JOBS` of the config are used.
+    tracking_uri (str, default=None): The MLFlow tracking URI. If None, the
+        `TRACKING_URI` of the config is used.
+    save_estimator (bool) default=False: If true, it saves the best pipeline.
+
+    Returns:
+    --------
+    result (Dict): The status, the params and the metrics of the best candidate.
+    """
+    logger = get_run_logger()
+    check_concurrency_limit()
+    train_data = load_data(filename=filename, columns=LOAD_COLUMNS, use_cache=True)
+    with tempfile.TemporaryDirectory() as data_dir:
+        preprocessing = fit_preprocessing(train_data=train_data, data_dir=data_dir)
+        logger.info("Searching hyperparameters ...")
+        trials, model = run_search(data_dir=data_dir, halving=halving)
+
+    experiment = Experiment(
+        experiment_name=config.model_config.EXPERIMENT_NAME,
+        run_name="search",
+        model_name="RF model",
+        tracking_uri=tracking_uri or config.path_config.TRACKING_URI,
+    )
+    for trial in trials:
+        log_trial(
+            experiment=experiment,
+            params={**trial["params"], "n_rows": trial["n_rows"]},
+            metrics=trial["metrics"],
+            tags={"round": trial["round"]},
+        )
+
+    last_round = [trial for trial in trials if trial["round"] == trials[-1]["round"]]
+    best_trial = min(last_round, key=lambda trial: trial["metrics"]["RMSE"])
+    logger.info(f"  Best params: {best_trial['params']}")
+    logger.info(f"  RMSE: {best_trial['metrics']['RMSE']}")
+    if save_estimator:
+        # The task returns the fitted Pipeline (not a Task)
+        steps = preprocessing.steps  # pylint: disable=no-member
+        save_model(
+            filename=config.path_config.MODEL_PATH,
+            pipe=Pipeline(steps=[*steps, ("RF model", model)]),
+        )
+
+    return {"status": "success", "params": best_trial["params"], **best_trial["metrics"]}
+
+
 if __name__ == "__main__":  # pragma: no cover
     run_flow(filename=config.path_config.TRAIN_DATA)
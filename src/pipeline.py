@@ -1,12 +1,16 @@
 """
-This module is used to build the training pipeline.
+This module is used to build the training pipeline. The model (the final step)
+is selected with the `ESTIMATOR` of the config. The fitted preprocessing steps can
+be cached on disk (see `TransformerCache`), so retraining on the same data only
+fits the model.
 
 author: Chinedu Ezeofor
 """
 # Built-in library
+import typing as tp
 import warnings
 
-from sklearn.ensemble import RandomForestRegressor
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
 
 # from Scikit-learn
 from sklearn.pipeline import Pipeline
@@ -19,6 +23,7 @@ from feature_engine.transformation import YeoJohnsonTransformer
 
 # Custom Imports
 import src.processing.feat_engineering as fe
+from src.processing import cache
 from src.config.core import config
 
 warnings.filterwarnings("error")
@@ -28,16 +33,28 @@ params = {
     "n_estimators": config.model_config.N_ESTIMATORS,
     "max_depth": config.model_config.MAX_DEPTH,
     "random_state": config.model_config.RANDOM_STATE,
+    "n_jobs": config.model_config.N_JOBS,
 }
+hgb_params = {
+    "max_iter": config.model_config.HGB_MAX_ITER,
+    "learning_rate": config.model_config.HGB_LEARNING_RATE,
+    "max_leaf_nodes": config.model_config.HGB_MAX_LEAF_NODES,
+    "early_stopping": True,
+    "n_iter_no_change": config.model_config.HGB_N_ITER_NO_CHANGE,
+    "validation_fraction": config.model_config.HGB_VALIDATION_FRACTION,
+    "categorical_features": config.model_config.HGB_CATEGORICAL_VARS,
+    "random_state": config.model_config.RANDOM_STATE,
+}
+ESTIMATORS = ("random_forest", "hist_gradient_boosting")
 
 
-# Build Train Pipeline
-rf_pipe = Pipeline(
-    steps=[
+def _build_features_steps() -> tp.List[tp.Tuple[str, tp.Any]]:
+    """This returns the feature engineering steps shared by the models."""
+    return [
         # ===== Select input features =====
         (
             "input vars",
-            fe.SelectFeatures(features=config.model_config.INPUT_FEATURES),
+            fe.SelectFeatures(features=config.model_config.INPUT_FEATURES, copy=False),
         ),
         # ===== Add NaN flags =====
         (
@@ -52,35 +69,85 @@ rf_pipe = Pipeline(
             ),
         ),
         # ===== Create new features =====
+        # (copy=False is safe: the imputer returns a new DF)
         (
-            "cal day_of_week",
-            fe.CalculateDayOfWeek(feature=config.model_config.TEMPORAL_VAR),
-        ),
-        (
-            "cal hour_of_day",
-            fe.CalculateHourOfDay(feature=config.model_config.TEMPORAL_VAR),
+            "cal temporal features",
+            fe.CalculateTemporalFeatures(feature=config.model_config.TEMPORAL_VAR, copy=False),
         ),
         # ===== Select features =====
         (
             "important vars",
-            fe.SelectFeatures(features=config.model_config.IMPORTANT_FEATURES),
+            fe.SelectFeatures(features=config.model_config.IMPORTANT_FEATURES, copy=False),
         ),
         # ===== Drop features =====
         (
             "drop features",
             DropFeatures(features_to_drop=config.model_config.VARS_TO_DROP),
         ),
-        # ===== Transform features =====
-        (
-            "YeoJohnson transformation",
-            YeoJohnsonTransformer(variables=config.model_config.VARS_TO_LOG_TRANSFORM),
-        ),
-        # ===== Scale features =====
-        ("scale data", StandardScaler()),
-        # ===== Random Forest model =====
-        (
-            "RF model",
-            RandomForestRegressor(**params),
-        ),
     ]
-)
+
+
+def build_pipeline(
+    *,
+    estimator: tp.Optional[str] = None,
+    model_params: tp.Optional[tp.Dict] = None,
+    use_cache: bool = False,
+) -> Pipeline:
+    """This returns a new (unfitted) training pipeline.
+
+    Params:
+    -------
+    estimator (str, default=None): The model. "random_forest" or
+        "hist_gradient_boosting" (the location IDs are native categories and the
+        number of iterations is found with early stopping). If None, the
+        `ESTIMATOR` of the config is used.
+    model_params (Dict, default=None): Hyperparameters of the model replacing the
+        ones of the config. e.g `{"max_depth": 12}`
+    use_cache (bool, default=False): If True, the fitted preprocessing steps are read
+        from (or saved in) the `transformer_cache`, i.e. a step is only fitted when
+        its params or its input data change. Only meant for retraining (e.g the
+        training flow): the inputs of the steps are hashed on every fit.
+
+    Returns:
+    --------
+    pipe (Pipeline): The pipeline.
+    """
+    if estimator is None:
+        estimator = config.model_config.ESTIMATOR
+    steps = _build_features_steps()
+
+    if estimator == "random_forest":
+        steps += [
+            # ===== Transform features =====
+            (
+                "YeoJohnson transformation",
+                YeoJohnsonTransformer(variables=config.model_config.VARS_TO_LOG_TRANSFORM),
+            ),
+            # ===== Scale features =====
+            ("scale data", StandardScaler()),
+            # ===== Random Forest model =====
+            ("RF model", RandomForestRegressor(**{**params, **(model_params or {})})),
+        ]
+    elif estimator == "hist_gradient_boosting":
+        steps += [
+            # ===== Encode the location IDs (codes less than max_bins) =====
+            # (copy=False is safe: DropFeatures returns a new DF)
+            (
+                "encode categorical vars",
+                fe.OrdinalEncodeFrequent(
+                    variables=config.model_config.HGB_CATEGORICAL_VARS, copy=False
+                ),
+            ),
+            # ===== Histogram gradient boosting model =====
+            (
+                "HGB model",
+                HistGradientBoostingRegressor(**{**hgb_params, **(model_params or {})}),
+            ),
+        ]
+    else:
+        raise ValueError(f"Unsupported estimator: {estimator!r}. Use one of {ESTIMATORS}")
+    return Pipeline(steps=steps, memory=cache.transformer_cache if use_cache else None)
+
+
+# The Random Forest pipeline (use `build_pipeline` to get a new pipeline)
+rf_pipe = build_pipeline(estimator="random_forest")
@@ -10,27 +10,40 @@ import pandas as pd
 
 # Custom Imports
 from src.config.core import config
-from src.processing.data_manager import load_model, load_version, validate_input
+from src.processing.forest import export_forest
+from src.processing.inference_plan import compile_pipeline
+from src.processing.cache import model_registry
+from src.processing.data_manager import validate_input
 
 
-def make_predictions(*, data: pd.DataFrame) -> tp.Dict:
+def make_predictions(
+    *, data: pd.DataFrame, compiled: bool = False, validated: bool = False
+) -> tp.Dict:
     """This returns the predictions.
 
     Params:
     -------
     data (Pandas DF): DF containing the input data.
+    compiled (bool, default=False): If True, the features are computed with the
+        fused inference plan (`src.processing.inference_plan`) and the Random Forest
+        is scored with the flat-array engine (`src.processing.forest`).
+    validated (bool, default=False): If True, the data was already validated
+        with `validate_input` (e.g the large JSON bodies of the API) and isn't
+        validated again.
 
     Returns:
     --------
     result (Dict): A dict containing the trip_duration,
             model_version and the possible errors.
     """
-    data = data.copy()
-    _version = load_version()
-    _model = load_model(filename=config.path_config.MODEL_PATH)
+    _version = model_registry.get_version()
+    _model = model_registry.get_model(filename=config.path_config.MODEL_PATH)
 
     # Validate data
-    validated_data, errors = validate_input(data=data)
+    if validated:
+        validated_data, errors = data, None
+    else:
+        validated_data, errors = validate_input(data=data)
 
     result = {
         "trip_duration": None,
@@ -40,11 +53,25 @@ def make_predictions(*, data: pd.DataFrame) -> tp.Dict:
 
     if not errors:
         # Make predictions
-        pred = _model.predict(validated_data)
-        pred = list(np.expm1(pred))  # Convert from log to minutes
+        if compiled:
+            plan = model_registry.get_compiled(
+                filename=config.path_config.MODEL_PATH, compiler=compile_pipeline
+            )
+            try:
+                forest = model_registry.get_compiled(
+                    filename=config.path_config.MODEL_PATH, compiler=export_forest
+                )
+            except NotImplementedError:  # Not a Random Forest (e.g gradient boosting)
+                pred = plan.predict(validated_data)
+            else:
+                pred = forest.predict(plan.transform(validated_data))
+        else:
+            pred = _model.predict(validated_data)
+        # Convert from log to minutes. Same rounding as `round(x, 1)` of each np.float64
+        pred = np.round(np.expm1(pred), 1)
 
         result = {
-            "trip_duration": [(round(x, 1)) for x in pred],  # type: ignore
+            "trip_duration": pred.tolist(),
             "model_version": _version,
             "errors": errors,
         }
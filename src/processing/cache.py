@@ -0,0 +1,806 @@
+"""
+This module contains the caches used to load the data and the models: the
+trained pipelines (in memory), the preprocessed datasets, the blocks of the
+remote files and the fitted transformers of the pipelines (on disk).
+
+author: Chinedu Ezeofor
+"""
+import io
+import os
+import json
+import hashlib
+import logging
+import weakref
+import functools
+import threading
+import typing as tp
+from pathlib import Path
+from collections import OrderedDict
+
+# Standard imports
+import fsspec
+import numpy as np
+import joblib
+import pandas as pd
+import pyarrow as pa
+import sklearn
+from pyarrow import feather
+from sklearn.pipeline import Pipeline
+from fsspec.implementations.local import LocalFileSystem
+
+# Custom Imports
+from src.config.core import (
+    SRC_ROOT,
+    DATA_CACHE_FILEPATH,
+    REMOTE_CACHE_FILEPATH,
+    TRANSFORMER_CACHE_FILEPATH,
+    TRAINED_MODELS_FILEPATH,
+    config,
+)
+from src.utilities.parallel import set_n_jobs
+from src.processing.feat_engineering import SelectFeatures
+
+logger = logging.getLogger()  # Configured by `data_manager.custom_logger`
+Estimator = tp.Union[Pipeline, tp.Any]  # Alias for estimator
+
+
+def _get_data_manager() -> tp.Any:
+    """This returns the `data_manager` module (it imports this module, so it's
+    imported when a model is loaded instead of when this module is imported)."""
+    # pylint: disable=import-outside-toplevel
+    from src.processing import data_manager as _data_manager
+
+    return _data_manager
+
+
+def get_arrow_strings(data: pd.DataFrame) -> tp.Dict[str, int]:
+    """This returns the position of the string[pyarrow] columns of the data."""
+    return {
+        col: loc
+        for loc, (col, dtype) in enumerate(data.dtypes.items())
+        if dtype == "string[pyarrow]"
+    }
+
+
+def read_arrow_strings(table: pa.Table) -> tp.Dict[str, int]:
+    """This returns the position of the columns of an Arrow table (see `pandas_to_table`)
+    restored as string[pyarrow] (the other str columns are restored as Python strs)."""
+    return json.loads((table.schema.metadata or {}).get(ARROW_STRINGS_KEY, b"{}"))
+
+
+def pandas_to_table(
+    data: pd.DataFrame, *, arrow_strings: tp.Optional[tp.Dict[str, int]] = None
+) -> pa.Table:
+    """This converts a DF (with its index) to an Arrow table. The position of the
+    `arrow_strings` columns (by default the string[pyarrow] columns) is saved in the
+    metadata of the table."""
+    if arrow_strings is None:
+        arrow_strings = get_arrow_strings(data)
+    table = pa.Table.from_pandas(data)
+    pandas_metadata = table.schema.pandas_metadata
+    for column in pandas_metadata["columns"]:
+        if column["numpy_type"] == "string" and column["name"] not in arrow_strings:
+            column["numpy_type"] = "object"  # Restored as Python strs
+    return table.replace_schema_metadata(
+        {
+            b"pandas": json.dumps(pandas_metadata).encode(),
+            ARROW_STRINGS_KEY: json.dumps(arrow_strings).encode(),
+        }
+    )
+
+
+def table_to_pandas(table: pa.Table, *, arrow_strings: tp.Dict[str, int]) -> pd.DataFrame:
+    """This converts an Arrow table to a DF. The `arrow_strings` columns (name: position)
+    are restored as string[pyarrow] (without creating Python strs)."""
+    data = table.drop(list(arrow_strings)).to_pandas(split_blocks=True, deduplicate_objects=False)
+    for col, loc in sorted(arrow_strings.items(), key=lambda item: item[1]):
+        data.insert(loc, col, pd.arrays.ArrowStringArray(table.column(col)))
+    return data
+
+
+MODEL_CACHE_MAX_BYTES = 1024**3  # 1 GiB
+
+
+class ModelRegistry:
+    """In-process cache of the trained pipelines and the model version.
+
+    Entries are keyed by the resolved filepath and validated against the file's
+    mtime and size, so a pipeline is only deserialized again when the artifact
+    on disk changes. The on-disk size of each artifact is used as an estimate of
+    its memory footprint and the least recently used entries are evicted once
+    the total exceeds `max_bytes`. The most recently loaded model is always kept.
+
+    Params:
+    -------
+    max_bytes (int, default=MODEL_CACHE_MAX_BYTES): The memory budget in bytes.
+    """
+
+    def __init__(self, *, max_bytes: int = MODEL_CACHE_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._models: "OrderedDict[Path, tp.Tuple[tp.Tuple[int, int], Estimator, tp.Dict]]" = (
+            OrderedDict()
+        )
+        self._version: tp.Optional[tp.Tuple[tp.Tuple[int, int], str]] = None
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _get_key(filename: Path) -> tp.Tuple[int, int]:
+        """This returns the (mtime, size) used to detect a changed artifact."""
+        stat = filename.stat()
+        return (stat.st_mtime_ns, stat.st_size)
+
+    @property
+    def total_bytes(self) -> int:
+        """This returns the estimated size of the cached models in bytes."""
+        return sum(key[1] for key, *_ in self._models.values())
+
+    def get_model(self, *, filename: tp.Union[str, Path]) -> Estimator:
+        """This returns the trained model, loading it only if it's not cached
+        or the artifact has changed since it was loaded."""
+        filepath = (TRAINED_MODELS_FILEPATH / filename).resolve()
+        key = self._get_key(filepath)
+
+        with self._lock:
+            entry = self._models.get(filepath)
+            if entry is not None and entry[0] == key:
+                self._models.move_to_end(filepath)
+                return entry[1]
+
+            # The API scores the requests on several threads, each model uses one CPU
+            trained_model = set_n_jobs(_get_data_manager().load_model(filename=filepath), 1)
+            self._models[filepath] = (key, trained_model, {})
+            self._models.move_to_end(filepath)
+            self._evict()
+        return trained_model
+
+    def get_compiled(
+        self, *, filename: tp.Union[str, Path], compiler: tp.Callable[[Estimator], tp.Any]
+    ) -> tp.Any:
+        """This returns `compiler(trained_model)`. The result is cached with the
+        model and it's discarded when the model is reloaded or evicted.
+
+        Params:
+        -------
+        filename (Path): The model filepath.
+        compiler (Callable): Function used to compile the trained model.
+            e.g `src.processing.forest.export_forest`
+
+        Returns:
+        --------
+        compiled_model (Any): The compiled model.
+        """
+        filepath = (TRAINED_MODELS_FILEPATH / filename).resolve()
+
+        with self._lock:
+            trained_model = self.get_model(filename=filename)
+            compiled_models = self._models[filepath][2]
+            if compiler not in compiled_models:
+                compiled_models[compiler] = compiler(trained_model)
+            return compiled_models[compiler]
+
+    def get_version(self) -> str:
+        """This returns the model version, reading the VERSION file only
+        when it has changed."""
+        key = self._get_key(SRC_ROOT / "VERSION")
+
+        with self._lock:
+            if self._version is None or self._version[0] != key:
+                self._version = (key, _get_data_manager().load_version())
+            return self._version[1]
+
+    def _evict(self) -> None:
+        """This removes the least recently used models until the cache fits
+        in the memory budget."""
+        while len(self._models) > 1 and self.total_bytes > self.max_bytes:
+            filepath, _ = self._models.popitem(last=False)
+            logger.info(f"Evicted model {filepath.name!r} from the cache ...")
+
+    def clear(self) -> None:
+        """This removes all the cached models and the model version."""
+        with self._lock:
+            self._models.clear()
+            self._version = None
+
+
+model_registry = ModelRegistry()
+
+
+# Bump it when the preprocessing changes so the cached datasets aren't used
+DATA_CACHE_VERSION = 1
+ARROW_STRINGS_KEY = b"arrow_strings"  # Feather metadata: the string[pyarrow] columns
+# Rows per record batch of the Feather files (a single batch is read zero-copy)
+DATA_CACHE_CHUNK_ROWS = 10_000_000
+
+
+class DatasetCache:
+    """On-disk cache of the preprocessed datasets (uncompressed Feather files).
+
+    Entries are keyed by the content hash of the source file and the preprocessing
+    parameters, so a dataset is only preprocessed again when the file or the
+    parameters change. The files are read memory-mapped. The least recently used
+    entries are removed once the total size of the files exceeds `max_bytes`.
+    The most recently written entry is always kept.
+
+    Params:
+    -------
+    cache_dir (Path, default=DATA_CACHE_FILEPATH): The directory of the cached datasets.
+    max_bytes (int, default=DATA_CACHE_MAX_BYTES): The disk budget in bytes.
+    """
+
+    def __init__(
+        self,
+        *,
+        cache_dir: tp.Union[str, Path] = DATA_CACHE_FILEPATH,
+        max_bytes: int = config.path_config.DATA_CACHE_MAX_BYTES,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        # Content hash of the local files keyed by (path, mtime, size)
+        self._digests: tp.Dict[tp.Tuple[str, int, int], str] = {}
+        self._lock = threading.RLock()
+
+    def _get_digest(self, filename: str) -> str:
+        """This returns the content hash (SHA-256) of a local file or the checksum
+        (e.g from the ETag) of a remote file. The hash of a local file is only
+        computed again when its mtime or size changes."""
+        fs, path = fsspec.core.url_to_fs(filename)
+        if not isinstance(fs, LocalFileSystem):
+            return f"{fs.protocol}:{fs.checksum(path)}"
+
+        stat = os.stat(path)
+        key = (str(Path(path).resolve()), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if key not in self._digests:
+                digest = hashlib.sha256()
+                with open(path, "rb") as file:
+                    while block := file.read(1 << 20):
+                        digest.update(block)
+                self._digests[key] = digest.hexdigest()
+            return self._digests[key]
+
+    def get_key(self, *, filename: str, params: tp.Dict[str, tp.Any]) -> str:
+        """This returns the key of a dataset: a hash of the source file's content
+        hash and of the (JSON serializable) preprocessing parameters."""
+        payload = json.dumps(
+            {
+                "source": self._get_digest(filename),
+                "params": params,
+                "version": DATA_CACHE_VERSION,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get_filepath(self, key: str) -> Path:
+        """This returns the filepath of a cached dataset."""
+        return self.cache_dir / f"{key}.feather"
+
+    def get_table(self, *, key: str) -> tp.Optional[pa.Table]:
+        """This returns the cached dataset as a (memory-mapped) Arrow table or
+        None if it's not cached."""
+        filepath = self.get_filepath(key)
+        try:
+            table = feather.read_table(filepath, memory_map=True)
+            os.utime(filepath)  # Mark the entry as recently used
+        except FileNotFoundError:
+            return None
+        logger.info(f"Loaded the cached dataset {filepath.name!r} ...")
+        return table
+
+    def get(self, *, key: str) -> tp.Optional[pd.DataFrame]:
+        """This returns the cached dataset or None if it's not cached."""
+        table = self.get_table(key=key)
+        if table is None:
+            return None
+        return table_to_pandas(table, arrow_strings=read_arrow_strings(table))
+
+    def put_table(self, *, key: str, table: pa.Table) -> None:
+        """This saves the dataset (an Arrow table converted from a DF, see `put`) in
+        the cache and removes the least recently used datasets if the cache exceeds
+        its budget."""
+        filepath = self.get_filepath(key)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # Written to a temporary file first so a partly written file is never read
+        tmp_filepath = filepath.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        feather.write_feather(
+            table, tmp_filepath, compression="uncompressed", chunksize=DATA_CACHE_CHUNK_ROWS
+        )
+        os.replace(tmp_filepath, filepath)
+        self._evict(keep=filepath)
+
+    def put(self, *, key: str, data: pd.DataFrame) -> None:
+        """This saves the dataset in the cache (see `put_table`)."""
+        self.put_table(key=key, table=pandas_to_table(data))
+
+    @property
+    def total_bytes(self) -> int:
+        """This returns the size of the cached datasets in bytes."""
+        return sum(filepath.stat().st_size for filepath in self.cache_dir.glob("*.feather"))
+
+    def _evict(self, *, keep: Path) -> None:
+        """This removes the least recently used datasets until the cache fits
+        in the disk budget."""
+        entries = sorted(
+            (filepath.stat().st_mtime_ns, filepath.stat().st_size, filepath)
+            for filepath in self.cache_dir.glob("*.feather")
+        )
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, filepath in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            if filepath != keep:
+                filepath.unlink(missing_ok=True)
+                total_bytes -= size
+                logger.info(f"Evicted dataset {filepath.name!r} from the cache ...")
+
+    def clear(self) -> None:
+        """This removes all the cached datasets."""
+        for filepath in self.cache_dir.glob("*.feather"):
+            filepath.unlink(missing_ok=True)
+
+
+dataset_cache = DatasetCache()
+
+
+REMOTE_BLOCK_BYTES = 4 * 1024**2  # Bytes per ranged read (and cached block) of a remote file
+
+
+class CachedRemoteFile(io.RawIOBase):
+    """Read-only file object of a remote file whose bytes are read through a
+    `RemoteFileCache` (see `RemoteFileCache.open`)."""
+
+    def __init__(
+        self, *, cache: "RemoteFileCache", fs: tp.Any, path: str, key: str, size: int
+    ) -> None:
+        super().__init__()
+        self._cache, self._fs, self._path = cache, fs, path
+        self.key, self.size = key, size
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        start = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: self.size}[whence]
+        self._position = max(start + offset, 0)
+        return self._position
+
+    def read(self, size: tp.Optional[int] = -1) -> bytes:
+        end = self.size if size is None or size < 0 else min(self._position + size, self.size)
+        if end <= self._position:
+            return b""
+        data = self._cache.read_range(
+            fs=self._fs, path=self._path, key=self.key, start=self._position, end=end
+        )
+        self._position = end
+        return data
+
+    def readinto(self, buffer: tp.Any) -> int:
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+class RemoteFileCache:
+    """On-disk read-through cache of remote files (e.g S3 objects).
+
+    A remote file is read in blocks of `block_bytes` with ranged requests, so only the
+    blocks that are read are downloaded and saved (e.g the footer of a Parquet file and
+    the column chunks of the row groups that are needed). Entries are keyed by the URI
+    and the version of the file (its ETag or else its size and mtime), i.e. the blocks
+    are downloaded again once the remote file changes. The least recently used blocks
+    are removed once the total size of the blocks exceeds `max_bytes`. The blocks that
+    were just downloaded are always kept.
+
+    Params:
+    -------
+    cache_dir (Path, default=REMOTE_CACHE_FILEPATH): The directory of the cached blocks.
+    max_bytes (int, default=REMOTE_CACHE_MAX_BYTES): The disk budget in bytes.
+    block_bytes (int, default=REMOTE_BLOCK_BYTES): The size of a block in bytes.
+    """
+
+    def __init__(
+        self,
+        *,
+        cache_dir: tp.Union[str, Path] = REMOTE_CACHE_FILEPATH,
+        max_bytes: int = config.path_config.REMOTE_CACHE_MAX_BYTES,
+        block_bytes: int = REMOTE_BLOCK_BYTES,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.block_bytes = block_bytes
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _get_version(info: tp.Dict[str, tp.Any]) -> str:
+        """This returns the version of a remote file from its info: the ETag if the
+        filesystem has one (e.g S3) or else the size and the modification time."""
+        etag = info.get("ETag") or info.get("etag")
+        if etag:
+            return "etag:" + str(etag).strip('"')
+        mtime = info.get("mtime") or info.get("LastModified") or info.get("created")
+        return f"size:{info['size']}:mtime:{mtime}"
+
+    def open(self, filename: str) -> CachedRemoteFile:
+        """This returns a file object reading the remote file through the cache. Only
+        the info of the file (e.g a HEAD request) is requested to validate the cached blocks.
+
+        Params:
+        -------
+        filename (str): The URI of the file.
+
+        Returns:
+        --------
+        file (CachedRemoteFile): The (seekable) file object.
+        """
+        fs, path = fsspec.core.url_to_fs(filename)
+        info = fs.info(path)
+        payload = f"{fs.unstrip_protocol(path)}|{self._get_version(info)}"
+        key = hashlib.sha256(payload.encode()).hexdigest()
+        return CachedRemoteFile(cache=self, fs=fs, path=path, key=key, size=info["size"])
+
+    def get_filepath(self, *, key: str, block: int) -> Path:
+        """This returns the filepath of a cached block of a remote file."""
+        return self.cache_dir / key / f"{block}.block"
+
+    def read_range(self, *, fs: tp.Any, path: str, key: str, start: int, end: int) -> bytes:
+        """This returns the bytes [start, end) of a remote file. The missing blocks are
+        downloaded (one ranged request per run of consecutive missing blocks) and saved.
+
+        Params:
+        -------
+        fs (fsspec.AbstractFileSystem): The filesystem of the remote file.
+        path (str): The path of the remote file in the filesystem.
+        key (str): The key of the remote file (see `open`).
+        start (int): The first byte.
+        end (int): The byte after the last one.
+
+        Returns:
+        --------
+        data (bytes): The bytes of the range.
+        """
+        first_block, last_block = start // self.block_bytes, (end - 1) // self.block_bytes
+        blocks: tp.Dict[int, bytes] = {}
+        for block in range(first_block, last_block + 1):
+            filepath = self.get_filepath(key=key, block=block)
+            try:
+                blocks[block] = filepath.read_bytes()
+                os.utime(filepath)  # Mark the block as recently used
+            except FileNotFoundError:
+                pass
+
+        missing = [block for block in range(first_block, last_block + 1) if block not in blocks]
+        if missing:
+            blocks.update(self._download_blocks(fs=fs, path=path, key=key, blocks=missing))
+            self._evict(keep={self.get_filepath(key=key, block=block) for block in missing})
+
+        offset = start - first_block * self.block_bytes
+        return b"".join(blocks[block] for block in range(first_block, last_block + 1))[
+            offset : offset + end - start
+        ]
+
+    def _download_blocks(
+        self, *, fs: tp.Any, path: str, key: str, blocks: tp.List[int]
+    ) -> tp.Dict[int, bytes]:
+        """This downloads the (sorted) blocks of a remote file with one ranged request
+        per run of consecutive blocks, saves them and returns them."""
+        runs: tp.List[tp.List[int]] = []
+        for block in blocks:
+            if runs and runs[-1][-1] == block - 1:
+                runs[-1].append(block)
+            else:
+                runs.append([block])
+
+        downloaded = {}
+        for run in runs:
+            data = fs.cat_file(
+                path, start=run[0] * self.block_bytes, end=(run[-1] + 1) * self.block_bytes
+            )
+            for idx, block in enumerate(run):
+                downloaded[block] = data[idx * self.block_bytes : (idx + 1) * self.block_bytes]
+                self._put_block(key=key, block=block, data=downloaded[block])
+            logger.info(f"Downloaded {len(data):,} bytes of {path!r} ...")
+        return downloaded
+
+    def _put_block(self, *, key: str, block: int, data: bytes) -> None:
+        """This saves a block of a remote file."""
+        filepath = self.get_filepath(key=key, block=block)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        # Written to a temporary file first so a partly written block is never read
+        tmp_filepath = filepath.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_filepath.write_bytes(data)
+        os.replace(tmp_filepath, filepath)
+
+    @property
+    def total_bytes(self) -> int:
+        """This returns the size of the cached blocks in bytes."""
+        return sum(filepath.stat().st_size for filepath in self.cache_dir.glob("*/*.block"))
+
+    def _evict(self, *, keep: tp.Set[Path]) -> None:
+        """This removes the least recently used blocks until the cache fits in the
+        disk budget."""
+        with self._lock:
+            entries = sorted(
+                (filepath.stat().st_mtime_ns, filepath.stat().st_size, filepath)
+                for filepath in self.cache_dir.glob("*/*.block")
+            )
+            total_bytes = sum(size for _, size, _ in entries)
+            n_evicted = 0
+            for _, size, filepath in entries:
+                if total_bytes <= self.max_bytes:
+                    break
+                if filepath not in keep:
+                    filepath.unlink(missing_ok=True)
+                    total_bytes -= size
+                    n_evicted += 1
+            if n_evicted:
+                logger.info(f"Evicted {n_evicted} blocks of remote files from the cache ...")
+
+    def clear(self) -> None:
+        """This removes all the cached blocks."""
+        for filepath in self.cache_dir.glob("*/*.block"):
+            filepath.unlink(missing_ok=True)
+
+
+remote_file_cache = RemoteFileCache()
+
+
+# Bump it when the custom transformers change so the cached transformers aren't used
+TRANSFORMER_CACHE_VERSION = 1
+RAW_BYTES_KINDS = "biufcmM"  # The dtype kinds hashed as raw bytes (numbers and datetimes)
+
+
+def _update_digest(digest: tp.Any, values: tp.Union[pd.Series, pd.Index]) -> None:
+    """This updates the hash with the values of a column (or an index)."""
+    array = values.to_numpy()
+    if array.dtype.kind in RAW_BYTES_KINDS:
+        digest.update(np.ascontiguousarray(array).view(np.uint8))
+        return
+    try:
+        arrow_array = pa.array(array, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):  # e.g mixed types
+        digest.update(pd.util.hash_array(array, categorize=False))
+        return
+    digest.update(str(arrow_array.type).encode())
+    for buffer in arrow_array.buffers():
+        digest.update(b"" if buffer is None else buffer)
+
+
+def get_data_digest(data: tp.Any) -> str:
+    """This returns the content hash (SHA-256) of a DF, a Series or an array. The numeric
+    and datetime columns are hashed as raw bytes and the other columns (e.g the string
+    IDs) as the buffers of Arrow arrays, which is several times faster than `joblib.hash`.
+
+    Params:
+    -------
+    data (Pandas DF, Series, Numpy array or Any): The data. Other objects (e.g None)
+        are hashed with `joblib.hash`.
+
+    Returns:
+    --------
+    digest (str): The content hash.
+    """
+    if isinstance(data, pd.Series):
+        data = data.to_frame()
+    digest = hashlib.sha256()
+    if isinstance(data, np.ndarray) and data.dtype.kind in RAW_BYTES_KINDS:
+        digest.update(f"{data.dtype.str}{data.shape}".encode())
+        digest.update(np.ascontiguousarray(data).view(np.uint8))
+        return digest.hexdigest()
+    if not isinstance(data, pd.DataFrame):
+        return joblib.hash(data)
+
+    digest.update(repr([(str(col), str(dtype)) for col, dtype in data.dtypes.items()]).encode())
+    _update_digest(digest, data.index)
+    for _, values in data.items():
+        _update_digest(digest, values)
+    return digest.hexdigest()
+
+
+class TransformerCache:
+    """On-disk cache of the fitted transformers of the pipelines (the `memory` of a
+    `Pipeline`, see `build_pipeline`).
+
+    `Pipeline.fit` fits each step but the last with `cache(func)(transformer, X, y, ...)`,
+    which returns the transformed X and the fitted transformer. Entries are keyed by the
+    params of the (unfitted) transformer and the content hash of X and y, so a step is
+    only fitted again when its params or its input data change, e.g a pipeline trained
+    again with other model hyperparameters only fits the model. The input of a step is
+    the output of the previous step, so its content hash is the key of the previous step
+    (only the input of the first step is hashed).
+
+    Only the fitted transformers are saved: a loaded transformer transforms X again,
+    which is faster than reading the transformed X (i.e `fit_transform` must be `fit`
+    followed by `transform`, as for the steps of `build_pipeline`). The least recently
+    used entries are removed once the total size of the files exceeds `max_bytes`. The
+    most recently written entry is always kept.
+
+    Params:
+    -------
+    cache_dir (Path, default=TRANSFORMER_CACHE_FILEPATH): The directory of the cached
+        transformers.
+    max_bytes (int, default=TRANSFORMER_CACHE_MAX_BYTES): The disk budget in bytes.
+    """
+
+    def __init__(
+        self,
+        *,
+        cache_dir: tp.Union[str, Path] = TRANSFORMER_CACHE_FILEPATH,
+        max_bytes: int = config.path_config.TRANSFORMER_CACHE_MAX_BYTES,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # The outputs of the steps (the inputs of the next steps) keyed by their id:
+        # (output, y, key of the step, hash of y)
+        self._outputs: tp.Dict[int, tp.Tuple] = {}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(cache_dir={str(self.cache_dir)!r})"
+
+    def __deepcopy__(self, memo: tp.Dict) -> "TransformerCache":
+        # `clone(pipe)` deep copies the params: the copies share the cache
+        return self
+
+    def __getstate__(self) -> tp.Dict[str, tp.Any]:
+        # The pipelines (e.g logged with MLflow) are pickled with their memory
+        return {**self.__dict__, "_outputs": {}}
+
+    def _get_digests(self, X: tp.Any, y: tp.Any, transformer: tp.Any) -> tp.Tuple[str, str]:
+        """This returns the content hash of the input of a step (see `get_data_digest`).
+        If X is the output of the previous step (an output is the input of a single
+        step), its hash is the key of the previous step and the hash of y is reused.
+        Only the features selected by a SelectFeatures step are hashed, so the other
+        columns (e.g the random trip IDs of each `load_data`) don't change its key."""
+        X_ref, y_ref, X_digest, y_digest = self._outputs.pop(id(X), (None, None, "", ""))
+        if X_ref is None or X_ref() is not X:
+            if isinstance(transformer, SelectFeatures) and isinstance(X, pd.DataFrame):
+                X = X.loc[:, list(transformer.features)]
+            return get_data_digest(X), get_data_digest(y)
+        if (None if y_ref is None else y_ref()) is not y:
+            y_digest = get_data_digest(y)
+        return X_digest, y_digest
+
+    def _set_output_key(self, output: tp.Any, *, key: str, y: tp.Any, y_digest: str) -> None:
+        """This saves the key of the step whose output is `output` (and the hash of y)."""
+        try:
+            refs = (weakref.ref(output), None if y is None else weakref.ref(y))
+        except TypeError:
+            return
+        self._outputs = {
+            idx: entry for idx, entry in self._outputs.items() if entry[0]() is not None
+        }
+        self._outputs[id(output)] = (*refs, f"output:{key}", y_digest)
+
+    def get_key(
+        self,
+        *,
+        func: tp.Callable,
+        transformer: tp.Any,
+        X_digest: str,
+        y_digest: str,
+        fit_params: tp.Dict[str, tp.Any],
+    ) -> str:
+        """This returns the key of a fitted transformer: a hash of the function, of
+        the transformer (its class and params), of the content hash of X and y and of
+        the fit params."""
+        payload = json.dumps(
+            {
+                "func": f"{func.__module__}.{func.__qualname__}",
+                "transformer": joblib.hash(transformer),
+                "X": X_digest,
+                "y": y_digest,
+                "fit_params": joblib.hash(fit_params),
+                "sklearn": sklearn.__version__,
+                "version": TRANSFORMER_CACHE_VERSION,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get_filepath(self, key: str) -> Path:
+        """This returns the filepath of a cached transformer."""
+        return self.cache_dir / f"{key}.joblib"
+
+    def cache(self, func: tp.Callable) -> tp.Callable:
+        """This returns `func` reading the fitted transformer from (or saving it in) the
+        cache. A cached transformer is only used to transform X.
+
+        Params:
+        -------
+        func (Callable): The function fitting and applying a transformer, called as
+            `func(transformer, X, y, weight, **kwargs)`. It returns the transformed X
+            (multiplied by the weight if it's not None) and the fitted transformer.
+            e.g `sklearn.pipeline._fit_transform_one`
+
+        Returns:
+        --------
+        cached_func (Callable): The cached function.
+        """
+
+        @functools.wraps(func)
+        def cached_func(
+            transformer: tp.Any, X: tp.Any, y: tp.Any, weight: tp.Optional[float] = None, **kwargs
+        ) -> tp.Tuple[tp.Any, tp.Any]:
+            # The messages are only used for logging the step
+            fit_params = {
+                name: value
+                for name, value in kwargs.items()
+                if name not in ("message_clsname", "message")
+            }
+            X_digest, y_digest = self._get_digests(X, y, transformer)
+            key = self.get_key(
+                func=func,
+                transformer=transformer,
+                X_digest=X_digest,
+                y_digest=y_digest,
+                fit_params={"weight": weight, **fit_params},
+            )
+            filepath = self.get_filepath(key)
+            name = type(transformer).__name__
+            try:
+                with open(filepath, "rb") as file:
+                    fitted_transformer = joblib.load(file)
+                os.utime(filepath)  # Mark the entry as recently used
+                self.hits += 1
+                logger.info(f"Loaded the cached transformer {name!r} ({filepath.name!r}) ...")
+                X_transformed = fitted_transformer.transform(X)
+                if weight is not None:
+                    X_transformed = X_transformed * weight
+            except FileNotFoundError:
+                self.misses += 1
+                logger.info(f"Fitting the transformer {name!r} (not cached) ...")
+                X_transformed, fitted_transformer = func(transformer, X, y, weight, **kwargs)
+                self._put(filepath=filepath, transformer=fitted_transformer)
+            self._set_output_key(X_transformed, key=key, y=y, y_digest=y_digest)
+            return X_transformed, fitted_transformer
+
+        return cached_func
+
+    def _put(self, *, filepath: Path, transformer: tp.Any) -> None:
+        """This saves a fitted transformer and removes the least recently used ones
+        if the cache exceeds its budget."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # Written to a temporary file first so a partly written file is never read
+        tmp_filepath = filepath.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_filepath, "wb") as file:
+            joblib.dump(transformer, file)
+        os.replace(tmp_filepath, filepath)
+        self._evict(keep=filepath)
+
+    @property
+    def total_bytes(self) -> int:
+        """This returns the size of the cached transformers in bytes."""
+        return sum(filepath.stat().st_size for filepath in self.cache_dir.glob("*.joblib"))
+
+    def _evict(self, *, keep: Path) -> None:
+        """This removes the least recently used transformers until the cache fits
+        in the disk budget."""
+        entries = sorted(
+            (filepath.stat().st_mtime_ns, filepath.stat().st_size, filepath)
+            for filepath in self.cache_dir.glob("*.joblib")
+        )
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, filepath in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            if filepath != keep:
+                filepath.unlink(missing_ok=True)
+                total_bytes -= size
+                logger.info(f"Evicted transformer {filepath.name!r} from the cache ...")
+
+    def clear(self) -> None:
+        """This removes all the cached transformers."""
+        for filepath in self.cache_dir.glob("*.joblib"):
+            filepath.unlink(missing_ok=True)
+
+
+transformer_cache = TransformerCache()
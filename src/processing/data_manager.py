@@ -3,23 +3,52 @@ This module is used to load/save the data.
 
 author: Chinedu Ezeofor
 """
-import uuid
+import copy
+import operator
 import typing as tp
 import logging
+import logging.config
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 # Standard imports
+import fsspec
 import numpy as np
 import joblib
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+from pyarrow import feather
+import pyarrow.parquet as pq
 from pydantic import ValidationError
+from fsspec.implementations.local import LocalFileSystem
 from rich.logging import RichHandler
 from sklearn.pipeline import Pipeline
 from sklearn.model_selection import train_test_split
 
 # Custom Imports
-from src.config.core import SRC_ROOT, DATA_FILEPATH, TRAINED_MODELS_FILEPATH, config
-from src.config.schema import ValidateInputSchema, ValidateTrainingData
+from src.config.core import (
+    SRC_ROOT,
+    DATA_FILEPATH,
+    TRAINED_MODELS_FILEPATH,
+    config,
+)
+from src.config.schema import InputSchema, ValidateTrainingData
+from src.processing import cache
+
+# The caches used to live in this module. They are still importable from here.
+from src.processing.cache import (  # pylint: disable=unused-import,useless-import-alias
+    ModelRegistry as ModelRegistry,
+    model_registry as model_registry,
+    DatasetCache as DatasetCache,
+    dataset_cache as dataset_cache,
+    TransformerCache as TransformerCache,
+    transformer_cache as transformer_cache,
+)
+from src.processing.ids import generate_ids
+from src.processing.memory import compact_dtypes, memory_report
+from src.utilities.parallel import get_n_cpus
+from src.processing.validation import validate_columns
 
 
 def custom_logger():
@@ -53,66 +82,618 @@ logger = custom_logger()
 Estimator = tp.Union[Pipeline, tp.Any]  # Alias for estimator
 
 
-def get_unique_IDs(feat: str) -> str:  # pylint: disable=inconsistent-return-statements
-    """This returns a universally unique generated ID."""
-    if feat is not None:
-        return str(uuid.uuid4())
+TRIP_DUR_THRESH = 60  # trip_duration
+TRIP_DIST_THRESH = 30  # trip_distance
+TOTAL_AMT_THRESH = 100  # total_amount
+MIN_THRESH = 0
+
+# Columns read by the training (with the columns required to calculate the trip_duration)
+LOAD_COLUMNS = tuple(config.model_config.INPUT_FEATURES)
+REQUIRED_COLUMNS = (
+    "VendorID",
+    "tpep_pickup_datetime",
+    "tpep_dropoff_datetime",
+    "lpep_pickup_datetime",
+    "lpep_dropoff_datetime",
+)
+# Row filters pushed down into the Parquet reader (i.e. the rows are removed while
+# decoding and the row groups outside the thresholds are skipped)
+LOAD_FILTERS = (
+    ("trip_distance", ">", MIN_THRESH),
+    ("trip_distance", "<=", TRIP_DIST_THRESH),
+    ("total_amount", ">", MIN_THRESH),
+    ("total_amount", "<=", TOTAL_AMT_THRESH),
+)
+# The operators of the row filters applied to a DF (i.e. not pushed down into the reader)
+FILTER_OPS = {
+    "=": operator.eq,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": np.isin,
+}
+# Explicit schema of the CSV trip data (the other columns are inferred)
+CSV_COLUMN_TYPES = {
+    **{col: pa.int64() for col in ("VendorID", "PULocationID", "DOLocationID", "payment_type")},
+    **{
+        f"{prefix}_{event}_datetime": pa.timestamp("ns")
+        for prefix in ("tpep", "lpep")
+        for event in ("pickup", "dropoff")
+    },
+    "store_and_fwd_flag": pa.string(),
+    **{
+        col: pa.float64()
+        for col in (
+            "passenger_count",
+            "trip_distance",
+            "RatecodeID",
+            "fare_amount",
+            "extra",
+            "mta_tax",
+            "tip_amount",
+            "tolls_amount",
+            "improvement_surcharge",
+            "total_amount",
+            "congestion_surcharge",
+            "airport_fee",
+            "ehail_fee",
+            "trip_type",
+        )
+    },
+}
+NAT = np.iinfo(np.int64).min  # The int64 value of NaT
+ITER_BATCH_ROWS = 100_000  # Rows read per batch by iter_data
+GLOB_CHARS = ("*", "?", "[")  # A filename containing them is a glob pattern
+# The files with missing (null) columns are concatenated with the columns of the other
+# files. `promote_options` replaced `promote` in pyarrow 14 (the services pin 10.0.1).
+CONCAT_OPTIONS: tp.Dict[str, tp.Any] = (
+    {"promote_options": "default"} if int(pa.__version__.split(".")[0]) >= 14 else {"promote": True}
+)
+
+
+def _open_file(filename: str) -> tp.Union[pa.NativeFile, cache.CachedRemoteFile]:
+    """This opens a local file (natively, i.e. without holding the GIL while reading)
+    or a remote file (e.g S3) through the `remote_file_cache`."""
+    fs, path = fsspec.core.url_to_fs(filename)
+    if isinstance(fs, LocalFileSystem):
+        return pa.OSFile(path)
+    return cache.remote_file_cache.open(filename)
+
+
+def _get_read_args(
+    *,
+    file: tp.Any,
+    columns: tp.Optional[tp.Sequence[str]],
+    filters: tp.Optional[tp.Sequence[tp.Tuple]],
+) -> tp.Tuple[tp.Optional[tp.List[str]], tp.Optional[tp.List[tp.Tuple]]]:
+    """This returns the columns and the filters found in an open Parquet file (with
+    the `REQUIRED_COLUMNS`). Only the footer of the file is read."""
+    names = pq.read_schema(file).names
+
+    if columns is not None:
+        columns = [col for col in names if col in {*columns, *REQUIRED_COLUMNS}]
+    if filters is not None:
+        filters = [filter_ for filter_ in filters if filter_[0] in names] or None
+    return columns, filters  # type: ignore
+
+
+def read_parquet(
+    *,
+    filename: str,
+    columns: tp.Optional[tp.Sequence[str]] = None,
+    filters: tp.Optional[tp.Sequence[tp.Tuple]] = None,
+) -> pd.DataFrame:
+    """This returns the columns of a Parquet file (local or URI) containing the rows
+    that match the filters. Only the footer is read to find the available columns,
+    the other columns are never decoded. A remote file is read through the
+    `remote_file_cache`, i.e. only the footer and the needed column chunks are downloaded.
+
+    Params:
+    -------
+    filename (str): The filepath or URI.
+    columns (Sequence[str], default=None): The columns to read. The columns missing
+        from the file are ignored. If None, all the columns are read.
+    filters (Sequence[Tuple], default=None): The row filters as (column, op, value)
+        tuples (e.g `("trip_distance", "<=", 30)`) combined with AND. The filters of
+        the columns missing from the file are ignored.
+
+    Returns:
+    --------
+    data (Pandas DF): The loaded DF.
+    """
+    with _open_file(filename) as file:
+        columns, filters = _get_read_args(file=file, columns=columns, filters=filters)
+        return pd.read_parquet(file, engine="pyarrow", columns=columns, filters=filters)
+
+
+def read_csv(*, filename: str) -> pd.DataFrame:
+    """This returns the data of a CSV file (local or URI). The file is parsed by
+    the multithreaded pyarrow reader with the explicit schema of the trip data
+    (`CSV_COLUMN_TYPES`), i.e. the datetimes are parsed while reading.
+
+    Params:
+    -------
+    filename (str): The filepath or URI.
+
+    Returns:
+    --------
+    data (Pandas DF): The loaded DF.
+    """
+    convert_options = pa_csv.ConvertOptions(column_types=CSV_COLUMN_TYPES, strings_can_be_null=True)
+    with _open_file(filename) as file:
+        table = pa_csv.read_csv(file, convert_options=convert_options)
+    return table.to_pandas(split_blocks=True)
+
+
+def _get_trip_prefix(data: pd.DataFrame) -> tp.Optional[str]:
+    """This returns the prefix of the pickup and dropoff datetimes of the data
+    ("tpep": yellow taxi, "lpep": green taxi) or None if they're missing."""
+    for prefix in ("tpep", "lpep"):
+        if {f"{prefix}_pickup_datetime", f"{prefix}_dropoff_datetime"} <= set(data.columns):
+            return prefix
+    return None
+
+
+def calculate_trip_duration(data: pd.DataFrame) -> pd.Series:
+    """This returns the trip_duration in minutes (yellow or green taxi data). It's
+    computed from the int64 nanoseconds of the datetimes (without copying them)
+    and the trips with a missing datetime have a NaN trip_duration."""
+    # Convert to minutes
+    MINS = 60
+    prefix = _get_trip_prefix(data)
+    if prefix is None:
+        raise KeyError("The pickup and dropoff datetimes are missing from the data")
+
+    pickup = data[f"{prefix}_pickup_datetime"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+    dropoff = data[f"{prefix}_dropoff_datetime"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+    trip_duration = np.round((dropoff - pickup) * 1e-9 / MINS, 2)
+    trip_duration[(pickup == NAT) | (dropoff == NAT)] = np.nan
+    return pd.Series(trip_duration, index=data.index)
+
+
+def _get_filter_mask(
+    data: pd.DataFrame, filters: tp.Optional[tp.Sequence[tp.Tuple]]
+) -> tp.Union[np.ndarray, bool]:
+    """This returns the mask of the rows matching the row filters (see `read_parquet`).
+    The filters of the columns missing from the data are ignored."""
+    mask: tp.Union[np.ndarray, bool] = True
+    for col, op, value in filters or ():
+        if col in data.columns:
+            mask &= FILTER_OPS[op](data[col].to_numpy(), value)
+    return mask
+
+
+def _preprocess_trips(
+    data: pd.DataFrame,
+    *,
+    id_mode: str,
+    compact: bool = False,
+    arrow_ids: bool = False,
+    filters: tp.Optional[tp.Sequence[tp.Tuple]] = None,
+) -> pd.DataFrame:
+    """This adds the IDs and the (log transformed) trip_duration of the trips
+    and removes the trips outside the trip_duration thresholds and the trips not
+    matching the `filters` (the filters not applied by a reader) with
+    a single mask. The DF is modified in place. The IDs are Arrow strings if
+    `compact` or `arrow_ids`."""
+    trip_duration = calculate_trip_duration(data).to_numpy()
+    is_valid = (trip_duration > MIN_THRESH) & (trip_duration <= TRIP_DUR_THRESH)
+    is_valid &= _get_filter_mask(data, filters)
+    # In place: the unfiltered data is released even if the caller holds a reference
+    data.drop(index=data.index[~is_valid], inplace=True)
+    ids = generate_ids(data, mode=id_mode, arrow=compact or arrow_ids)  # Generate IDs
+    if compact:
+        # After the IDs (the "hash" IDs don't depend on the layout) and
+        # before the target (kept as float64)
+        compact_dtypes(data)
+    data["id"] = ids
+    data["trip_duration"] = np.log1p(trip_duration[is_valid])  # Log transform
+    return data
+
 
+def _get_cache_key(
+    *,
+    filename: str,
+    columns: tp.Optional[tp.Sequence[str]],
+    filters: tp.Optional[tp.Sequence[tp.Tuple]],
+    id_mode: str,
+    compact: bool,
+) -> str:
+    """This returns the key of the preprocessed data of a Parquet file in the `dataset_cache`."""
+    params = {"columns": columns, "filters": filters, "id_mode": id_mode, "compact": compact}
+    return cache.dataset_cache.get_key(filename=filename, params=params)
+
+
+def _get_filenames(
+    *, filename: tp.Union[str, Path, tp.Sequence[tp.Union[str, Path]]], uri: bool
+) -> tp.Union[str, tp.List[str]]:
+    """This returns the filepath (str) of a file or the (sorted) filepaths matching
+    a glob pattern or the filepaths of a sequence of files."""
+    if isinstance(filename, (str, Path)):
+        filename = f"{DATA_FILEPATH}/{filename}" if not uri else str(filename)
+        if not any(char in filename for char in GLOB_CHARS):
+            return filename
+
+        fs, pattern = fsspec.core.url_to_fs(filename)
+        filenames = sorted(fs.glob(pattern))
+        if not filenames:
+            raise FileNotFoundError(f"No files match the pattern {filename!r}")
+        if isinstance(fs, LocalFileSystem):
+            return filenames
+        return [fs.unstrip_protocol(name) for name in filenames]
+
+    return [str(name) if uri else f"{DATA_FILEPATH}/{name}" for name in filename]
+
+
+def _read_trips(
+    *,
+    filename: str,
+    columns: tp.Optional[tp.Sequence[str]],
+    filters: tp.Optional[tp.Sequence[tp.Tuple]],
+    id_mode: str,
+    compact: bool,
+    arrow_ids: bool = False,
+) -> pd.DataFrame:
+    """This reads and preprocesses the trips of a Parquet file. A CSV file is returned
+    as read (only its datetimes are parsed), i.e. the columns, the filters and the
+    preprocessing don't apply. So is a file without the pickup and dropoff datetimes
+    (e.g the inputs of a batch prediction)."""
+    try:
+        if filename.endswith("csv"):
+            return read_csv(filename=filename)
+        data = read_parquet(filename=filename, columns=columns, filters=filters)
+    except FileNotFoundError:
+        logger.error(f"File not found: {filename!r}")
+        raise
+
+    if _get_trip_prefix(data) is None:
+        return data
+    data = _preprocess_trips(data, id_mode=id_mode, compact=compact, arrow_ids=arrow_ids)
+    logger.info("Added IDs! ")
+    return data
 
-def load_data(*, filename: tp.Union[str, Path], uri: bool = False) -> pd.DataFrame:
+
+def _load_file(
+    *,
+    filename: str,
+    columns: tp.Optional[tp.Sequence[str]],
+    filters: tp.Optional[tp.Sequence[tp.Tuple]],
+    id_mode: str,
+    compact: bool,
+    use_cache: bool,
+) -> pd.DataFrame:
+    """This returns the (preprocessed) data of a file. See `load_data`."""
+    data, cache_key = None, None
+    if use_cache:
+        cache_key = _get_cache_key(
+            filename=filename, columns=columns, filters=filters, id_mode=id_mode, compact=compact
+        )
+        data = cache.dataset_cache.get(key=cache_key)
+        if data is not None and id_mode == "random" and "id" in data.columns:
+            data["id"] = generate_ids(data, mode=id_mode, arrow=compact)  # New random IDs
+
+    if data is None:
+        data = _read_trips(
+            filename=filename, columns=columns, filters=filters, id_mode=id_mode, compact=compact
+        )
+        if cache_key is not None:
+            cache.dataset_cache.put(key=cache_key, data=data)
+    return data
+
+
+def _load_table(
+    *,
+    filename: str,
+    columns: tp.Optional[tp.Sequence[str]],
+    filters: tp.Optional[tp.Sequence[tp.Tuple]],
+    id_mode: str,
+    compact: bool,
+    use_cache: bool,
+) -> pa.Table:
+    """This returns the (preprocessed) data of a file as an Arrow table without its
+    index. The IDs are Arrow strings (the Python strs are only created once the
+    tables are concatenated). See `load_data`."""
+    table, cache_key = None, None
+    if use_cache:
+        cache_key = _get_cache_key(
+            filename=filename, columns=columns, filters=filters, id_mode=id_mode, compact=compact
+        )
+        table = cache.dataset_cache.get_table(key=cache_key)
+        if table is not None and id_mode == "random" and "id" in table.column_names:
+            ids = generate_ids(range(table.num_rows), mode=id_mode, arrow=True)  # New random IDs
+            table = table.set_column(table.schema.get_field_index("id"), "id", pa.array(ids))
+
+    if table is None:
+        data = _read_trips(
+            filename=filename,
+            columns=columns,
+            filters=filters,
+            id_mode=id_mode,
+            compact=compact,
+            arrow_ids=True,
+        )
+        # The IDs are only restored as string[pyarrow] in the compact layout
+        table = cache.pandas_to_table(
+            data, arrow_strings=cache.get_arrow_strings(data) if compact else {}
+        )
+        del data
+        if cache_key is not None:
+            cache.dataset_cache.put_table(key=cache_key, table=table)
+
+    index_columns = (table.schema.pandas_metadata or {}).get("index_columns", [])
+    return table.drop([col for col in index_columns if isinstance(col, str)])
+
+
+def _load_files(
+    *, filenames: tp.List[str], max_workers: tp.Optional[int], **kwargs: tp.Any
+) -> pd.DataFrame:
+    """This returns the concatenated data of several files loaded by a thread pool.
+    The tables of the files are concatenated without copying them, so the data is
+    only allocated once as a DF."""
+    if max_workers is None:
+        max_workers = min(len(filenames), get_n_cpus())
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_load_table, filename=filename, **kwargs) for filename in filenames
+        ]
+        tables = [future.result() for future in futures]
+
+    arrow_strings = cache.read_arrow_strings(tables[0])
+    table = pa.concat_tables(tables, **CONCAT_OPTIONS)
+    del tables  # The buffers are referenced by the concatenated table
+
+    # The columns are removed from the table once converted so their buffers are
+    # released during the conversion (i.e. the data isn't held twice)
+    data = {}
+    while table.num_columns:
+        col, values = table.column_names[0], table.column(0)
+        table = table.remove_column(0)
+        if col in arrow_strings:
+            data[col] = pd.arrays.ArrowStringArray(values)
+        else:
+            data[col] = values.to_pandas(deduplicate_objects=False).array
+        del values
+    return pd.DataFrame(data, copy=False)
+
+
+def load_data(
+    *,
+    filename: tp.Union[str, Path, tp.Sequence[tp.Union[str, Path]]],
+    uri: bool = False,
+    columns: tp.Optional[tp.Sequence[str]] = LOAD_COLUMNS,
+    filters: tp.Optional[tp.Sequence[tp.Tuple]] = LOAD_FILTERS,
+    id_mode: str = "random",
+    compact: bool = False,
+    use_cache: bool = False,
+    max_workers: tp.Optional[int] = None,
+) -> pd.DataFrame:
     """This returns the data as a Pandas DF.
 
     Params:
     -------
-    filename (Path): The relative input filepath.
-    uri (bool, default=False): True if the filename is an S3 URI else False
+    filename (Path or Sequence[Path]): The relative input filepath. It can also be a
+        glob pattern (e.g "yellow_tripdata_2022-0[1-3].parquet") or a sequence of
+        filepaths: the files are loaded concurrently and the data is concatenated
+        (in the order of the files, with a new RangeIndex).
+    uri (bool, default=False): True if the filename is an S3 URI else False.
+        The remote files are read through the `remote_file_cache` (on disk), so
+        a retry or a backfill doesn't download the same bytes again.
+    columns (Sequence[str], default=LOAD_COLUMNS): The columns read from a Parquet
+        file (the input features by default, with the columns required to calculate
+        the trip_duration). If None, all the columns are read.
+    filters (Sequence[Tuple], default=LOAD_FILTERS): The row filters applied while
+        reading a Parquet file (the trip_distance and total_amount thresholds by
+        default). If None, the rows aren't filtered (except on the trip_duration).
+    id_mode (str, default="random"): The IDs of the trips. "random" for
+        random UUIDs or "hash" for UUIDs computed from the trips (the same IDs
+        are generated when the file is loaded again). See `generate_ids`.
+    compact (bool, default=False): If True, the trip data is converted to
+        the compact layout (smaller integers, float32, category and Arrow strings
+        incl. the IDs). It uses about half the memory but the amounts and the
+        distances are rounded to float32. See `compact_dtypes`.
+    use_cache (bool, default=False): If True, a file's preprocessed data is
+        read from (or saved in) the `dataset_cache`, e.g. so a retry doesn't
+        preprocess the same file again. New "random" IDs are generated when the
+        data is read from the cache (the "hash" IDs are the same anyway).
+    max_workers (int, default=None): The number of threads loading several files.
+        If None, it's the number of files (at most the number of CPUs).
 
     Returns:
     --------
     data (Pandas DF): The loaded DF.
     """
+    filenames = _get_filenames(filename=filename, uri=uri)
+    kwargs = {
+        "columns": columns,
+        "filters": filters,
+        "id_mode": id_mode,
+        "compact": compact,
+        "use_cache": use_cache,
+    }
+    logger.info("Loading Data ... ")
+    if isinstance(filenames, str):
+        data = _load_file(filename=filenames, **kwargs)  # type: ignore
+    else:
+        data = _load_files(filenames=filenames, max_workers=max_workers, **kwargs)
+
+    report = memory_report(data)
+    logger.info(f"Memory used by the data: {report['memory (MB)'].sum():,.1f} MB")
+    logger.info(f"Memory used by each column:\n{report.to_string()}")
+    return data
+
+
+def _iter_file(
+    *,
+    file: tp.Any,
+    batch_rows: int,
+    columns: tp.Optional[tp.Sequence[str]],
+    filters: tp.Optional[tp.Sequence[tp.Tuple]],
+    id_mode: str,
+    compact: bool,
+) -> tp.Iterator[pd.DataFrame]:
+    """This yields the preprocessed (non empty) batches of an open Parquet file."""
+    columns_, filters_ = _get_read_args(file=file, columns=columns, filters=filters)
+    expression = None if filters_ is None else pq.filters_to_expression(filters_)
+    batches = pq.ParquetFile(file).iter_batches(batch_size=batch_rows, columns=columns_)
+    for batch in batches:
+        table = pa.Table.from_batches([batch])
+        if expression is not None:
+            table = table.filter(expression)
+        if table.num_rows:
+            data = _preprocess_trips(table.to_pandas(), id_mode=id_mode, compact=compact)
+            if not data.empty:
+                yield data
+
+
+def iter_data(
+    *,
+    filename: tp.Union[str, Path, tp.Sequence[tp.Union[str, Path]]],
+    uri: bool = False,
+    batch_rows: int = ITER_BATCH_ROWS,
+    columns: tp.Optional[tp.Sequence[str]] = LOAD_COLUMNS,
+    filters: tp.Optional[tp.Sequence[tp.Tuple]] = LOAD_FILTERS,
+    id_mode: str = "random",
+    compact: bool = False,
+) -> tp.Iterator[pd.DataFrame]:
+    """This yields the data of a Parquet file in batches. The row groups are read
+    one after the other so the memory used depends on the batch size instead of
+    the file size. The filters are applied to each batch (before it's converted to
+    a DF). Each batch is preprocessed like the data returned by `load_data`.
+
+    Params:
+    -------
+    filename (Path or Sequence[Path]): The relative input filepath. It can also be a
+        glob pattern or a sequence of filepaths (see `load_data`): the files are
+        read one after the other (a batch doesn't contain the rows of two files).
+    uri (bool, default=False): True if the filename is an URI (e.g S3) else False
+    batch_rows (int, default=ITER_BATCH_ROWS): The (maximum) number of rows read
+        per batch. The batches have fewer rows after the filtering.
+    columns (Sequence[str], default=LOAD_COLUMNS): See `load_data`.
+    filters (Sequence[Tuple], default=LOAD_FILTERS): See `load_data`.
+    id_mode (str, default="random"): See `load_data`. In "hash" mode, the
+        duplicated trips are only numbered within a batch.
+    compact (bool, default=False): See `load_data`.
+
+    Returns:
+    --------
+    data (Iterator[Pandas DF]): The preprocessed batches. The empty batches
+        (all the rows were filtered) are skipped.
+    """
+    filenames = _get_filenames(filename=filename, uri=uri)
+    if isinstance(filenames, str):
+        filenames = [filenames]
+
+    logger.info("Loading Data in batches ... ")
+    for path in filenames:
+        with _open_file(path) as file:
+            yield from _iter_file(
+                file=file,
+                batch_rows=batch_rows,
+                columns=columns,
+                filters=filters,
+                id_mode=id_mode,
+                compact=compact,
+            )
+
+
+def materialize_data(
+    *,
+    filename: tp.Union[str, Path],
+    uri: bool = False,
+    columns: tp.Optional[tp.Sequence[str]] = LOAD_COLUMNS,
+    filters: tp.Optional[tp.Sequence[tp.Tuple]] = LOAD_FILTERS,
+    id_mode: str = "random",
+    compact: bool = False,
+) -> Path:
+    """This returns the filepath of the preprocessed data of a Parquet file saved as an
+    Arrow IPC (Feather) file in the `dataset_cache`. The data is only loaded (with
+    `load_data`) if it's not cached. The file can be shared by several processes
+    with `read_shared_data`, e.g. the workers of a hyperparameter search.
+
+    Params:
+    -------
+    filename (Path): The relative input filepath.
+    uri (bool, default=False): True if the filename is an URI (e.g S3) else False
+    columns, filters, id_mode, compact: See `load_data`.
+
+    Returns:
+    --------
+    filepath (Path): The filepath of the Arrow IPC file. The file is only kept while
+        the dataset is cached, i.e. it can be evicted once other datasets are cached
+        (the processes that opened it can still read it).
+    """
     if not uri:
         filename = f"{DATA_FILEPATH}/{filename}"
     filename = str(filename)
 
-    logger.info("Loading Data ... ")
-    try:
-        data = pd.read_csv(filename) if filename.endswith("csv") else pd.read_parquet(filename)
-    except FileNotFoundError as err:
-        logger.info(err)
-
-    TRIP_DUR_THRESH = 60  # trip_duration
-    TRIP_DIST_THRESH = 30  # trip_distance
-    TOTAL_AMT_THRESH = 100  # total_amount
-    MIN_THRESH = 0
-
-    if filename.endswith("parquet"):
-
-        def calculate_trip_duration(data: pd.DataFrame) -> np.ndarray:
-            """This returns a DF containing the calculated trip_duration in minutes."""
-            data = data.copy()
-            # Convert to minutes
-            MINS = 60
-            try:
-                trip_duration = data["tpep_dropoff_datetime"] - data["tpep_pickup_datetime"]
-            except ValueError:
-                trip_duration = data["lpep_dropoff_datetime"] - data["lpep_pickup_datetime"]
-            trip_duration = round(trip_duration.dt.total_seconds() / MINS, 2)
-            return trip_duration
-
-        data["id"] = data["VendorID"].apply(get_unique_IDs)  # Generate IDs
-        logger.info("Added IDs! ")
-        data["trip_duration"] = calculate_trip_duration(data)
-        data = data.loc[
-            (data["trip_duration"] > MIN_THRESH) & (data["trip_duration"] <= TRIP_DUR_THRESH)
-        ]
-        data = data.loc[
-            (data["trip_distance"] > MIN_THRESH) & (data["trip_distance"] <= TRIP_DIST_THRESH)
-        ]
-        data = data.loc[
-            (data["total_amount"] > MIN_THRESH) & (data["total_amount"] <= TOTAL_AMT_THRESH)
-        ]
-        data["trip_duration"] = np.log1p(data["trip_duration"])  # Log transform
+    cache_key = _get_cache_key(
+        filename=filename, columns=columns, filters=filters, id_mode=id_mode, compact=compact
+    )
+    filepath = cache.dataset_cache.get_filepath(cache_key)
+    if not filepath.exists():
+        load_data(
+            filename=filename,
+            uri=True,
+            columns=columns,
+            filters=filters,
+            id_mode=id_mode,
+            compact=compact,
+            use_cache=True,
+        )
+    return filepath
+
+
+def _to_shared_values(column: pa.ChunkedArray) -> tp.Any:
+    """This returns the values of an Arrow column as a view of its buffers if
+    possible (strs, or numbers and timestamps without nulls) or else as a copy."""
+    if pa.types.is_string(column.type):
+        return pd.arrays.ArrowStringArray(column)
+    is_numeric = pa.types.is_integer(column.type) or pa.types.is_floating(column.type)
+    is_timestamp = pa.types.is_timestamp(column.type) and column.type.tz is None
+    if column.num_chunks == 1 and column.null_count == 0 and (is_numeric or is_timestamp):
+        return column.chunk(0).to_numpy(zero_copy_only=True)  # Read-only
+    return column.to_pandas()
+
+
+def read_shared_data(filepath: tp.Union[str, Path]) -> pd.DataFrame:
+    """This returns the data of an Arrow IPC (Feather) file (see `materialize_data`)
+    without copying its buffers: the file is memory-mapped, so the processes reading
+    the same file share the same (page cache) memory. The str columns are returned
+    as `string[pyarrow]` and the columns with nulls (and categories) are copied.
+
+    Params:
+    -------
+    filepath (Path): The filepath of the Arrow IPC file.
+
+    Returns:
+    --------
+    data (Pandas DF): The DF. The shared columns are read-only (the values can't be
+        modified in place but the columns can be replaced).
+    """
+    table = feather.read_table(filepath, memory_map=True)
+    pandas_metadata = table.schema.pandas_metadata or {}
+    # A RangeIndex isn't saved as a column
+    index_columns = [
+        col for col in pandas_metadata.get("index_columns", []) if isinstance(col, str)
+    ]
+    data = pd.DataFrame(
+        {
+            col: _to_shared_values(table.column(col))
+            for col in table.column_names
+            if col not in index_columns
+        },
+        copy=False,
+    )
+    if index_columns:
+        names = {col["field_name"]: col["name"] for col in pandas_metadata["columns"]}
+        data.index = pd.Index(
+            _to_shared_values(table.column(index_columns[0])),
+            name=names.get(index_columns[0]),
+            copy=False,
+        )
     return data
 
 
@@ -198,7 +779,9 @@ def validate_input(
     *,
     data: pd.DataFrame,
 ) -> tp.Tuple[tp.Optional[pd.DataFrame], tp.Union[None, str]]:
-    """This is used to validate the input data using a Pydantic Model.
+    """This is used to validate the input data using the fields of the
+    Pydantic Model `InputSchema`. The validation is done column by column
+    (vectorized) and the errors have the same format as the Pydantic errors.
 
     Params:
     -------
@@ -209,22 +792,7 @@ def validate_input(
     data (Pandas DF): The validated DF.
     error (str or None): None if there's no error else a str.
     """
-    # load the data
-    data = data.copy()  # pragma: no cover
-    error = None  # pragma: no cover
-
-    # Validate the data. Convert NaNs to None
-    try:  # pragma: no cover
-        validated_data = ValidateInputSchema(
-            inputs=data.replace({np.nan: None}).to_dict(orient="records")
-        )
-        validated_dict = validated_data.dict().get("inputs")  # Extract the data
-        data = pd.DataFrame(data=validated_dict)
-        return (data, error)
-
-    except ValidationError as err:  # pragma: no cover
-        error = err.json()
-        return (None, error)
+    return validate_columns(data=data, schema=InputSchema, loc="inputs")
 
 
 def save_model(*, filename: tp.Union[str, Path], pipe: Pipeline) -> None:
@@ -239,6 +807,10 @@ def save_model(*, filename: tp.Union[str, Path], pipe: Pipeline) -> None:
     None
     """
     filename = TRAINED_MODELS_FILEPATH / filename
+    if isinstance(pipe, Pipeline) and pipe.memory is not None:
+        # The transformer cache isn't saved with the model
+        pipe = copy.copy(pipe)
+        pipe.memory = None
 
     logger.info("Saving Model ...")
     with open(filename, "wb") as file:
@@ -7,53 +7,178 @@ author: Chinedu Ezeofor
 import typing as tp
 
 # Standard imports
+import numpy as np
 import pandas as pd
 from sklearn.base import BaseEstimator, TransformerMixin
 
+NS_PER_HOUR = 3_600 * 10**9
+NS_PER_DAY = 24 * NS_PER_HOUR
+EPOCH_DAY_OF_WEEK = 3  # 1970-01-01 was a Thursday (Monday=0)
+
 
 class CalculateDayOfWeek(BaseEstimator, TransformerMixin):
     """Custom Transformer used to calculate the DayOfWeek. It allows the Class
-    to work in Scikit-learn Pipelines."""
+    to work in Scikit-learn Pipelines.
+
+    Params:
+    -------
+    feature (str): The datetime feature.
+    copy (bool, default=True): If False, the feature is added to the input DF
+        (in place) instead of a copy.
+    """
 
-    def __init__(self, feature: str):
+    copy = True  # Used by the models saved before `copy` was added
+
+    def __init__(self, feature: str, copy: bool = True):
         self.feature = feature
+        self.copy = copy
 
     def fit(self, X, y=None):  # pylint: disable=unused-argument
         return self
 
     def transform(self, X, y=None) -> pd.DataFrame:  # pylint: disable=unused-argument
-        X = X.copy()
+        if self.copy:
+            X = X.copy()
         X["day_of_week"] = X[self.feature].dt.dayofweek
         return X
 
 
 class CalculateHourOfDay(BaseEstimator, TransformerMixin):
     """Custom Transformer used to calculate the HourOfDay. It allows the Class
-    to work in Scikit-learn Pipelines."""
+    to work in Scikit-learn Pipelines.
+
+    Params:
+    -------
+    feature (str): The datetime feature.
+    copy (bool, default=True): If False, the feature is added to the input DF
+        (in place) instead of a copy.
+    """
 
-    def __init__(self, feature: str):
+    copy = True  # Used by the models saved before `copy` was added
+
+    def __init__(self, feature: str, copy: bool = True):
         self.feature = feature
+        self.copy = copy
 
     def fit(self, X, y=None):  # pylint: disable=unused-argument
         return self
 
     def transform(self, X, y=None) -> pd.DataFrame:  # pylint: disable=unused-argument
-        X = X.copy()
+        if self.copy:
+            X = X.copy()
         X["hour_of_day"] = X[self.feature].dt.hour
         return X
 
 
+class CalculateTemporalFeatures(BaseEstimator, TransformerMixin):
+    """Custom Transformer used to calculate the DayOfWeek and the HourOfDay
+    in one pass. It uses integer arithmetic on the datetime64[ns] values and
+    gives the same results as `.dt.dayofweek` and `.dt.hour`. It allows the
+    Class to work in Scikit-learn Pipelines.
+
+    Params:
+    -------
+    feature (str): The datetime feature.
+    copy (bool, default=True): If False, the features are added to the input DF
+        (in place) instead of a copy.
+    """
+
+    def __init__(self, feature: str, copy: bool = True):
+        self.feature = feature
+        self.copy = copy
+
+    def fit(self, X, y=None):  # pylint: disable=unused-argument
+        return self
+
+    def transform(self, X, y=None) -> pd.DataFrame:  # pylint: disable=unused-argument
+        if self.copy:
+            X = X.copy()
+        dates = X[self.feature]
+        if isinstance(dates.dtype, pd.DatetimeTZDtype):
+            dates = dates.dt.tz_localize(None)  # Local time. Same as the `.dt` accessor
+
+        values = dates.to_numpy(dtype="datetime64[ns]")
+        nanoseconds = values.view(np.int64)
+        days = nanoseconds // NS_PER_DAY
+        day_of_week = (days + EPOCH_DAY_OF_WEEK) % 7
+        hour_of_day = (nanoseconds - days * NS_PER_DAY) // NS_PER_HOUR
+
+        is_missing = np.isnat(values)
+        if is_missing.any():
+            day_of_week = np.where(is_missing, np.nan, day_of_week)
+            hour_of_day = np.where(is_missing, np.nan, hour_of_day)
+
+        X["day_of_week"] = day_of_week
+        X["hour_of_day"] = hour_of_day
+        return X
+
+
 class SelectFeatures(BaseEstimator, TransformerMixin):
     """Custom Transformer used to select the features. It allows
-    the Class to work in Scikit-learn Pipelines."""
+    the Class to work in Scikit-learn Pipelines.
+
+    Params:
+    -------
+    features (List[str]): The features to select.
+    copy (bool, default=True): If False, the input DF is not copied before
+        selecting the features. The selected features are always a new DF.
+    """
+
+    copy = True  # Used by the models saved before `copy` was added
 
-    def __init__(self, features: tp.List[str]):
+    def __init__(self, features: tp.List[str], copy: bool = True):
         self.features = features
+        self.copy = copy
+
+    def fit(self, X, y=None):  # pylint: disable=unused-argument
+        return self
+
+    def transform(self, X, y=None) -> pd.DataFrame:  # pylint: disable=unused-argument
+        if self.copy:
+            X = X.copy()
+        # Unlike `X[features]`, the new DF isn't flagged as a copy of a slice,
+        # so the next steps can add features in place without warnings.
+        X = X.loc[:, self.features]
+        return X
+
+
+class OrdinalEncodeFrequent(BaseEstimator, TransformerMixin):
+    """Custom Transformer used to encode categorical variables (e.g the location IDs)
+    as ordinal codes. The categories are ordered by frequency and only the
+    `max_categories` most frequent ones get a code, the rare and the unknown
+    categories are encoded as NaN. The codes can be used as native categories by
+    HistGradientBoostingRegressor (they must be less than its `max_bins`).
+
+    Params:
+    -------
+    variables (List[str]): The categorical variables.
+    max_categories (int, default=255): The maximum number of codes per variable.
+    copy (bool, default=True): If False, the variables of the input DF are encoded
+        in place instead of a copy.
+    """
+
+    def __init__(self, variables: tp.List[str], max_categories: int = 255, copy: bool = True):
+        self.variables = variables
+        self.max_categories = max_categories
+        self.copy = copy
 
     def fit(self, X, y=None):  # pylint: disable=unused-argument
+        # The most frequent first (ties in the order of the categories)
+        self.encoder_dict_ = {  # pylint: disable=attribute-defined-outside-init
+            var: X[var]
+            .value_counts(sort=False)
+            .sort_index()
+            .sort_values(ascending=False, kind="stable")
+            .index.to_numpy()[: self.max_categories]
+            for var in self.variables
+        }
         return self
 
     def transform(self, X, y=None) -> pd.DataFrame:  # pylint: disable=unused-argument
-        X = X.copy()
-        X = X[self.features]
+        if self.copy:
+            X = X.copy()
+        for var, categories in self.encoder_dict_.items():
+            codes = pd.Index(categories).get_indexer(X[var]).astype(np.float64)
+            codes[codes < 0] = np.nan
+            X[var] = codes
         return X
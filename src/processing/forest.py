@@ -0,0 +1,176 @@
+"""
+This module is used to export a fitted Random Forest into flat NumPy arrays
+and to make predictions with all the trees in one vectorized pass.
+
+author: Chinedu Ezeofor
+"""
+import typing as tp
+
+# Standard imports
+import numpy as np
+from sklearn.pipeline import Pipeline
+
+BATCH_SIZE = 65_536  # Rows scored at once. It bounds the (rows, trees) node index array
+
+
+def _floor_to_float32(values: np.ndarray) -> np.ndarray:
+    """This returns the largest float32 that is <= each value.
+
+    Scikit-learn converts X to float32 before comparing it with the float64
+    thresholds. For a float32 `x`, `x <= t` is equivalent to `x <= floor32(t)`,
+    so the thresholds can be stored as float32 without changing any split.
+    """
+    rounded = values.astype(np.float32)
+    too_large = rounded.astype(np.float64) > values
+    rounded[too_large] = np.nextafter(rounded[too_large], np.float32(-np.inf))
+    return rounded
+
+
+def _to_float32_if_lossless(values: np.ndarray) -> np.ndarray:
+    """This returns the values as float32 if no precision is lost."""
+    rounded = values.astype(np.float32)
+    return rounded if np.array_equal(rounded.astype(np.float64), values) else values
+
+
+class FlatForest:
+    """Random Forest stored as contiguous node arrays. All the trees are
+    concatenated and the children indices point into the concatenated arrays.
+    The leaves point to themselves so every tree can be traversed for
+    `max_depth` steps at once.
+
+    Params:
+    -------
+    feature (ndarray): The feature used by each node.
+    threshold (ndarray): The split threshold of each node.
+    children (ndarray): The left and right child of each node, interleaved.
+        i.e. `children[2 * node]` is the left child and `children[2 * node + 1]`
+        is the right child.
+    value (ndarray): The prediction of each node.
+    roots (ndarray): The index of the root node of each tree.
+    max_depth (int): The depth of the deepest tree.
+    n_features (int): The number of features seen during fit.
+    """
+
+    def __init__(
+        self,
+        *,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        children: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        max_depth: int,
+        n_features: int,
+    ) -> None:
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features = n_features
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def nbytes(self) -> int:
+        """This returns the size of the node arrays in bytes."""
+        arrays = (self.feature, self.threshold, self.children, self.value)
+        return sum(arr.nbytes for arr in arrays)
+
+    def _predict_batch(self, X: np.ndarray) -> np.ndarray:
+        """This returns the predictions of a batch of rows."""
+        n_rows = X.shape[0]
+        X_flat = X.ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.intp) * self.n_features)[:, np.newaxis]
+        node = np.broadcast_to(self.roots, (n_rows, self.n_trees))
+
+        for _ in range(self.max_depth):
+            # Same as Scikit-learn: go left if X <= threshold
+            go_right = X_flat[row_offsets + self.feature[node]] > self.threshold[node]
+            node = self.children[2 * node + go_right]
+
+        tree_preds = self.value[node].astype(np.float64)
+        # Same summation order as RandomForestRegressor.predict
+        y_pred = np.zeros(n_rows, dtype=np.float64)
+        for idx in range(self.n_trees):
+            y_pred += tree_preds[:, idx]
+        y_pred /= self.n_trees
+        return y_pred
+
+    def predict(self, X: tp.Any, *, batch_size: int = BATCH_SIZE) -> np.ndarray:
+        """This returns the predictions. It gives the same results as the
+        `predict` method of the fitted Random Forest.
+
+        Params:
+        -------
+        X (array-like): The features. Shape: (n_rows, n_features).
+        batch_size (int, default=BATCH_SIZE): The number of rows scored at once.
+
+        Returns:
+        --------
+        y_pred (ndarray): The predicted values.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)  # Same as Scikit-learn
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"X should have shape (n_rows, {self.n_features}). Got {X.shape}")
+
+        if X.shape[0] <= batch_size:
+            return self._predict_batch(X)
+        return np.concatenate(
+            [
+                self._predict_batch(X[start : start + batch_size])
+                for start in range(0, X.shape[0], batch_size)
+            ]
+        )
+
+
+def export_forest(estimator: tp.Any) -> FlatForest:
+    """This returns the fitted Random Forest as a FlatForest.
+
+    Params:
+    -------
+    estimator (Estimator): A fitted RandomForestRegressor (or a Pipeline
+        whose final step is a fitted RandomForestRegressor).
+
+    Returns:
+    --------
+    forest (FlatForest): The exported forest.
+    """
+    if isinstance(estimator, Pipeline):
+        estimator = estimator[-1]
+    if not hasattr(estimator, "estimators_") or not hasattr(estimator.estimators_[0], "tree_"):
+        raise NotImplementedError("Unsupported estimator")
+    if estimator.n_outputs_ != 1:
+        raise NotImplementedError("Unsupported estimator. Only 1 output is supported")
+
+    trees = [tree.tree_ for tree in estimator.estimators_]
+    node_counts = np.array([tree.node_count for tree in trees])
+    roots = np.concatenate([[0], np.cumsum(node_counts)[:-1]])
+    node_ids = np.arange(node_counts.sum())
+
+    children_left = np.concatenate([tree.children_left + root for tree, root in zip(trees, roots)])
+    children_right = np.concatenate(
+        [tree.children_right + root for tree, root in zip(trees, roots)]
+    )
+    is_leaf = np.concatenate([tree.children_left == -1 for tree in trees])
+    children_left[is_leaf] = node_ids[is_leaf]  # Leaves point to themselves
+    children_right[is_leaf] = node_ids[is_leaf]
+    children = np.stack([children_left, children_right], axis=1).ravel()
+
+    feature = np.concatenate([tree.feature for tree in trees])
+    feature[is_leaf] = 0
+    threshold = np.concatenate([tree.threshold for tree in trees])
+    value = np.concatenate([tree.value[:, 0, 0] for tree in trees])
+
+    return FlatForest(
+        feature=feature.astype(np.int32),
+        threshold=_floor_to_float32(threshold),
+        children=children.astype(np.intp),
+        value=_to_float32_if_lossless(value),
+        roots=roots.astype(np.intp),
+        max_depth=max(tree.max_depth for tree in trees),
+        n_features=estimator.n_features_in_,
+    )
@@ -0,0 +1,337 @@
+"""
+This module is used to fit the preprocessing steps of the training pipeline out of
+core: their statistics (the NaN flags, the imputation medians, the Yeo-Johnson
+lambdas and the scaler moments) are accumulated batch by batch in a single pass.
+The accumulators are mergeable, i.e. the statistics of several files (or workers)
+can be merged instead of reading the data again.
+
+author: Chinedu Ezeofor
+"""
+import copy
+import typing as tp
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+from sklearn.preprocessing import StandardScaler
+from feature_engine.imputation import MeanMedianImputer, AddMissingIndicator
+from feature_engine.transformation import YeoJohnsonTransformer
+
+# The Yeo-Johnson lambdas searched (step 0.05). The lambda of a variable is the
+# one of the grid maximizing the log-likelihood.
+LAMBDAS = np.round(np.linspace(-3, 3, 121), 2)
+SAMPLE_ROWS = 1_000  # Rows kept to fit the attributes of the steps (e.g the feature names)
+# The stateful steps supported (in this order)
+STATEFUL_STEPS = (AddMissingIndicator, MeanMedianImputer, YeoJohnsonTransformer, StandardScaler)
+
+
+def _get_moments(values: np.ndarray) -> tp.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """This returns the count, the mean and the sum of the squared deviations
+    of the columns of a 2D array (the NaNs are ignored)."""
+    is_valid = ~np.isnan(values)
+    count = is_valid.sum(axis=0).astype(np.float64)
+    total = np.where(is_valid, values, 0).sum(axis=0)
+    mean = np.divide(total, count, out=np.zeros_like(total), where=count > 0)
+    m2 = (np.where(is_valid, values - mean, 0) ** 2).sum(axis=0)
+    return count, mean, m2
+
+
+class Moments:
+    """Mergeable count, mean and sum of the squared deviations (M2) of columns
+    (the NaNs are ignored). They are merged with the pairwise algorithm of Chan
+    et al. so the variance is as precise as a single pass over all the values.
+
+    Params:
+    -------
+    n_columns (int): The number of columns.
+    """
+
+    def __init__(self, n_columns: int) -> None:
+        self.count = np.zeros(n_columns)
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+
+    @property
+    def var(self) -> np.ndarray:
+        """The (biased) variance of the columns."""
+        return np.divide(self.m2, self.count, out=np.zeros_like(self.m2), where=self.count > 0)
+
+    def add_moments(self, *, count: np.ndarray, mean: np.ndarray, m2: np.ndarray) -> "Moments":
+        """This merges the moments of other values (in place)."""
+        total = self.count + count
+        ratio = np.divide(count, total, out=np.zeros_like(total), where=total > 0)
+        delta = mean - self.mean
+        self.m2 = self.m2 + m2 + delta**2 * self.count * ratio
+        self.mean = self.mean + delta * ratio
+        self.count = total
+        return self
+
+    def update(self, values: np.ndarray) -> "Moments":
+        """This adds the rows of a 2D array."""
+        count, mean, m2 = _get_moments(values)
+        return self.add_moments(count=count, mean=mean, m2=m2)
+
+    def merge(self, other: "Moments") -> "Moments":
+        """This adds the values of another accumulator."""
+        return self.add_moments(count=other.count, mean=other.mean, m2=other.m2)
+
+
+class ValueCounts:
+    """Mergeable counts of the values of a variable (the NaNs are ignored). The
+    median is exact, so it's meant for variables with a few distinct values
+    (e.g RatecodeID)."""
+
+    def __init__(self) -> None:
+        self.counts = pd.Series(dtype=np.float64)
+
+    def update(self, values: pd.Series) -> "ValueCounts":
+        """This adds the values of a batch."""
+        self.counts = self.counts.add(values.value_counts(), fill_value=0)
+        return self
+
+    def merge(self, other: "ValueCounts") -> "ValueCounts":
+        """This adds the counts of another accumulator."""
+        self.counts = self.counts.add(other.counts, fill_value=0)
+        return self
+
+    def median(self) -> float:
+        """This returns the median of the values (like `pd.Series.median`)."""
+        counts = self.counts.sort_index()
+        cum_counts = counts.cumsum().to_numpy()
+        if cum_counts.size == 0:
+            return np.nan
+        n_values = cum_counts[-1]
+        # The middle value(s) of the sorted values (0-based positions)
+        positions = np.array([(n_values - 1) // 2, n_values // 2])
+        middle = counts.index.to_numpy()[np.searchsorted(cum_counts, positions + 1)]
+        return float(np.mean(middle))
+
+
+class YeoJohnsonStats:
+    """Mergeable statistics of a variable used to find its Yeo-Johnson lambda: the
+    moments of the variable transformed with each lambda of `LAMBDAS` and the sum
+    of sign(x) * log1p(|x|). The log-likelihood of a lambda only depends on them
+    (see `scipy.stats.yeojohnson_llf`). The NaNs are ignored."""
+
+    def __init__(self) -> None:
+        self.moments = Moments(len(LAMBDAS))
+        self.log_sum = 0.0
+
+    def add_values(self, values: np.ndarray, *, count: float = 1.0) -> "YeoJohnsonStats":
+        """This adds the (non NaN) values of a 1D array, each one `count` times."""
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+        moments = [
+            _get_moments(stats.yeojohnson(values, lmbda=lmbda)[:, np.newaxis]) for lmbda in LAMBDAS
+        ]
+        n_values, mean, m2 = (np.concatenate(stat) for stat in zip(*moments))
+        self.moments.add_moments(count=n_values * count, mean=mean, m2=m2 * count)
+        self.log_sum += count * float(np.sum(np.sign(values) * np.log1p(np.abs(values))))
+        return self
+
+    def update(self, values: np.ndarray) -> "YeoJohnsonStats":
+        """This adds the values of a batch."""
+        return self.add_values(values)
+
+    def merge(self, other: "YeoJohnsonStats") -> "YeoJohnsonStats":
+        """This adds the statistics of another accumulator."""
+        self.moments.merge(other.moments)
+        self.log_sum += other.log_sum
+        return self
+
+    def get_lambda_index(self) -> int:
+        """This returns the index (in `LAMBDAS`) of the lambda maximizing the log-likelihood."""
+        with np.errstate(divide="ignore"):
+            log_likelihood = (
+                -self.moments.count / 2 * np.log(self.moments.var) + (LAMBDAS - 1) * self.log_sum
+            )
+        return int(np.argmax(log_likelihood))
+
+
+def _get_variables(step: tp.Any, X: pd.DataFrame) -> tp.List[str]:
+    """This returns the variables of a feature-engine step (all the numerical
+    variables if they aren't set)."""
+    if step.variables is None:
+        return X.select_dtypes(include="number").columns.to_list()
+    if isinstance(step.variables, (str, int)):
+        return [step.variables]
+    return list(step.variables)
+
+
+class PreprocessingStats:  # pylint: disable=too-many-instance-attributes
+    """Mergeable statistics of the preprocessing steps of a pipeline accumulated batch
+    by batch with `update`, then set on the steps with `fit_steps`. The stateful
+    steps supported are AddMissingIndicator, MeanMedianImputer (median),
+    YeoJohnsonTransformer and StandardScaler (in this order, the scaler is the last
+    step). The other steps must not learn from the data (e.g select, drop or
+    calculate features).
+
+    The imputation is deferred: the missing values of the imputed variables are
+    counted by the next accumulators and added with the median by `fit_steps`.
+    The moments of the Yeo-Johnson variables are the moments of their transformed
+    values (for the lambda found).
+
+    Params:
+    -------
+    steps (List[Tuple[str, Estimator]]): The preprocessing steps (e.g `pipe.steps[:-1]`).
+        They are fitted in place.
+    """
+
+    def __init__(self, *, steps: tp.List[tp.Tuple[str, tp.Any]]) -> None:
+        types = [type(step) for _, step in steps if isinstance(step, STATEFUL_STEPS)]
+        order = [STATEFUL_STEPS.index(type_) for type_ in types]
+        if order != sorted(set(order)):
+            raise ValueError(f"Unsupported order of the stateful steps: {types}")
+        for _, step in steps:
+            if isinstance(step, MeanMedianImputer) and step.imputation_method != "median":
+                raise ValueError("Only the median imputation is supported")
+        if StandardScaler in types and not isinstance(steps[-1][1], StandardScaler):
+            raise ValueError("The StandardScaler must be the last step")
+
+        self.steps = steps
+        self.n_rows = 0
+        self.sample: tp.Optional[pd.DataFrame] = None
+        self.n_missing: tp.Dict[str, int] = {}
+        self.value_counts: tp.Dict[str, ValueCounts] = {}
+        self.yeo_johnson: tp.Dict[str, YeoJohnsonStats] = {}
+        self.columns: tp.List[str] = []  # The columns of the scaler
+        self.moments: tp.Optional[Moments] = None
+
+    def update(self, X: pd.DataFrame) -> "PreprocessingStats":
+        """This adds a batch of training data.
+
+        Params:
+        -------
+        X (Pandas DF): The input features of the batch.
+
+        Returns:
+        --------
+        self (PreprocessingStats): The statistics.
+        """
+        if self.sample is None:
+            self.sample = X.iloc[:SAMPLE_ROWS].copy()
+        self.n_rows += len(X)
+
+        for _, step in self.steps:
+            if isinstance(step, AddMissingIndicator):
+                # The flags of all the variables (the NaNs are counted)
+                variables = _get_variables(step, X)
+                is_missing = X[variables].isna()
+                for var, count in is_missing.sum().items():
+                    self.n_missing[var] = self.n_missing.get(var, 0) + int(count)
+                X = X.assign(**{f"{var}_na": is_missing[var].astype(int) for var in variables})
+            elif isinstance(step, MeanMedianImputer):
+                for var in _get_variables(step, X):
+                    self.value_counts.setdefault(var, ValueCounts()).update(X[var])
+            elif isinstance(step, YeoJohnsonTransformer):
+                for var in _get_variables(step, X):
+                    values = X[var].to_numpy(dtype=np.float64, na_value=np.nan)
+                    self.yeo_johnson.setdefault(var, YeoJohnsonStats()).update(values)
+            elif isinstance(step, StandardScaler):
+                if self.moments is None:
+                    self.columns = X.columns.to_list()
+                    self.moments = Moments(len(self.columns))
+                self.moments.update(X[self.columns].to_numpy(dtype=np.float64, na_value=np.nan))
+            else:
+                X = step.fit_transform(X)
+        return self
+
+    def merge(self, other: "PreprocessingStats") -> "PreprocessingStats":
+        """This adds the statistics of other batches (of the same steps)."""
+        if self.sample is None:
+            self.sample = other.sample
+        self.n_rows += other.n_rows
+        for var, count in other.n_missing.items():
+            self.n_missing[var] = self.n_missing.get(var, 0) + count
+        for accumulators, other_accumulators in [
+            (self.value_counts, other.value_counts),
+            (self.yeo_johnson, other.yeo_johnson),
+        ]:
+            for var, accumulator in other_accumulators.items():
+                if var in accumulators:
+                    accumulators[var].merge(accumulator)
+                else:
+                    accumulators[var] = copy.deepcopy(accumulator)
+        if other.moments is not None:
+            if self.moments is None:
+                self.columns, self.moments = other.columns, copy.deepcopy(other.moments)
+            else:
+                self.moments.merge(other.moments)
+        return self
+
+    def _get_scaler_moments(
+        self, *, medians: tp.Dict[str, float], yeo_johnson: tp.Dict[str, tp.Tuple[Moments, int]]
+    ) -> Moments:
+        """This returns the moments of the (imputed and transformed) scaler columns."""
+        moments = copy.deepcopy(self.moments)
+        # The imputed values of the variables with NaNs
+        n_imputed = np.array(
+            [
+                self.n_rows - count if col in medians and col not in yeo_johnson else 0
+                for col, count in zip(self.columns, moments.count)
+            ]
+        )
+        imputed = np.array([medians.get(col, 0.0) for col in self.columns])
+        moments.add_moments(count=n_imputed, mean=imputed, m2=np.zeros(len(self.columns)))
+        # The transformed values of the Yeo-Johnson variables
+        for idx, col in enumerate(self.columns):
+            if col in yeo_johnson:
+                var_moments, lambda_idx = yeo_johnson[col]
+                moments.count[idx] = var_moments.count[lambda_idx]
+                moments.mean[idx] = var_moments.mean[lambda_idx]
+                moments.m2[idx] = var_moments.m2[lambda_idx]
+        return moments
+
+    def fit_steps(self) -> tp.List[tp.Tuple[str, tp.Any]]:
+        """This sets the statistics on the steps and returns them. The steps are
+        first fitted on the sample rows (the first rows of the data) to set their
+        other attributes (e.g the feature names).
+
+        Returns:
+        --------
+        steps (List[Tuple[str, Estimator]]): The fitted steps.
+        """
+        if self.sample is None:
+            raise ValueError("No data was added to the statistics")
+        medians = {var: counts.median() for var, counts in self.value_counts.items()}
+        # The moments and the lambda (index) of each Yeo-Johnson variable
+        yeo_johnson = {}
+        for var, var_stats in self.yeo_johnson.items():
+            n_imputed = self.n_rows - var_stats.moments.count[0]
+            if var in medians and n_imputed:
+                var_stats = copy.deepcopy(var_stats).add_values(
+                    np.array([medians[var]]), count=n_imputed
+                )
+            yeo_johnson[var] = (var_stats.moments, var_stats.get_lambda_index())
+
+        X = self.sample
+        for _, step in self.steps:
+            step.fit(X)
+            if isinstance(step, AddMissingIndicator):
+                step.variables_ = [
+                    var
+                    for var in _get_variables(step, X)
+                    if self.n_missing.get(var, 0) or not step.missing_only
+                ]
+            elif isinstance(step, MeanMedianImputer):
+                step.imputer_dict_ = {var: medians[var] for var in step.variables_}
+            elif isinstance(step, YeoJohnsonTransformer):
+                step.lambda_dict_ = {
+                    var: float(LAMBDAS[yeo_johnson[var][1]]) for var in step.variables_
+                }
+            elif isinstance(step, StandardScaler):
+                moments = self._get_scaler_moments(medians=medians, yeo_johnson=yeo_johnson)
+                indices = [self.columns.index(col) for col in X.columns]
+                count = moments.count[indices]
+                var = moments.var[indices]
+                step.n_samples_seen_ = (
+                    int(count[0]) if np.all(count == count[0]) else count.astype(np.int64)
+                )
+                if step.with_mean:
+                    step.mean_ = moments.mean[indices]
+                if step.with_std:
+                    step.var_ = var
+                    step.scale_ = np.where(var > 0, np.sqrt(var), 1.0)
+            X = step.transform(X)
+        return self.steps
@@ -0,0 +1,88 @@
+"""
+This module is used to reduce and report the memory used by the loaded trip data.
+The compact layout downcasts the integers to the smallest integer type, the floats
+to float32, the categorical variables to `category` and the other strs (e.g. the
+IDs) to Arrow strings.
+
+author: Chinedu Ezeofor
+"""
+import typing as tp
+
+import numpy as np
+import pandas as pd
+
+# Custom Imports
+from src.config.core import config
+
+MB = 1024**2
+SAMPLE_ROWS = 10_000  # Rows used to estimate the size of the object columns
+ARROW_STRING_DTYPE = "string[pyarrow]"
+
+
+def _compact_column(values: pd.Series, *, categorical: bool) -> pd.Series:
+    """This returns the column with the compact dtype (or the column itself)."""
+    if categorical:
+        return values.astype("category")
+    if pd.api.types.is_integer_dtype(values.dtype) and not pd.api.types.is_extension_array_dtype(
+        values.dtype
+    ):
+        return pd.to_numeric(values, downcast="integer")
+    if values.dtype == np.float64:
+        return values.astype(np.float32)
+    if values.dtype == object:
+        return values.astype(ARROW_STRING_DTYPE)
+    return values  # e.g datetimes
+
+
+def compact_dtypes(
+    data: pd.DataFrame, *, categorical_vars: tp.Optional[tp.Sequence[str]] = None
+) -> pd.DataFrame:
+    """This converts the columns of the data to a compact layout. The DF is modified
+    in place (one column at a time so only one column is copied at once).
+
+    Params:
+    -------
+    data (Pandas DF): DF containing the data.
+    categorical_vars (Sequence[str], default=None): The columns converted to `category`.
+        If None, the `CATEGORICAL_VARS` of the config are used.
+
+    Returns:
+    --------
+    data (Pandas DF): The DF with the compact layout:
+        - integers: the smallest integer type holding the values (e.g int8, int16)
+        - float64: float32 (~7 significant digits)
+        - categorical variables: category
+        - other strs: string[pyarrow]
+        - other dtypes: unchanged
+    """
+    if categorical_vars is None:
+        categorical_vars = config.model_config.CATEGORICAL_VARS
+    for col in data.columns:
+        data[col] = _compact_column(data[col], categorical=col in categorical_vars)
+    return data
+
+
+def memory_report(data: pd.DataFrame) -> pd.DataFrame:
+    """This returns the dtype and the memory used by each column of the data.
+    The memory of the object (e.g str) columns is estimated from a sample of
+    `SAMPLE_ROWS` rows (measuring every Python object is slow).
+
+    Params:
+    -------
+    data (Pandas DF): DF containing the data.
+
+    Returns:
+    --------
+    report (Pandas DF): The dtype and the memory (MB) of each column, sorted by memory.
+    """
+    memory = {}
+    for col in data.columns:
+        values = data[col]
+        if values.dtype == object and len(values) > SAMPLE_ROWS:
+            sample = values.sample(n=SAMPLE_ROWS, random_state=0)
+            memory[col] = sample.memory_usage(index=False, deep=True) * len(values) / SAMPLE_ROWS
+        else:
+            memory[col] = values.memory_usage(index=False, deep=True)
+
+    report = pd.DataFrame({"dtype": data.dtypes.astype(str), "memory (MB)": pd.Series(memory) / MB})
+    return report.sort_values("memory (MB)", ascending=False).round({"memory (MB)": 2})
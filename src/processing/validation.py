@@ -0,0 +1,198 @@
+"""
+This module is used to validate the data column by column.
+
+author: Chinedu Ezeofor
+"""
+import json
+import typing as tp
+import datetime
+
+# Standard imports
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel  # pylint: disable=no-name-in-module
+from pydantic.fields import ModelField  # pylint: disable=no-name-in-module
+from pydantic.error_wrappers import flatten_errors  # pylint: disable=no-name-in-module
+from pydantic.datetime_parse import MS_WATERSHED  # pylint: disable=no-name-in-module
+
+# Pydantic (v1) error messages and types
+ERRORS = {
+    int: {"msg": "value is not a valid integer", "type": "type_error.integer"},
+    "missing": {"msg": "field required", "type": "value_error.missing"},
+    "none": {"msg": "none is not an allowed value", "type": "type_error.none.not_allowed"},
+}
+INT64_BOUND = 2**63  # Python ints outside [-2**63, 2**63) don't fit in int64
+# Datetimes written as "YYYY-MM-DD[T ]HH:MM[:SS[.ffffff]]" are parsed the same way by
+# Pandas and Pydantic. The other formats are left to Pydantic.
+ISO_DATETIME = r"[0-9]{4}-[0-9]{2}-[0-9]{2}[T ][0-9]{2}:[0-9]{2}(:[0-9]{2}(\.[0-9]{1,6})?)?"
+TIMESTAMP_BOUND_US = pd.Timestamp.max.value // 1_000  # Pandas datetimes are in ns
+
+
+def _coerce_int(values: pd.Series) -> tp.Optional[tp.Tuple[np.ndarray, np.ndarray]]:
+    """This returns the numeric values as integers (floats if there are nulls)
+    and a mask of the values that are not valid integers. It returns None if
+    the values can't be coerced with vectorized operations."""
+    if pd.api.types.is_integer_dtype(values) or pd.api.types.is_bool_dtype(values):
+        if values.isna().any():
+            return None
+        return values.to_numpy(dtype="int64"), np.zeros(len(values), dtype=bool)
+    if not pd.api.types.is_float_dtype(values):
+        return None
+
+    numbers = values.to_numpy(dtype="float64", na_value=np.nan)
+    invalid = np.isinf(numbers)  # Same as int(value): NaN is a null, inf is an error
+    numbers = np.trunc(np.where(invalid, np.nan, numbers))
+    if (np.abs(numbers) >= INT64_BOUND).any():
+        return None  # The values are kept as Python ints instead of wrapping around
+    if np.isnan(numbers).any():
+        return numbers, invalid
+    return numbers.astype("int64"), invalid
+
+
+def _coerce_float(values: pd.Series) -> tp.Optional[tp.Tuple[np.ndarray, np.ndarray]]:
+    """This returns the numeric values as floats. It returns None if the
+    values can't be coerced with vectorized operations."""
+    if not pd.api.types.is_numeric_dtype(values):
+        return None
+    return values.to_numpy(dtype="float64", na_value=np.nan), np.zeros(len(values), dtype=bool)
+
+
+def _coerce_timestamps(values: pd.Series) -> tp.Optional[tp.Tuple[tp.Any, np.ndarray]]:
+    """This returns the unix timestamps (integers, in seconds or milliseconds)
+    as UTC datetimes. It returns None for the other values, e.g. floats and
+    values that are out of the range of Pandas."""
+    numbers = values.to_numpy(dtype="float64", na_value=np.nan)
+    is_null = np.isnan(numbers)
+    numbers = np.where(is_null, 0, numbers)
+    in_ms = np.abs(numbers) > MS_WATERSHED  # Same as Pydantic
+    microseconds = np.where(in_ms, numbers * 1_000, numbers * 1_000_000)
+    if (
+        (np.trunc(numbers) != numbers).any()
+        or (np.abs(numbers) > MS_WATERSHED * 1_000).any()
+        or (np.abs(microseconds) >= TIMESTAMP_BOUND_US).any()
+    ):
+        return None
+    dates = pd.to_datetime(microseconds.astype("int64"), unit="us", utc=True)
+    return dates.where(~is_null, pd.NaT).array, np.zeros(len(values), dtype=bool)
+
+
+def _coerce_datetime(values: pd.Series) -> tp.Optional[tp.Tuple[tp.Any, np.ndarray]]:
+    """This returns the values as datetimes. Only datetimes, ISO strings and unix
+    timestamps are parsed with vectorized operations. It returns None for the
+    other values, e.g. other formats."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.array, np.zeros(len(values), dtype=bool)
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return _coerce_timestamps(values)
+
+    is_null = values.isna().to_numpy()
+    strings = values[~is_null]
+    if pd.api.types.infer_dtype(strings, skipna=False) != "string":
+        return None
+    if not strings.str.fullmatch(ISO_DATETIME).all():
+        return None
+    dates = pd.to_datetime(values, errors="coerce")
+    if dates.isna().to_numpy().sum() != is_null.sum():
+        return None  # Invalid dates, e.g. 2022-02-30, get the Pydantic errors
+    return dates.array, np.zeros(len(values), dtype=bool)
+
+
+def _coerce_str(values: pd.Series) -> tp.Optional[tp.Tuple[tp.Any, np.ndarray]]:
+    """This returns the values if they are all strings (or nulls). It returns
+    None otherwise."""
+    if pd.api.types.infer_dtype(values, skipna=True) != "string":
+        return None
+    return values.where(values.notna(), None).array, np.zeros(len(values), dtype=bool)
+
+
+def _coerce_field(
+    values: pd.Series, field: ModelField
+) -> tp.Optional[tp.Tuple[tp.Any, np.ndarray]]:
+    """This returns the coerced values and a mask of the invalid values or None
+    if the values have to be validated one by one."""
+    coerce = {
+        int: _coerce_int,
+        float: _coerce_float,
+        datetime.datetime: _coerce_datetime,
+        str: _coerce_str,
+    }.get(field.type_)
+    return coerce(values) if coerce is not None else None
+
+
+def _validate_values(
+    values: pd.Series, field: ModelField, schema: tp.Type[BaseModel]
+) -> tp.Tuple[tp.Any, tp.List[tp.Tuple[int, tp.Dict]]]:
+    """This validates the values one by one with the Pydantic field, i.e. the
+    values and the errors are the same as when validating one object per row.
+    Nulls (None and NaN) are validated as None."""
+    is_null = values.isna().tolist()
+    validated, errors = [], []
+    for row, (value, null) in enumerate(zip(values.tolist(), is_null)):
+        value, error = field.validate(None if null else value, {}, loc=field.name, cls=schema)
+        if error:
+            errors.extend((row, err) for err in flatten_errors([error], schema.__config__))
+        validated.append(value)
+    # Same dtype as a DF created from the validated Pydantic objects
+    return pd.Series(validated, dtype=None if validated else object).array, errors
+
+
+def validate_columns(
+    *,
+    data: pd.DataFrame,
+    schema: tp.Type[BaseModel],
+    loc: str = "inputs",
+) -> tp.Tuple[tp.Optional[pd.DataFrame], tp.Union[None, str]]:
+    """This is used to validate the data using the field definitions of a
+    Pydantic Model. The columns are coerced with vectorized NumPy/Pandas
+    operations instead of creating one Pydantic object per row. The columns
+    that can't be coerced that way (e.g. mixed types) are validated value by
+    value with the Pydantic field.
+
+    Params:
+    -------
+    data (Pandas DF): DF containing the data.
+    schema (BaseModel): The Pydantic Model describing a single row.
+    loc (str, default="inputs"): The name of the field containing the rows.
+        It's used as the first item in the location of the errors.
+
+    Returns:
+    --------
+    data (Pandas DF): The validated DF. It contains only the schema fields.
+    error (str or None): None if there's no error else a JSON str with the
+        same format as the Pydantic ValidationError.
+    """
+    n_rows = len(data)
+    columns, errors = {}, []
+
+    for position, (name, field) in enumerate(schema.__fields__.items()):
+        if name not in data.columns:
+            if field.required:
+                errors.extend((row, position, name, ERRORS["missing"]) for row in range(n_rows))
+            columns[name] = np.full(n_rows, None, dtype=object)
+            continue
+
+        values = data[name].reset_index(drop=True)
+        coerced = _coerce_field(values, field)
+        if coerced is None:
+            columns[name], field_errors = _validate_values(values, field, schema)
+            errors.extend((row, position, name, err) for row, err in field_errors)
+            continue
+
+        columns[name], invalid = coerced
+        if not field.allow_none:
+            is_null = values.isna().to_numpy()
+            errors.extend((row, position, name, ERRORS["none"]) for row in np.flatnonzero(is_null))
+        errors.extend((row, position, name, ERRORS[int]) for row in np.flatnonzero(invalid))
+
+    if errors:
+        errors.sort(key=lambda err: (err[0], err[1]))  # Same order as Pydantic
+        error = json.dumps(
+            [
+                {"loc": [loc, int(row), name], **{key: err[key] for key in err if key != "loc"}}
+                for row, _, name, err in errors
+            ],
+            indent=2,
+        )
+        return (None, error)
+
+    return (pd.DataFrame(data=columns, index=pd.RangeIndex(n_rows)), None)
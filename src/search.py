@@ -0,0 +1,221 @@
+"""
+This module is used to search the hyperparameters of the Random Forest model with
+successive halving on the training rows: all the candidates are fitted on a few
+rows, the best 1/factor of them are fitted again on factor times more rows, etc.
+until the candidates are fitted on all the rows.
+
+The preprocessing steps are fitted once and their output is saved as .npy files
+shared (memory-mapped) by the worker processes. Each worker fits one candidate at
+a time with a single thread, so the search time decreases with the workers.
+
+author: Chinedu Ezeofor
+"""
+import math
+import time
+import itertools
+import typing as tp
+import warnings
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel, Field  # pylint: disable=no-name-in-module
+from sklearn.pipeline import Pipeline
+from sklearn.model_selection import ParameterGrid
+
+from src.pipeline import build_pipeline
+
+# Custom Imports
+from src.config.core import config
+from src.utilities.parallel import get_n_jobs, limit_threads
+from src.utilities.experiment import eval_metrics
+from src.processing.data_manager import split_train_data
+
+warnings.filterwarnings("error")
+
+ARRAY_NAMES = ("X_train", "y_train", "X_validate", "y_validate")
+
+
+def get_search_space() -> tp.Dict[str, tp.List]:
+    """This returns the hyperparameters searched (the `SEARCH_*` of the config)."""
+    return {
+        "n_estimators": config.model_config.SEARCH_N_ESTIMATORS,
+        "max_depth": config.model_config.SEARCH_MAX_DEPTH,
+    }
+
+
+class HalvingConfig(BaseModel):
+    """
+    Config object for the successive halving of the search (see `run_search`).
+
+    Params:
+    -------
+    search_space (Dict[str, List], default=get_search_space()): The values of each
+        hyperparameter.
+    min_rows (int, default=SEARCH_MIN_ROWS): The training rows of the first round.
+    factor (int, default=SEARCH_FACTOR): 1/factor of the candidates are kept after a
+        round and the next round uses factor times more rows.
+    n_workers (int, default=None): The number of processes (see `get_n_jobs`).
+    """
+
+    search_space: tp.Dict[str, tp.List] = Field(default_factory=get_search_space)
+    min_rows: int = Field(default_factory=lambda: config.model_config.SEARCH_MIN_ROWS)
+    factor: int = Field(default_factory=lambda: config.model_config.SEARCH_FACTOR)
+    n_workers: tp.Optional[int] = None
+
+
+def fit_preprocessing(*, train_data: pd.DataFrame, data_dir: tp.Union[str, Path]) -> Pipeline:
+    """This fits the preprocessing steps of the Random Forest pipeline once and saves
+    the preprocessed training and validation data in `data_dir` (the features as
+    float32, the dtype used by the trees).
+
+    Params:
+    -------
+    train_data (Pandas DF): DF containing the training data.
+    data_dir (Path): The directory of the preprocessed data.
+
+    Returns:
+    --------
+    preprocessing (Pipeline): The fitted preprocessing steps.
+    """
+    X_train, X_validate, y_train, y_validate = split_train_data(
+        data=train_data,
+        target=config.model_config.TARGET,
+        test_size=config.model_config.TEST_SIZE,
+        random_state=config.model_config.RANDOM_STATE,
+    )
+    preprocessing = build_pipeline(estimator="random_forest")[:-1]
+    with limit_threads():
+        arrays = {
+            "X_train": preprocessing.fit_transform(X_train),
+            "y_train": y_train,
+            "X_validate": preprocessing.transform(X_validate),
+            "y_validate": y_validate,
+        }
+    for name, values in arrays.items():
+        dtype = np.float32 if name.startswith("X") else np.float64
+        np.save(Path(data_dir, f"{name}.npy"), np.ascontiguousarray(values, dtype=dtype))
+    return preprocessing
+
+
+def _load_arrays(data_dir: tp.Union[str, Path]) -> tp.Dict[str, np.ndarray]:
+    """This returns the (read-only, memory-mapped) preprocessed data."""
+    return {name: np.load(Path(data_dir, f"{name}.npy"), mmap_mode="r") for name in ARRAY_NAMES}
+
+
+def fit_candidate(
+    *,
+    data_dir: tp.Union[str, Path],
+    params: tp.Dict[str, tp.Any],
+    n_rows: int,
+    model_path: tp.Optional[Path] = None,
+) -> tp.Dict[str, tp.Any]:
+    """This fits a candidate (with a single thread) on the first `n_rows` rows of
+    the preprocessed training data and returns its validation metrics.
+
+    Params:
+    -------
+    data_dir (Path): The directory of the preprocessed data (see `fit_preprocessing`).
+    params (Dict): The hyperparameters of the model.
+    n_rows (int): The number of training rows (the rows are shuffled).
+    model_path (Path, default=None): If set, the fitted model is saved there.
+
+    Returns:
+    --------
+    trial (Dict): The params, the rows, the metrics and the model path of the candidate.
+    """
+    arrays = _load_arrays(data_dir)
+    model = build_pipeline(estimator="random_forest", model_params={**params, "n_jobs": 1})[-1]
+    with limit_threads(n_jobs=1, thread_limit=1):
+        start = time.perf_counter()
+        model.fit(arrays["X_train"][:n_rows], arrays["y_train"][:n_rows])
+        fit_time = time.perf_counter() - start
+        y_pred = model.predict(arrays["X_validate"])
+
+    rmse, mse, mae, r2 = eval_metrics(actual=arrays["y_validate"], pred=y_pred)
+    if model_path is not None:
+        joblib.dump(model, model_path)
+    return {
+        "params": params,
+        "n_rows": n_rows,
+        "metrics": {"RMSE": rmse, "MSE": mse, "MAE": mae, "R2": r2, "fit_time": fit_time},
+        "model_path": model_path,
+    }
+
+
+def _get_cost(params: tp.Dict[str, tp.Any]) -> float:
+    """This returns the relative fitting cost of a candidate (trees x depth)."""
+    n_estimators = params.get("n_estimators", config.model_config.N_ESTIMATORS)
+    max_depth = params.get("max_depth", config.model_config.MAX_DEPTH) or 32
+    return n_estimators * max_depth
+
+
+def run_search(
+    *,
+    data_dir: tp.Union[str, Path],
+    halving: tp.Optional[HalvingConfig] = None,
+) -> tp.Tuple[tp.List[tp.Dict[str, tp.Any]], tp.Any]:
+    """This searches the hyperparameters with successive halving on the training rows.
+    The candidates of a round are fitted by a pool of processes (the most costly
+    first, so the workers finish at about the same time).
+
+    Params:
+    -------
+    data_dir (Path): The directory of the preprocessed data (see `fit_preprocessing`).
+    halving (HalvingConfig, default=None): The search space and the settings of the
+        successive halving. If None, the defaults of `HalvingConfig` are used.
+
+    Returns:
+    --------
+    trials, model (Tuple): The trials of all the rounds (with their round) and the
+        model of the best candidate (fitted on all the rows).
+    """
+    if halving is None:
+        halving = HalvingConfig()
+    if halving.factor < 2:
+        raise ValueError(f"The factor must be at least 2, got {halving.factor}")
+
+    candidates = list(ParameterGrid(halving.search_space))
+    n_total = len(_load_arrays(data_dir)["y_train"])
+    n_rows = min(halving.min_rows, n_total)
+    trials: tp.List[tp.Dict[str, tp.Any]] = []
+    # "spawn": forking a process with threads (e.g Prefect's) can deadlock
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=get_n_jobs(halving.n_workers), mp_context=context
+    ) as executor:
+        for round_ in itertools.count():
+            if len(candidates) == 1:
+                n_rows = n_total
+            is_last = n_rows == n_total
+            futures = {
+                idx: executor.submit(
+                    fit_candidate,
+                    data_dir=data_dir,
+                    params=candidates[idx],
+                    n_rows=n_rows,
+                    model_path=Path(data_dir, f"model-{idx}.joblib") if is_last else None,
+                )
+                for idx in sorted(
+                    range(len(candidates)),
+                    key=lambda idx, candidates=candidates: -_get_cost(candidates[idx]),
+                )
+            }
+            results = [{**futures[idx].result(), "round": round_} for idx in sorted(futures)]
+            model_paths = [trial.pop("model_path") for trial in results]
+            trials += results
+            if is_last:
+                break
+            results.sort(key=lambda trial: trial["metrics"]["RMSE"])
+            candidates = [
+                trial["params"] for trial in results[: math.ceil(len(results) / halving.factor)]
+            ]
+            n_rows = min(n_rows * halving.factor, n_total)
+
+    best_idx = min(range(len(results)), key=lambda idx: results[idx]["metrics"]["RMSE"])
+    model = joblib.load(model_paths[best_idx])
+    model.set_params(n_jobs=config.model_config.N_JOBS)
+    return trials, model
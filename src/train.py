@@ -3,33 +3,47 @@ This module is used to train the model.
 
 author: Chinedu Ezeofor
 """
+import math
 import typing as tp
 import warnings
+from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
-from src.pipeline import rf_pipe
+from src.pipeline import build_pipeline
 
 # Custom Imports
 from src.config.core import config
+from src.utilities.parallel import limit_threads, get_model_n_jobs
+from src.processing.incremental import PreprocessingStats
 from src.utilities.experiment import eval_metrics
-from src.processing.data_manager import load_data, save_model, split_train_data
+from src.processing.data_manager import (
+    ITER_BATCH_ROWS,
+    LOAD_COLUMNS,
+    iter_data,
+    load_data,
+    save_model,
+    split_train_data,
+)
 
 warnings.filterwarnings("error")
 
 
-def train_model(*, train_data: pd.DataFrame) -> tp.Tuple:
-    """This is used to train the model.
+def train_model(*, train_data: pd.DataFrame, use_cache: bool = False) -> tp.Tuple:
+    """This is used to train a new pipeline (see `build_pipeline`).
 
     Params:
         train_data (Pandas DF): DF containing the training data.
+        use_cache (bool, default=False): If True, the fitted preprocessing steps
+            are cached (see `build_pipeline`), e.g. when retraining on the same data.
 
     Returns:
         pipe, y_validate, y_pred (Tuple): Tuple containing the
         trained_model_pipe, actual y and predicted y values.
     """
 
-    pipe = rf_pipe
+    pipe = build_pipeline(use_cache=use_cache)
     target = target = config.model_config.TARGET
     test_size = config.model_config.TEST_SIZE
     random_state = config.model_config.RANDOM_STATE
@@ -42,23 +56,136 @@ def train_model(*, train_data: pd.DataFrame) -> tp.Tuple:
         random_state=random_state,
     )
 
-    # Train Model
-    pipe.fit(X_train, y_train)
+    # Train Model (with N_JOBS workers, see `limit_threads`)
+    with limit_threads(n_jobs=get_model_n_jobs(pipe)):
+        pipe.fit(X_train, y_train)
 
-    # Predictions using validation data
-    y_pred = rf_pipe.predict(X_validate)
+        # Predictions using validation data
+        y_pred = pipe.predict(X_validate)
     return pipe, y_validate, y_pred
 
 
+def _iter_split_batches(
+    *, filename: tp.Union[str, Path, tp.Sequence[tp.Union[str, Path]]], uri: bool, batch_rows: int
+) -> tp.Iterator[tp.Tuple]:
+    """This yields the X_train, X_validate, y_train and y_validate of each batch of the
+    files. The split of a batch is the same on each pass over the files."""
+    for data in iter_data(filename=filename, uri=uri, batch_rows=batch_rows, columns=LOAD_COLUMNS):
+        yield split_train_data(
+            data=data,
+            target=config.model_config.TARGET,
+            test_size=config.model_config.TEST_SIZE,
+            random_state=config.model_config.RANDOM_STATE,
+        )
+
+
+def _iter_chunks(
+    batches: tp.Iterable[tp.Tuple], *, chunk_rows: int
+) -> tp.Iterator[tp.Tuple[pd.DataFrame, pd.Series]]:
+    """This yields the training data (X, y) of the batches in chunks of (at least)
+    `chunk_rows` rows (except the last chunk)."""
+    X_parts: tp.List[pd.DataFrame] = []
+    y_parts: tp.List[pd.Series] = []
+    n_rows = 0
+    for X_train, _, y_train, _ in batches:
+        X_parts.append(X_train)
+        y_parts.append(y_train)
+        n_rows += len(X_train)
+        if n_rows >= chunk_rows:
+            yield pd.concat(X_parts), pd.concat(y_parts)
+            X_parts, y_parts, n_rows = [], [], 0
+    if X_parts:
+        yield pd.concat(X_parts), pd.concat(y_parts)
+
+
+def _add_trees(
+    *, pipe: tp.Any, chunks: tp.Iterable[tp.Tuple[pd.DataFrame, pd.Series]], n_rows: int
+) -> None:
+    """This fits the trees of the Random Forest of a pipeline (with fitted
+    preprocessing steps) chunk by chunk (warm start): each chunk adds its share of
+    the trees (at least one) for the `n_rows` training rows."""
+    preprocessing, model = pipe[:-1], pipe.steps[-1][1]
+    n_trees = model.n_estimators
+    model.set_params(warm_start=True)
+    n_rows_seen = 0
+    for X, y in chunks:
+        n_rows_seen += len(X)
+        n_estimators = math.ceil(n_trees * n_rows_seen / n_rows)
+        model.set_params(n_estimators=max(n_estimators, len(getattr(model, "estimators_", [])) + 1))
+        model.fit(preprocessing.transform(X), y)
+    model.set_params(warm_start=False)
+
+
+def train_model_incremental(
+    *,
+    filename: tp.Union[str, Path, tp.Sequence[tp.Union[str, Path]]],
+    uri: bool = False,
+    batch_rows: int = ITER_BATCH_ROWS,
+    chunk_rows: tp.Optional[int] = None,
+) -> tp.Tuple:
+    """This is used to train a new Random Forest pipeline out of core, i.e. on more
+    months of data than the memory can hold. The files are read in batches (see
+    `iter_data`) and split like `train_model` (per batch):
+
+    1. The statistics of the preprocessing steps are accumulated in a single pass
+        (see `PreprocessingStats`).
+    2. The trees are added chunk by chunk (warm start): each chunk adds its share of
+        the `N_ESTIMATORS` trees (at least one), fitted on the chunk only.
+    3. The validation rows are predicted.
+
+    The histogram gradient boosting model isn't supported: its bins are fitted again
+    by each `fit`, so its iterations can't be added on new data.
+
+    Params:
+    -------
+    filename (Path or Sequence[Path]): The relative input filepath, a glob pattern
+        (e.g "yellow_tripdata_2022-*.parquet") or a sequence of filepaths.
+    uri (bool, default=False): True if the filename is an URI (e.g S3) else False
+    batch_rows (int, default=ITER_BATCH_ROWS): The rows read per batch.
+    chunk_rows (int, default=None): The training rows per chunk. If None, the
+        `INCREMENTAL_CHUNK_ROWS` of the config is used.
+
+    Returns:
+    --------
+    pipe, y_validate, y_pred (Tuple): Tuple containing the
+        trained_model_pipe, actual y and predicted y values.
+    """
+    if chunk_rows is None:
+        chunk_rows = config.model_config.INCREMENTAL_CHUNK_ROWS
+    pipe = build_pipeline(estimator="random_forest")
+    kwargs: tp.Dict[str, tp.Any] = {"filename": filename, "uri": uri, "batch_rows": batch_rows}
+
+    # Fit the preprocessing steps
+    preprocessing_stats = PreprocessingStats(steps=pipe.steps[:-1])
+    for X_train, _, _, _ in _iter_split_batches(**kwargs):
+        preprocessing_stats.update(X_train)
+    preprocessing_stats.fit_steps()
+
+    with limit_threads(n_jobs=get_model_n_jobs(pipe)):
+        # Add the trees of each chunk
+        _add_trees(
+            pipe=pipe,
+            chunks=_iter_chunks(_iter_split_batches(**kwargs), chunk_rows=chunk_rows),
+            n_rows=preprocessing_stats.n_rows,
+        )
+
+        # Predictions using validation data
+        y_validate, y_pred = [], []
+        for _, X_validate, _, y_val in _iter_split_batches(**kwargs):
+            y_validate.append(y_val)
+            y_pred.append(pipe.predict(X_validate))
+    return pipe, pd.concat(y_validate), np.concatenate(y_pred)
+
+
 if __name__ == "__main__":  # pragma: no cover
     # Load Data
-    train_data = load_data(filename=config.path_config.TRAIN_DATA)
+    train_data = load_data(filename=config.path_config.TRAIN_DATA, columns=LOAD_COLUMNS)
 
     # Train model
-    pipe, y_validate, y_pred = train_model(train_data=train_data)
+    pipe, y_validate, y_pred = train_model(train_data=train_data, use_cache=True)
 
     # Save model
-    save_model(filename=config.path_config.MODEL_PATH, pipe=rf_pipe)
+    save_model(filename=config.path_config.MODEL_PATH, pipe=pipe)
 
     # Evaluate model performance
     rmse, mse, mae, r2 = eval_metrics(actual=y_validate, pred=y_pred)
@@ -115,3 +115,35 @@ def run_experiment(
         else:
             mlflow.sklearn.log_model(estimator, "model")
     logger.info(f"========= Training {experiment.model_name!r} Done! =========")
+
+
+def log_trial(
+    *,
+    experiment: Experiment,
+    params: tp.Dict[str, tp.Any],
+    metrics: tp.Dict[str, float],
+    tags: tp.Optional[tp.Dict[str, tp.Any]] = None,
+) -> None:
+    """This is used to log a trial (e.g of a hyperparameter search) as an MLFlow run.
+    Unlike `run_experiment`, the model is already fitted and isn't logged.
+
+    Params:
+    -------
+    experiment (Experiment): Experiment object which contains the experiment meta data.
+    params (Dict): The hyperparameters of the trial.
+    metrics (Dict): The metrics of the trial. e.g `{"RMSE": 0.5}`
+    tags (Dict, default=None): Other tags of the run (the model name is a tag).
+
+    Returns:
+    --------
+    None
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # Required (MLFlow)
+        mlflow.set_tracking_uri(experiment.tracking_uri)
+        mlflow.set_experiment(experiment.experiment_name)
+
+        with mlflow.start_run(run_name=experiment.run_name):
+            mlflow.set_tags({"model_name": experiment.model_name, **(tags or {})})
+            mlflow.log_params(params)
+            mlflow.log_metrics(metrics)
@@ -0,0 +1,161 @@
+"""
+This module is used to configure the parallelism of the training and the batch
+predictions: the number of workers of the model (`N_JOBS`) and the number of
+threads of the BLAS/OpenMP libraries (`THREAD_LIMIT`) used by each worker, so
+the workers and their native threads don't use more threads than CPUs.
+
+author: Chinedu Ezeofor
+"""
+import os
+import typing as tp
+import threading
+from contextlib import contextmanager
+
+from threadpoolctl import threadpool_limits
+
+# Custom Imports
+from src.config.core import config
+
+# Tag of the Prefect tasks using all the CPUs. A concurrency limit of 1 on the tag
+# (`prefect concurrency-limit create cpu-bound 1`) runs them one at a time across flows.
+# The flows create it if it's missing (see `src.orchestrate.ensure_concurrency_limit`)
+CPU_BOUND_TAG = "cpu-bound"
+
+
+class _ThreadLimits:
+    """The BLAS/OpenMP limits of the CPU-bound sections running in the threads of a
+    process (e.g the tasks of a Prefect ConcurrentTaskRunner). The limits are global,
+    so the libraries use the smallest limit of the running sections and get their
+    original limits back when the last section is done. The lock is only held while
+    the limits are changed, i.e. the sections themselves run concurrently."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._limits: tp.List[int] = []
+        self._original_limits: tp.Optional[threadpool_limits] = None
+
+    def _apply(self) -> None:
+        """This sets the limits of the libraries (the lock must be held)."""
+        if not self._limits:
+            if self._original_limits is not None:
+                self._original_limits.restore_original_limits()
+            self._original_limits = None
+        elif self._original_limits is None:
+            self._original_limits = threadpool_limits(limits=min(self._limits))
+        else:
+            threadpool_limits(limits=min(self._limits))
+
+    def add(self, limits: int) -> None:
+        """This adds the limit of a section that starts."""
+        with self._lock:
+            self._limits.append(limits)
+            self._apply()
+
+    def remove(self, limits: int) -> None:
+        """This removes the limit of a section that is done."""
+        with self._lock:
+            self._limits.remove(limits)
+            self._apply()
+
+
+_thread_limits = _ThreadLimits()
+
+
+def get_n_cpus() -> int:
+    """This returns the number of CPUs the process can run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover
+        return os.cpu_count() or 1  # e.g macOS
+
+
+def get_n_jobs(n_jobs: tp.Optional[int] = None) -> int:
+    """This returns the number of workers.
+
+    Params:
+    -------
+    n_jobs (int, default=None): The number of workers (joblib convention: -1 for
+        all the CPUs, -2 for all the CPUs but one, etc.). If None, the `N_JOBS`
+        of the config is used.
+
+    Returns:
+    --------
+    n_jobs (int): The number of workers (between 1 and the number of CPUs).
+    """
+    if n_jobs is None:
+        n_jobs = config.model_config.N_JOBS
+    n_cpus = get_n_cpus()
+    if n_jobs < 0:
+        n_jobs = n_cpus + 1 + n_jobs
+    return min(max(n_jobs, 1), n_cpus)
+
+
+def get_thread_limit(
+    *, n_jobs: tp.Optional[int] = None, thread_limit: tp.Optional[int] = None
+) -> int:
+    """This returns the number of BLAS/OpenMP threads per worker. If `thread_limit` and
+    the `THREAD_LIMIT` of the config are None, the CPUs are shared by the workers."""
+    if thread_limit is None:
+        thread_limit = config.model_config.THREAD_LIMIT
+    if thread_limit is None:
+        thread_limit = get_n_cpus() // get_n_jobs(n_jobs)
+    return max(thread_limit, 1)
+
+
+@contextmanager
+def limit_threads(
+    *, n_jobs: tp.Optional[int] = None, thread_limit: tp.Optional[int] = None
+) -> tp.Iterator[None]:
+    """This is used to run a CPU-bound section (e.g fitting the model): the BLAS/OpenMP
+    libraries use `get_thread_limit` threads. The sections of the other threads of
+    the process aren't blocked: if they overlap, the smallest limit is used (see
+    `_ThreadLimits`).
+
+    Params:
+    -------
+    n_jobs (int, default=None): See `get_n_jobs`.
+    thread_limit (int, default=None): The BLAS/OpenMP threads. If None, the
+        `THREAD_LIMIT` of the config is used (or the CPUs / n_jobs).
+
+    Returns:
+    --------
+    None
+    """
+    limits = get_thread_limit(n_jobs=n_jobs, thread_limit=thread_limit)
+    _thread_limits.add(limits)
+    try:
+        yield
+    finally:
+        _thread_limits.remove(limits)
+
+
+def get_model_n_jobs(estimator: tp.Any) -> int:
+    """This returns the number of workers of a model (the final step of a Pipeline).
+    A model without `n_jobs` (e.g HistGradientBoostingRegressor, which uses OpenMP
+    threads instead of workers) uses 1 worker, i.e. it gets all the threads."""
+    if hasattr(estimator, "steps"):
+        estimator = estimator.steps[-1][1]
+    n_jobs = estimator.get_params().get("n_jobs", 1)
+    return get_n_jobs(1 if n_jobs is None else n_jobs)
+
+
+def set_n_jobs(estimator: tp.Any, n_jobs: tp.Optional[int]) -> tp.Any:
+    """This sets the `n_jobs` of an estimator and of its steps (e.g a Pipeline) in place.
+
+    Params:
+    -------
+    estimator (Estimator): A Scikit-learn estimator.
+    n_jobs (int or None): The number of workers (see `get_n_jobs`).
+
+    Returns:
+    --------
+    estimator (Estimator): The estimator.
+    """
+    params = {
+        name: n_jobs
+        for name in estimator.get_params(deep=True)
+        if name == "n_jobs" or name.endswith("__n_jobs")
+    }
+    if params:
+        estimator.set_params(**params)
+    return estimator
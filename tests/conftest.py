@@ -21,21 +21,21 @@ from src.processing.data_manager import load_data
 @pytest.fixture()
 def test_data() -> pd.DataFrame:
     """This is used to load the test data."""
-    data = load_data(filename=config.path_config.TEST_DATA)
+    data = load_data(filename=config.path_config.TEST_DATA, columns=None)
     return data.iloc[:2_000]
 
 
 @pytest.fixture()
 def test_data_no_target() -> pd.DataFrame:
     """This is used to load the test data."""
-    data = load_data(filename=config.path_config.TEST_DATA_WF_NO_TARGET)
+    data = load_data(filename=config.path_config.TEST_DATA_WF_NO_TARGET, columns=None)
     return data
 
 
 @pytest.fixture()
 def train_data() -> pd.DataFrame:
     """This is used to load the train data."""
-    data = load_data(filename=config.path_config.TRAIN_DATA)
+    data = load_data(filename=config.path_config.TRAIN_DATA, columns=None)
     return data.sample(n=10_000, random_state=config.model_config.RANDOM_STATE)
 
 
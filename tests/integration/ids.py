@@ -0,0 +1,141 @@
+"""
+This module is used to generate the IDs of the trips (UUID strings) for all the
+rows at once instead of calling `uuid.uuid4()` for each row. It only depends on
+NumPy and Pandas so it's also used by the streaming service (the copies in
+`model_deployment/streaming` and `tests/integration` must be identical).
+
+author: Chinedu Ezeofor
+"""
+import os
+import typing as tp
+
+import numpy as np
+import pandas as pd
+
+ID_MODES = ("random", "hash")
+# Columns identifying a trip (the ones missing from the data are ignored)
+ID_COLUMNS = (
+    "VendorID",
+    "tpep_pickup_datetime",
+    "tpep_dropoff_datetime",
+    "lpep_pickup_datetime",
+    "lpep_dropoff_datetime",
+    "PULocationID",
+    "DOLocationID",
+    "trip_distance",
+    "total_amount",
+)
+# Seeds and (odd) multipliers of the two 64-bit hashes of the "hash" IDs
+HASH_SEEDS = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F], dtype=np.uint64)
+HASH_MULTIPLIERS = np.array([0xBF58476D1CE4E5B9, 0x94D049BB133111EB], dtype=np.uint64)
+CHUNK_ROWS = 100_000
+ARROW_CHUNK_ROWS = 10_000_000  # The offsets of the Arrow strings are int32
+# The 2 hex digits (ASCII) of each byte value
+HEX_PAIRS = np.array(
+    [ord(f"{byte:02x}"[0]) | ord(f"{byte:02x}"[1]) << 8 for byte in range(256)], dtype="<u2"
+)
+# (start, end, first hex digit) of each group of a UUID str
+# e.g. 12345678-1234-4234-8234-123456789abc
+GROUPS = ((0, 8, 0), (9, 13, 8), (14, 18, 12), (19, 23, 16), (24, 36, 20))
+
+
+def _uuid_chars(raw: np.ndarray, *, width: int) -> np.ndarray:
+    """This returns the ASCII characters of the UUID strs of the (n_rows, 16)
+    bytes. Each row has `width` (36 or 37) characters, the 37th is a line break."""
+    digits = HEX_PAIRS[raw].view(np.uint8)  # 32 hex digits per UUID
+    chars = np.full((len(raw), width), ord("-"), dtype=np.uint8)
+    chars[:, 36:] = ord("\n")
+    for start, end, digit in GROUPS:
+        chars[:, start:end] = digits[:, digit : digit + end - start]
+    return chars
+
+
+def _format_uuids(
+    raw: np.ndarray, *, version: int, arrow: bool = False
+) -> tp.Union[np.ndarray, pd.api.extensions.ExtensionArray]:
+    """This returns the (n_rows, 16) bytes as UUID strs. The version and
+    the (RFC 4122) variant bits are set in place."""
+    raw[:, 6] = (raw[:, 6] & 0x0F) | (version << 4)
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+
+    # In chunks so the temporary arrays are small (compared with the strs)
+    if not arrow:
+        ids = np.empty(len(raw), dtype=object)
+        for chunk_start in range(0, len(raw), CHUNK_ROWS):
+            chars = _uuid_chars(raw[chunk_start : chunk_start + CHUNK_ROWS], width=37)
+            ids[chunk_start : chunk_start + len(chars)] = (
+                chars.tobytes().decode("ascii").split("\n")[:-1]
+            )
+        return ids
+
+    # The characters are used as the data buffer of Arrow strings (no Python strs)
+    import pyarrow as pa  # pylint: disable=import-outside-toplevel
+
+    chars = np.empty((len(raw), 36), dtype=np.uint8)
+    for chunk_start in range(0, len(raw), CHUNK_ROWS):
+        chunk = raw[chunk_start : chunk_start + CHUNK_ROWS]
+        chars[chunk_start : chunk_start + len(chunk)] = _uuid_chars(chunk, width=36)
+    arrays = [
+        pa.StringArray.from_buffers(
+            len(chunk),
+            pa.py_buffer(np.arange(0, 36 * len(chunk) + 1, 36, dtype=np.int32)),
+            pa.py_buffer(chunk),
+        )
+        for chunk in np.array_split(chars, range(ARROW_CHUNK_ROWS, len(chars), ARROW_CHUNK_ROWS))
+    ]
+    return pd.arrays.ArrowStringArray(pa.chunked_array(arrays, type=pa.string()))
+
+
+def _hash_rows(data: pd.DataFrame, columns: tp.List[str]) -> np.ndarray:
+    """This returns 16 bytes (two 64-bit hashes) per row computed from the values
+    of the columns. The duplicated rows are numbered (in order) so they get
+    different bytes."""
+    hashes = np.empty((len(data), 2), dtype=np.uint64)
+    hashes[:] = HASH_SEEDS
+    for col in columns:
+        col_hash = pd.util.hash_pandas_object(data[col], index=False).to_numpy()
+        for idx, multiplier in enumerate(HASH_MULTIPLIERS):
+            hashes[:, idx] ^= col_hash
+            hashes[:, idx] *= multiplier
+
+    occurrence = pd.Series(hashes[:, 0]).groupby(hashes[:, 0], sort=False).cumcount().to_numpy()
+    is_repeated = occurrence > 0  # The IDs of the other rows don't depend on them
+    hashes[is_repeated] ^= pd.util.hash_array(occurrence[is_repeated])[:, None]
+    hashes ^= hashes >> np.uint64(29)
+    # Big-endian so the IDs don't depend on the platform
+    return hashes.astype(">u8").view(np.uint8).reshape(-1, 16)
+
+
+def generate_ids(
+    data: pd.DataFrame,
+    *,
+    mode: str = "random",
+    columns: tp.Optional[tp.Sequence[str]] = None,
+    arrow: bool = False,
+) -> tp.Union[np.ndarray, pd.api.extensions.ExtensionArray]:
+    """This returns an ID (UUID str) for each row of the data.
+
+    Params:
+    -------
+    data (Pandas DF): DF containing the data.
+    mode (str, default="random"): "random" for random (version 4) UUIDs or "hash"
+        for UUIDs computed from the content of the rows (version 8). The "hash"
+        IDs are the same when the same data is loaded again (e.g. a backfill).
+    columns (Sequence[str], default=None): The columns hashed in "hash" mode.
+        If None, the `ID_COLUMNS` found in the data are used.
+    arrow (bool, default=False): If True, the IDs are returned as Arrow strings
+        (`string[pyarrow]`, 36 bytes per ID) instead of Python strs. It requires pyarrow.
+
+    Returns:
+    --------
+    ids (np.ndarray or ArrowStringArray): The IDs (object array of strs
+        or Arrow strings).
+    """
+    if mode == "random":
+        raw = np.frombuffer(bytearray(os.urandom(16 * len(data))), dtype=np.uint8)
+        return _format_uuids(raw.reshape(-1, 16), version=4, arrow=arrow)
+    if mode == "hash":
+        if columns is None:
+            columns = [col for col in ID_COLUMNS if col in data.columns]
+        return _format_uuids(_hash_rows(data, list(columns)), version=8, arrow=arrow)
+    raise ValueError(f"Unsupported ID mode: {mode!r}. Use one of {ID_MODES}")
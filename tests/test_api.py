@@ -3,11 +3,20 @@ This module is used to test the API predictios.
 
 author: Chinedu Ezeofor
 """
+import io
+import typing as tp
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pytest
 from fastapi.testclient import TestClient
 
+from src.api import routes
+from src.api.routes import parse_json_body
+from src.api.codecs import PARQUET_MEDIA_TYPE, ARROW_STREAM_MEDIA_TYPE
 from src.api.config import settings
 from src.config.core import config
 
@@ -50,3 +59,141 @@ def test_make_api_prediction(client: TestClient, test_data: pd.DataFrame) -> Non
     assert prediction_data["trip_duration"]
     assert prediction_data["errors"] is None
     assert np.isclose(expected_output, prediction_data["trip_duration"], rtol=0.03).all()
+
+
+def test_make_api_prediction_arrow(client: TestClient, test_data: pd.DataFrame) -> None:
+    """This tests the predictions of Arrow IPC stream and Parquet bodies."""
+    # Given
+    test_data = test_data.iloc[:100][config.model_config.INPUT_FEATURES]
+    json_data = test_data.copy()
+    pickup_time = config.model_config.TEMPORAL_VAR
+    json_data[pickup_time] = json_data[pickup_time].astype(str)
+    payload = {"inputs": json_data.replace({np.nan: None}).to_dict(orient="records")}
+    expected_output = client.post("http://localhost:8001/api/v1/predict", json=payload).json()
+
+    table = pa.Table.from_pandas(test_data, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    parquet_file = io.BytesIO()
+    test_data.to_parquet(parquet_file, index=False)
+
+    # When
+    arrow_response = client.post(
+        "http://localhost:8001/api/v1/predict",
+        content=sink.getvalue().to_pybytes(),
+        headers={"Content-Type": ARROW_STREAM_MEDIA_TYPE, "Accept": ARROW_STREAM_MEDIA_TYPE},
+    )
+    arrow_result = pa.ipc.open_stream(arrow_response.content).read_all()
+    parquet_response = client.post(
+        "http://localhost:8001/api/v1/predict",
+        content=parquet_file.getvalue(),
+        headers={"Content-Type": PARQUET_MEDIA_TYPE},
+    )
+
+    # Then
+    assert arrow_response.status_code == 200
+    assert arrow_response.headers["content-type"] == ARROW_STREAM_MEDIA_TYPE
+    assert arrow_result.column("trip_duration").to_pylist() == expected_output["trip_duration"]
+    assert parquet_response.status_code == 200
+    assert parquet_response.json() == expected_output
+
+
+def test_make_api_prediction_invalid_body(client: TestClient) -> None:
+    """This tests the errors of the invalid request bodies."""
+    # When
+    invalid_json = client.post(
+        "http://localhost:8001/api/v1/predict",
+        content=b'{"inputs": [{"VendorID": "two"}]}',
+        headers={"Content-Type": "application/json"},
+    )
+    invalid_parquet = client.post(
+        "http://localhost:8001/api/v1/predict",
+        content=b"not a parquet file",
+        headers={"Content-Type": PARQUET_MEDIA_TYPE},
+    )
+    unsupported = client.post(
+        "http://localhost:8001/api/v1/predict",
+        content=b"VendorID\n2",
+        headers={"Content-Type": "text/csv"},
+    )
+
+    # Then
+    assert invalid_json.status_code == 422
+    assert invalid_json.json()["detail"][0]["loc"] == ["body", "inputs", 0, "VendorID"]
+    assert invalid_parquet.status_code == 400
+    assert unsupported.status_code == 415
+
+
+def test_make_api_prediction_columnar(client: TestClient, test_data: pd.DataFrame) -> None:
+    """This tests that the large JSON bodies (decoded straight into columns)
+    get the same predictions and errors as the small (micro-batched) ones."""
+    # Given
+    test_data = test_data.iloc[:100][config.model_config.INPUT_FEATURES]
+    pickup_time = config.model_config.TEMPORAL_VAR
+    test_data[pickup_time] = test_data[pickup_time].astype(str)
+    records = test_data.replace({np.nan: None}).to_dict(orient="records")
+    expected_output = [
+        client.post(
+            "http://localhost:8001/api/v1/predict", json={"inputs": records[idx : idx + 10]}
+        ).json()["trip_duration"]
+        for idx in range(0, len(records), 10)
+    ]
+    invalid_records = [*records[:70], {**records[70], "VendorID": "two"}, *records[71:]]
+
+    # When
+    response = client.post("http://localhost:8001/api/v1/predict", json={"inputs": records})
+    invalid_response = client.post(
+        "http://localhost:8001/api/v1/predict", json={"inputs": invalid_records}
+    )
+
+    # Then
+    assert response.status_code == 200
+    assert response.json()["trip_duration"] == sum(expected_output, [])
+    assert invalid_response.status_code == 422
+    assert invalid_response.json()["detail"] == [
+        {
+            "loc": ["body", "inputs", 70, "VendorID"],
+            "msg": "value is not a valid integer",
+            "type": "type_error.integer",
+        }
+    ]
+
+
+def test_api_responsive_while_parsing(
+    client: TestClient, test_data: pd.DataFrame, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """This tests that the large JSON bodies are parsed off the event loop, i.e.
+    the other endpoints still respond while a body is being parsed."""
+    # Given
+    test_data = test_data.iloc[: settings.PREDICT_MAX_BATCH_SIZE][
+        config.model_config.INPUT_FEATURES
+    ]
+    pickup_time = config.model_config.TEMPORAL_VAR
+    test_data[pickup_time] = test_data[pickup_time].astype(str)
+    payload = {"inputs": test_data.replace({np.nan: None}).to_dict(orient="records")}
+    parsing, home_responded = threading.Event(), threading.Event()
+    released = []
+
+    def slow_parse_json_body(body: bytes) -> tp.Any:
+        parsing.set()
+        released.append(home_responded.wait(timeout=5))  # Blocks until "/" responds
+        return parse_json_body(body)
+
+    monkeypatch.setattr(routes, "parse_json_body", slow_parse_json_body)
+
+    # When
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        prediction = executor.submit(
+            client.post, "http://localhost:8001/api/v1/predict", json=payload
+        )
+        assert parsing.wait(timeout=5)
+        home = client.get("http://localhost:8001/")
+        home_responded.set()
+        response = prediction.result()
+
+    # Then
+    assert home.status_code == 200
+    assert released == [True]
+    assert response.status_code == 200
+    assert len(response.json()["trip_duration"]) == len(test_data)
@@ -0,0 +1,137 @@
+"""
+This module is used to test the micro-batching of the prediction requests.
+
+author: Chinedu Ezeofor
+"""
+import typing as tp
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from src.api.batching import MicroBatcher
+from src.api.executor import InferenceExecutor
+
+
+class MockPredictor:
+    """Mock `make_predictions`. It returns the total_amount of each row and an
+    error for the rows with a negative total_amount."""
+
+    def __init__(self) -> None:
+        self.batch_sizes: tp.List[int] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, *, data: pd.DataFrame) -> tp.Dict:
+        with self._lock:
+            self.batch_sizes.append(len(data))
+        if (data["total_amount"] < 0).any():
+            errors = f"Invalid rows: {list(data.index[data['total_amount'] < 0])}"
+            return {"trip_duration": None, "model_version": "0.1.0", "errors": errors}
+        return {
+            "trip_duration": data["total_amount"].to_list(),
+            "model_version": "0.1.0",
+            "errors": None,
+        }
+
+
+def test_micro_batcher() -> None:
+    """This tests that the concurrent requests are merged and that
+    each request receives its own predictions."""
+    # Given
+    predictor = MockPredictor()
+    batcher = MicroBatcher(predict_fn=predictor, max_batch_size=64, max_delay_ms=50)
+    requests = [[{"total_amount": float(idx)}, {"total_amount": idx + 0.5}] for idx in range(20)]
+    expected_output = [[float(idx), idx + 0.5] for idx in range(20)]
+
+    # When
+    batcher.start()
+    with ThreadPoolExecutor(max_workers=20) as executor:
+        results = list(executor.map(batcher.predict, requests))
+    batcher.stop()
+    stats = batcher.stats.summary()
+
+    # Then
+    assert expected_output == [result["trip_duration"] for result in results]
+    assert len(predictor.batch_sizes) < len(requests)  # Some requests were merged
+    assert sum(predictor.batch_sizes) == 40
+    assert stats["n_requests"] == 20 and stats["n_rows"] == 40
+    assert stats["batch_size"]["max"] <= 64
+
+
+def test_micro_batcher_errors() -> None:
+    """This tests that the errors of a request are not sent to
+    the other requests of the batch."""
+    # Given
+    predictor = MockPredictor()
+    batcher = MicroBatcher(predict_fn=predictor, max_batch_size=64, max_delay_ms=200)
+    requests = [[{"total_amount": 1.0}], [{"total_amount": -1.0}], [{"total_amount": 2.0}]]
+
+    # When
+    batcher.start()
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        results = list(executor.map(batcher.predict, requests))
+    batcher.stop()
+
+    # Then
+    assert results[0]["trip_duration"] == [1.0] and results[0]["errors"] is None
+    assert results[1]["trip_duration"] is None and results[1]["errors"] == "Invalid rows: [0]"
+    assert results[2]["trip_duration"] == [2.0] and results[2]["errors"] is None
+
+
+def test_micro_batcher_not_running() -> None:
+    """This tests that the requests are predicted directly when the
+    batcher isn't running or when they're larger than the batch size."""
+    # Given
+    predictor = MockPredictor()
+    batcher = MicroBatcher(predict_fn=predictor, max_batch_size=2, max_delay_ms=5)
+
+    # When
+    result = batcher.predict([{"total_amount": 3.0}])
+    batcher.start()
+    large_result = batcher.predict([{"total_amount": 1.0}, {"total_amount": 2.0}])
+    batcher.stop()
+
+    # Then
+    assert result["trip_duration"] == [3.0]
+    assert large_result["trip_duration"] == [1.0, 2.0]
+    assert batcher.stats.n_batches == 0
+
+
+def test_micro_batcher_executor() -> None:
+    """This tests that the batches are predicted on the inference executor."""
+    # Given
+    thread_names = []
+
+    def predict_fn(*, data: pd.DataFrame) -> tp.Dict:
+        thread_names.append(threading.current_thread().name)
+        return {"trip_duration": data["total_amount"].to_list(), "errors": None}
+
+    executor = InferenceExecutor(max_workers=2, max_queue_size=2, timeout=5)
+    batcher = MicroBatcher(
+        predict_fn=predict_fn, max_batch_size=2, max_delay_ms=5, executor=executor
+    )
+
+    # When
+    batcher.start()
+    batched_result = batcher.predict([{"total_amount": 1.0}])
+    direct_result = batcher.predict([{"total_amount": 1.0}, {"total_amount": 2.0}])
+    batcher.stop()
+    executor.shutdown()
+
+    # Then
+    assert batched_result["trip_duration"] == [1.0]
+    assert direct_result["trip_duration"] == [1.0, 2.0]
+    assert all(name.startswith("inference") for name in thread_names)
+
+
+def test_batching_metrics(client: TestClient) -> None:
+    """This tests the API's batching metrics endpoint."""
+    # When
+    response = client.get("http://localhost:8001/api/v1/metrics/batching/")
+    result = response.json()
+
+    # Then
+    assert response.status_code == 200
+    assert result["enabled"] is True
+    assert {"n_batches", "n_requests", "batch_size", "queue_delay_ms"} <= set(result)
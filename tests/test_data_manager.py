@@ -5,20 +5,45 @@ and manipulating data.
 author: Chinedu Ezeofor
 """
 
+import os
+import json
+import typing as tp
+from pathlib import Path
+
+import fsspec
+import numpy as np
 import pandas as pd
 import pytest
+from pydantic import ValidationError
+from sklearn.preprocessing import StandardScaler
 
-from src.config.core import TRAINED_MODELS_FILEPATH, config
+from src.config.core import DATA_FILEPATH, TRAINED_MODELS_FILEPATH, config
+from src.config.schema import InputSchema, ValidateInputSchema
 
 # Custom Imports
+from src.processing import data_manager
+from src.processing.memory import memory_report
 from src.processing.data_manager import (
+    LOAD_COLUMNS,
+    iter_data,
     load_data,
     load_model,
-    get_unique_IDs,
+    read_shared_data,
+    materialize_data,
+    save_model,
     validate_input,
     split_train_data,
     validate_training_input,
     split_into_features_n_target,
+    remove_old_pipelines,
+    calculate_trip_duration,
+)
+from src.processing.cache import (
+    DatasetCache,
+    ModelRegistry,
+    RemoteFileCache,
+    TransformerCache,
+    get_data_digest,
 )
 
 
@@ -87,6 +112,92 @@ def test_validate_input(test_data: pd.DataFrame) -> None:
     assert error is None
 
 
+def test_validate_input_matches_pydantic(test_data: pd.DataFrame) -> None:
+    """This tests that the columnar validation returns the same DF as
+    validating one Pydantic object per row."""
+    # Given
+    test_data = test_data.iloc[:200].copy()
+    expected_output = pd.DataFrame(
+        data=ValidateInputSchema(inputs=test_data.replace({np.nan: None}).to_dict(orient="records"))
+        .dict()
+        .get("inputs")
+    )
+
+    # When
+    data, error = validate_input(data=test_data)
+
+    # Then
+    pd.testing.assert_frame_equal(expected_output, data)
+    assert error is None
+
+
+def test_validate_input_wf_error(test_data: pd.DataFrame) -> None:
+    """This tests that the errors have the same format as the Pydantic errors."""
+    # Given
+    test_data = test_data.iloc[:5].copy()
+    test_data["VendorID"] = test_data["VendorID"].astype(object)
+    test_data.loc[test_data.index[1], "VendorID"] = "vendor"
+    test_data.loc[test_data.index[3], "tpep_pickup_datetime"] = "tomorrow"
+    test_data.loc[test_data.index[3], "total_amount"] = "twelve"
+    with pytest.raises(ValidationError) as exc_info:
+        ValidateInputSchema(inputs=test_data.replace({np.nan: None}).to_dict(orient="records"))
+    expected_output = exc_info.value.json()
+
+    # When
+    data, error = validate_input(data=test_data)
+
+    # Then
+    assert data is None
+    assert expected_output == error
+
+
+def test_validate_input_error_parity(test_data: pd.DataFrame) -> None:
+    """This tests that the columnar validation rejects the same values as
+    validating one `InputSchema` object per row."""
+    # Given
+    bad_values = {
+        "payment_type": ["1.5", "one", float("inf")],
+        "tpep_pickup_datetime": ["02/01/2022 10:15", "Feb 1 2022", "2022-02-01", "nan"],
+        "total_amount": ["nan", "inf", "abc"],
+        "DOLocationID": [2**70],
+    }
+    row = test_data.iloc[0].replace({np.nan: None}).to_dict()
+    rows = [{**row, name: value} for name, values in bad_values.items() for value in values]
+    expected_output = []
+    for idx, row in enumerate(rows):
+        try:
+            InputSchema.parse_obj(row)
+        except ValidationError as err:
+            expected_output.extend((["inputs", idx, *e["loc"]], e["type"]) for e in err.errors())
+
+    # When
+    _, error = validate_input(data=pd.DataFrame(rows).astype(object))
+
+    # Then
+    assert expected_output == [(e["loc"], e["type"]) for e in json.loads(error)]
+
+
+def test_validate_input_value_parity(test_data: pd.DataFrame) -> None:
+    """This tests that the columnar validation returns the same values as
+    Pydantic, e.g. for "nan" floats, big integers and missing optional columns."""
+    # Given
+    test_data = test_data.iloc[:3].drop(columns=["VendorID"]).reset_index(drop=True)
+    test_data["total_amount"] = ["nan", "inf", "1.5"]
+    test_data["DOLocationID"] = [2**70, 1, 2]
+    expected_output = pd.DataFrame(
+        data=[InputSchema.parse_obj(row).dict() for row in test_data.to_dict(orient="records")]
+    )
+
+    # When
+    data, error = validate_input(data=test_data)
+
+    # Then
+    pd.testing.assert_frame_equal(expected_output, data)
+    assert data["DOLocationID"][0] == 2**70
+    assert data["VendorID"].isna().all() and data["VendorID"].dtype == object
+    assert error is None
+
+
 def test_validate_training_input(test_data: pd.DataFrame) -> None:
     """This tests the validation of training data."""
     # Given
@@ -137,17 +248,54 @@ def test_load_model() -> None:
     assert trained_model.named_steps
 
 
-def test_get_unique_IDs(test_data: pd.DataFrame) -> None:
-    """Docs"""
+def test_model_registry() -> None:
+    """This tests that the model is cached and reloaded only when the artifact changes."""
     # Given
-    test_data = test_data.iloc[:10].copy()
-    expected_output = 10
+    registry = ModelRegistry()
+    filename = config.path_config.TEST_MODEL_PATH
+    save_model(filename=filename, pipe=load_model(filename=config.path_config.MODEL_PATH))
+
+    # When
+    first_model = registry.get_model(filename=filename)
+    cached_model = registry.get_model(filename=filename)
+    save_model(filename=filename, pipe=first_model)  # Overwrite the artifact
+    # The same size and possibly the same mtime (coarse clocks): force a new mtime
+    stat = (TRAINED_MODELS_FILEPATH / filename).stat()
+    os.utime(TRAINED_MODELS_FILEPATH / filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    reloaded_model = registry.get_model(filename=filename)
+    remove_old_pipelines(files_to_remove=None)
+
+    # Then
+    assert first_model is cached_model
+    assert reloaded_model is not first_model
+    assert registry.get_version() == registry.get_version()
+
+
+def test_caches_reexported() -> None:
+    """This tests that the caches can still be imported from the data manager."""
+    # Then
+    assert data_manager.ModelRegistry is ModelRegistry
+    assert data_manager.model_registry is data_manager.cache.model_registry
+    assert data_manager.DatasetCache is DatasetCache
+    assert data_manager.dataset_cache is data_manager.cache.dataset_cache
+    assert data_manager.TransformerCache is TransformerCache
+    assert data_manager.transformer_cache is data_manager.cache.transformer_cache
+
+
+def test_model_registry_eviction() -> None:
+    """This tests that the least recently used models are evicted."""
+    # Given
+    registry = ModelRegistry(max_bytes=0)
+    filename = config.path_config.TEST_MODEL_PATH
+    save_model(filename=filename, pipe=load_model(filename=config.path_config.MODEL_PATH))
 
     # When
-    test_data["id"] = test_data["VendorID"].apply(get_unique_IDs)
+    registry.get_model(filename=config.path_config.MODEL_PATH)
+    registry.get_model(filename=filename)
+    remove_old_pipelines(files_to_remove=None)
 
     # Then
-    assert expected_output == len(test_data["id"])
+    assert 1 == len(registry._models)  # pylint: disable=protected-access
 
 
 def test_load_data() -> None:
@@ -164,6 +312,344 @@ def test_load_data() -> None:
     assert result.columns is not None
 
 
+def test_load_data_pushdown() -> None:
+    """This tests that the columns and the filters pushed down into the
+    Parquet reader return the same rows as filtering the full DF."""
+    # Given
+    filename = config.path_config.TEST_DATA
+    full_data = load_data(filename=filename, columns=None, filters=None)
+    is_valid = full_data["trip_distance"].between(0, 30, inclusive="right") & full_data[
+        "total_amount"
+    ].between(0, 100, inclusive="right")
+    columns = [*config.model_config.INPUT_FEATURES, "tpep_dropoff_datetime", "trip_duration"]
+    expected_output = full_data.loc[is_valid, columns].reset_index(drop=True)
+
+    # When
+    result = load_data(filename=filename, columns=LOAD_COLUMNS)
+
+    # Then
+    assert set(result.columns) == {*columns, "id"}
+    pd.testing.assert_frame_equal(result[columns].reset_index(drop=True), expected_output)
+
+
+def test_load_data_multiple_files() -> None:
+    """This tests that several files (a list or a glob pattern) are loaded
+    like the files loaded one after the other and concatenated."""
+    # Given
+    filenames = [config.path_config.TRAIN_DATA, config.path_config.TEST_DATA]
+    expected_output = pd.concat(
+        [load_data(filename=filename, id_mode="hash") for filename in filenames],
+        ignore_index=True,
+    )
+
+    # When
+    result = load_data(filename=filenames, id_mode="hash", max_workers=2)
+    glob_result = load_data(filename="yellow_tripdata_2022-0[12].parquet", id_mode="hash")
+
+    # Then
+    pd.testing.assert_frame_equal(result, expected_output)
+    pd.testing.assert_frame_equal(glob_result, expected_output)
+    with pytest.raises(FileNotFoundError, match="No files match"):
+        load_data(filename="yellow_tripdata_1999-*.parquet")
+
+
+def test_load_data_csv(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """This tests that a CSV file is returned as read (without IDs, trip_duration
+    or filtering) with its datetimes parsed."""
+    # Given
+    monkeypatch.setattr(
+        "src.processing.cache.dataset_cache", DatasetCache(cache_dir=tmp_path / "cache")
+    )
+    filename = config.path_config.TEST_DATA
+    csv_filename = str(tmp_path / "yellow_tripdata.csv")
+    pd.read_parquet(DATA_FILEPATH / filename).to_csv(csv_filename, index=False)
+    expected_output = pd.read_csv(csv_filename)
+    for col in ("tpep_pickup_datetime", "tpep_dropoff_datetime"):
+        expected_output[col] = pd.to_datetime(expected_output[col])
+
+    # When
+    result = load_data(filename=csv_filename, uri=True, id_mode="hash", use_cache=False)
+    load_data(filename=csv_filename, uri=True, use_cache=True)
+    cached_result = load_data(filename=csv_filename, uri=True, use_cache=True)
+
+    # Then
+    pd.testing.assert_frame_equal(result, expected_output)
+    pd.testing.assert_frame_equal(cached_result, expected_output)
+    with pytest.raises(FileNotFoundError):
+        load_data(filename=str(tmp_path / "missing.csv"), uri=True, use_cache=False)
+
+
+def test_calculate_trip_duration() -> None:
+    """This tests the trip duration (mins) including the missing timestamps."""
+    # Given
+    data = pd.DataFrame(
+        {
+            "tpep_pickup_datetime": pd.to_datetime(["2022-01-01 10:00", None, "2022-01-01 10:00"]),
+            "tpep_dropoff_datetime": pd.to_datetime(
+                ["2022-01-01 10:15:30", "2022-01-01 10:00", None]
+            ),
+        },
+        index=[3, 5, 7],
+    )
+    expected_output = pd.Series([15.5, np.nan, np.nan], index=[3, 5, 7])
+
+    # When
+    result = calculate_trip_duration(data)
+
+    # Then
+    pd.testing.assert_series_equal(result, expected_output, check_names=False)
+    with pytest.raises(KeyError):
+        calculate_trip_duration(data.drop(columns="tpep_pickup_datetime"))
+
+
+def test_iter_data() -> None:
+    """This tests that the batches contain the same preprocessed rows as `load_data`."""
+    # Given
+    filename = config.path_config.TEST_DATA
+    expected_output = load_data(filename=filename, id_mode="hash")
+
+    # When
+    batches = list(iter_data(filename=filename, batch_rows=30_000, id_mode="hash"))
+    result = pd.concat(batches)
+
+    # Then
+    assert len(batches) > 1
+    assert all(len(batch) <= 30_000 for batch in batches)
+    pd.testing.assert_frame_equal(
+        result.reset_index(drop=True), expected_output.reset_index(drop=True)
+    )
+
+
+def test_iter_data_files() -> None:
+    """This tests that the files are read one after the other."""
+    # Given
+    filenames = [config.path_config.TEST_DATA, config.path_config.TRAIN_DATA]
+    expected_output = pd.concat(
+        [load_data(filename=filename, id_mode="hash") for filename in filenames],
+        ignore_index=True,
+    )
+
+    # When
+    batches = list(iter_data(filename=filenames, batch_rows=100_000, id_mode="hash"))
+    result = pd.concat(batches, ignore_index=True)
+
+    # Then
+    assert len(batches) > len(filenames)
+    pd.testing.assert_frame_equal(result, expected_output)
+
+
+def test_load_data_compact() -> None:
+    """This tests that the compact layout keeps the rows and the IDs and
+    uses less memory."""
+    # Given
+    filename = config.path_config.TEST_DATA
+    expected_output = load_data(filename=filename, columns=LOAD_COLUMNS, id_mode="hash")
+
+    # When
+    result = load_data(filename=filename, columns=LOAD_COLUMNS, id_mode="hash", compact=True)
+
+    # Then
+    assert result["id"].dtype == "string[pyarrow]"
+    assert result["trip_duration"].dtype == np.float64
+    assert result["total_amount"].dtype == np.float32
+    assert pd.api.types.is_integer_dtype(result["PULocationID"].dtype)
+    assert result["PULocationID"].dtype.itemsize < 8
+    assert (result["id"].to_numpy(dtype=object) == expected_output["id"].to_numpy()).all()
+    pd.testing.assert_frame_equal(result, expected_output, check_dtype=False, rtol=1e-6)
+    assert memory_report(result)["memory (MB)"].sum() < (
+        memory_report(expected_output)["memory (MB)"].sum() / 1.5
+    )
+
+
+def test_dataset_cache(tmp_path: Path) -> None:
+    """This tests that a cached dataset is the same as the preprocessed data
+    and that the key depends on the preprocessing parameters."""
+    # Given
+    cache = DatasetCache(cache_dir=tmp_path, max_bytes=2**30)
+    filename = str(DATA_FILEPATH / config.path_config.TEST_DATA)
+    expected_output = load_data(filename=filename, uri=True, compact=True, use_cache=False)
+    key = cache.get_key(filename=filename, params={"compact": True})
+
+    # When
+    missing_output = cache.get(key=key)
+    cache.put(key=key, data=expected_output)
+    result = cache.get(key=key)
+
+    # Then
+    assert missing_output is None
+    assert key != cache.get_key(filename=filename, params={"compact": False})
+    pd.testing.assert_frame_equal(result, expected_output)
+
+
+def test_dataset_cache_eviction(tmp_path: Path, test_data: pd.DataFrame) -> None:
+    """This tests that the least recently used datasets are evicted."""
+    # Given
+    cache = DatasetCache(cache_dir=tmp_path, max_bytes=0)
+
+    # When
+    cache.put(key="old", data=test_data)
+    cache.put(key="new", data=test_data)
+
+    # Then
+    assert cache.get(key="old") is None
+    assert cache.get(key="new") is not None
+
+
+@pytest.mark.parametrize(
+    "filename",
+    [
+        config.path_config.TEST_DATA,
+        [config.path_config.TRAIN_DATA, config.path_config.TEST_DATA],
+    ],
+)
+def test_load_data_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, filename: tp.Any) -> None:
+    """This tests that the dataset cache is only used if asked and that the
+    "random" IDs of a cached dataset aren't reused."""
+    # Given
+    dataset_cache = DatasetCache(cache_dir=tmp_path)
+    monkeypatch.setattr("src.processing.cache.dataset_cache", dataset_cache)
+    expected_output = load_data(filename=filename, columns=LOAD_COLUMNS)
+    n_cached = len(list(tmp_path.iterdir()))
+
+    # When
+    result = load_data(filename=filename, columns=LOAD_COLUMNS, use_cache=True)
+    cached_result = load_data(filename=filename, columns=LOAD_COLUMNS, use_cache=True)
+    cached_hash_ids = [
+        load_data(filename=filename, columns=LOAD_COLUMNS, id_mode="hash", use_cache=True)["id"]
+        for _ in range(2)
+    ]
+
+    # Then
+    assert n_cached == 0
+    assert dataset_cache.total_bytes > 0
+    pd.testing.assert_frame_equal(
+        cached_result.drop(columns="id"), expected_output.drop(columns="id")
+    )
+    assert not result["id"].isin(cached_result["id"]).any()
+    assert cached_result["id"].str.len().eq(36).all()
+    pd.testing.assert_series_equal(*cached_hash_ids)
+
+
+def test_remote_file_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """This tests that a remote file (a memory filesystem standing in for S3) is
+    loaded like the local file, read again from the cache without downloading it
+    and downloaded again once it changes."""
+    # Given
+    remote_file_cache = RemoteFileCache(cache_dir=tmp_path, max_bytes=2**30, block_bytes=2**16)
+    monkeypatch.setattr("src.processing.cache.remote_file_cache", remote_file_cache)
+    fs = fsspec.filesystem("memory")
+    source = DATA_FILEPATH / config.path_config.TEST_DATA
+    fs.pipe("/nyc-tlc/yellow_tripdata.parquet", source.read_bytes())
+    filename = "memory://nyc-tlc/yellow_tripdata.parquet"
+    expected_output = load_data(
+        filename=source, uri=True, columns=LOAD_COLUMNS, id_mode="hash", use_cache=False
+    )
+
+    try:
+        # When
+        result = load_data(
+            filename=filename, uri=True, columns=LOAD_COLUMNS, id_mode="hash", use_cache=False
+        )
+        with monkeypatch.context() as patch:
+            patch.setattr(type(fs), "cat_file", lambda *args, **kwargs: pytest.fail())
+            cached_result = load_data(
+                filename=filename, uri=True, columns=LOAD_COLUMNS, id_mode="hash", use_cache=False
+            )
+        fs.pipe("/nyc-tlc/yellow_tripdata.parquet", source.read_bytes()[:-1])
+
+        # Then
+        pd.testing.assert_frame_equal(result, expected_output)
+        pd.testing.assert_frame_equal(cached_result, expected_output)
+        # Only the footer and the column chunks of the loaded columns are downloaded
+        assert 0 < remote_file_cache.total_bytes < source.stat().st_size
+        with pytest.raises(ValueError):
+            load_data(filename=filename, uri=True, use_cache=False)  # Not a Parquet file
+    finally:
+        fs.rm("/nyc-tlc", recursive=True)
+
+
+def test_remote_file_cache_eviction(tmp_path: Path) -> None:
+    """This tests that the least recently used blocks are evicted and that a
+    range spanning several blocks is read correctly."""
+    # Given
+    cache = RemoteFileCache(cache_dir=tmp_path, max_bytes=10, block_bytes=10)
+    fs = fsspec.filesystem("memory")
+    fs.pipe("/bucket/file.bin", bytes(range(100)))
+
+    try:
+        # When
+        with cache.open("memory://bucket/file.bin") as file:
+            file.seek(5)
+            result = file.read(20)
+            file.seek(-10, 2)
+            tail = file.read()
+
+        # Then
+        assert result == bytes(range(5, 25))
+        assert tail == bytes(range(90, 100))
+        assert cache.total_bytes == 10  # Only the last block is kept
+    finally:
+        fs.rm("/bucket", recursive=True)
+
+
+def test_get_data_digest(test_data: pd.DataFrame) -> None:
+    """This tests that the digest only depends on the content of the data."""
+    # Given
+    expected_output = get_data_digest(test_data)
+    changed_data = test_data.copy()
+    changed_data.iloc[0, 0] += 1
+
+    # Then
+    assert get_data_digest(test_data.copy()) == expected_output
+    assert get_data_digest(changed_data) != expected_output
+    assert get_data_digest(test_data.iloc[:, ::-1]) != expected_output
+    assert get_data_digest(test_data.reset_index(drop=True)) != expected_output
+    assert get_data_digest(test_data.astype({"id": "category"})) != expected_output
+    assert get_data_digest(test_data.to_numpy()) == get_data_digest(test_data.to_numpy())
+    assert get_data_digest(None) != get_data_digest(test_data.iloc[:, 0])
+
+
+def test_transformer_cache_eviction(tmp_path: Path, test_data: pd.DataFrame) -> None:
+    """This tests that a fitted transformer is loaded from the cache and that
+    the least recently used transformers are evicted."""
+    # Given
+    cache = TransformerCache(cache_dir=tmp_path, max_bytes=0)
+    fit_transform = cache.cache(
+        lambda transformer, X, y, weight: (transformer.fit_transform(X), transformer)
+    )
+    X = test_data[["trip_distance", "total_amount"]]
+    expected_output = StandardScaler(with_std=False).fit(X)
+
+    # When
+    fit_transform(StandardScaler(), X, None, None)
+    fit_transform(StandardScaler(with_std=False), X, None, None)
+    result, transformer = fit_transform(StandardScaler(with_std=False), X.copy(), None, None)
+
+    # Then
+    assert (cache.hits, cache.misses) == (1, 2)
+    np.testing.assert_array_equal(transformer.mean_, expected_output.mean_)
+    np.testing.assert_array_equal(result, expected_output.transform(X))
+    assert len(list(tmp_path.glob("*.joblib"))) == 1  # Only the newest transformer is kept
+
+
+def test_read_shared_data() -> None:
+    """This tests that the shared data has the same values as the loaded data
+    and that the columns without nulls are read-only views of the file."""
+    # Given
+    filename = config.path_config.TEST_DATA
+    expected_output = load_data(filename=filename, id_mode="hash", compact=True)
+
+    # When
+    filepath = materialize_data(filename=filename, id_mode="hash", compact=True)
+    result = read_shared_data(filepath)
+
+    # Then
+    pd.testing.assert_frame_equal(result, expected_output, check_dtype=False)
+    assert result["id"].dtype == "string[pyarrow]"
+    assert not result["trip_distance"].to_numpy().flags.writeable
+    assert result["RatecodeID"].to_numpy().flags.writeable  # Copied (nulls)
+
+
 def test_split_train_data(test_data: pd.DataFrame) -> None:
     """Docs"""
     # Given
@@ -0,0 +1,80 @@
+"""
+This module is used to test the executor used for the model inference.
+
+author: Chinedu Ezeofor
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.api.executor import ExecutorBusyError, InferenceExecutor, InferenceTimeoutError
+
+
+def test_inference_executor() -> None:
+    """This tests that the tasks run on the executor."""
+    # Given
+    executor = InferenceExecutor(max_workers=2, max_queue_size=2, timeout=5)
+
+    # When
+    result = asyncio.run(executor.run(threading.current_thread))
+    executor.shutdown()
+
+    # Then
+    assert result.name.startswith("inference")
+    assert executor.n_pending == 0
+
+
+def test_inference_executor_queue_limit() -> None:
+    """This tests that the tasks are rejected when the queue is full."""
+    # Given
+    executor = InferenceExecutor(max_workers=1, max_queue_size=1, timeout=5)
+    release = threading.Event()
+
+    # When
+    futures = [executor.submit(release.wait) for _ in range(2)]  # 1 running + 1 queued
+
+    # Then
+    with pytest.raises(ExecutorBusyError):
+        executor.submit(release.wait)
+    release.set()
+    executor.shutdown()
+    assert all(future.result() for future in futures)
+    assert executor.n_pending == 0
+
+
+def test_inference_executor_timeout() -> None:
+    """This tests the timeout of the tasks."""
+    # Given
+    executor = InferenceExecutor(max_workers=1, max_queue_size=1, timeout=0.05)
+    release = threading.Event()
+
+    # Then
+    with pytest.raises(InferenceTimeoutError):
+        asyncio.run(executor.run(release.wait))
+    release.set()
+    executor.shutdown()
+
+
+def test_inference_executor_concurrent_shutdown(monkeypatch: pytest.MonkeyPatch) -> None:
+    """This tests that a task can be submitted while the executor is shut down
+    by another thread, e.g. between starting the pool and submitting the task."""
+    # Given
+    executor = InferenceExecutor(max_workers=1, max_queue_size=1, timeout=5)
+    start = executor.start
+
+    def start_then_shutdown() -> None:
+        start()
+        threading.Thread(target=executor.shutdown).start()
+        time.sleep(0.05)
+
+    monkeypatch.setattr(executor, "start", start_then_shutdown)
+
+    # When
+    future = executor.submit(threading.current_thread)
+
+    # Then
+    assert future.result().name.startswith("inference")
+    executor.shutdown()
+    assert executor.n_pending == 0
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from feature_engine.transformation import YeoJohnsonTransformer
 
@@ -7,6 +8,8 @@ from src.processing.feat_engineering import (
     SelectFeatures,
     CalculateDayOfWeek,
     CalculateHourOfDay,
+    OrdinalEncodeFrequent,
+    CalculateTemporalFeatures,
 )
 
 
@@ -40,6 +43,41 @@ def test_hour_of_day_feature(test_data: pd.DataFrame) -> None:
     assert expected_output == result
 
 
+def test_temporal_features(test_data: pd.DataFrame) -> None:
+    """This tests that the combined temporal features are the same
+    as the DayOfWeek and the HourOfDay."""
+    # Given
+    data = test_data[["tpep_pickup_datetime"]].copy()
+    data.loc[data.index[:5], "tpep_pickup_datetime"] = pd.NaT
+    expected_output = CalculateHourOfDay(feature="tpep_pickup_datetime").fit_transform(
+        CalculateDayOfWeek(feature="tpep_pickup_datetime").fit_transform(data)
+    )
+    temporal_feats = CalculateTemporalFeatures(feature="tpep_pickup_datetime")
+
+    # When
+    result = temporal_feats.fit_transform(data)
+
+    # Then
+    pd.testing.assert_frame_equal(expected_output, result)
+    assert "day_of_week" not in data.columns  # The input DF is not modified
+
+
+def test_temporal_features_no_copy(test_data: pd.DataFrame) -> None:
+    """This tests the combined temporal features without copying the DF."""
+    # Given
+    data = test_data[["tpep_pickup_datetime"]].copy()
+    expected_output = data["tpep_pickup_datetime"].dt.dayofweek
+    temporal_feats = CalculateTemporalFeatures(feature="tpep_pickup_datetime", copy=False)
+
+    # When
+    result = temporal_feats.fit_transform(data)
+
+    # Then
+    assert result is data  # The features are added in place
+    assert expected_output.equals(data["day_of_week"])
+    assert np.issubdtype(data["hour_of_day"].dtype, np.integer)
+
+
 def test_select_input_feature(test_data: pd.DataFrame) -> None:
     """This tests the selection of features."""
     # Given
@@ -80,3 +118,21 @@ def test_yeo_johnson_transformer(test_data: pd.DataFrame) -> None:
 
     # Then
     assert expected_output == result
+
+
+def test_ordinal_encode_frequent() -> None:
+    """This tests that the most frequent categories get the smallest codes and
+    that the rare and the unknown categories are encoded as NaN."""
+    # Given
+    train = pd.DataFrame({"PULocationID": [7, 3, 3, 5, 7, 3, 9], "fare": range(7)})
+    test = pd.DataFrame({"PULocationID": [3, 7, 5, 9, 42], "fare": range(5)})
+    encoder = OrdinalEncodeFrequent(variables=["PULocationID"], max_categories=3)
+    expected_output = [0, 1, 2, np.nan, np.nan]  # 3, 7, then 5 (ties: smallest first)
+
+    # When
+    result = encoder.fit(train).transform(test)
+
+    # Then
+    np.testing.assert_array_equal(result["PULocationID"], expected_output)
+    assert test["PULocationID"].to_list() == [3, 7, 5, 9, 42]  # Not modified
+    assert result["fare"].to_list() == test["fare"].to_list()
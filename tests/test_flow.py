@@ -3,10 +3,26 @@ This module is used to test the workflow and deployments.
 
 author: Chinedu Ezeofor
 """
+from pathlib import Path
+
+import mlflow
+from prefect import get_client
+from prefect.utilities.asyncutils import sync_compatible
+from sklearn.model_selection import ParameterGrid
+
 from src.config.core import config
 
 # Custom Imports
-from src.orchestrate import run_flow
+from src.search import HalvingConfig
+from src.utilities.parallel import CPU_BOUND_TAG
+from src.orchestrate import run_flow, search_flow, ensure_concurrency_limit
+
+
+@sync_compatible
+async def read_concurrency_limit(tag: str) -> int:
+    """This returns the concurrency limit of a tag."""
+    async with get_client() as client:
+        return (await client.read_concurrency_limit_by_tag(tag)).concurrency_limit
 
 
 def test_flow_run() -> None:
@@ -22,3 +38,41 @@ def test_flow_run() -> None:
 
     # Then
     assert expected_output == result.get("status")
+
+
+def test_search_flow(tmp_path: Path) -> None:
+    """This is used to test the search_flow workflow (the trials are logged)."""
+    # Given
+    search_space = {"n_estimators": [2, 4], "max_depth": [2, 4]}
+    tracking_uri = tmp_path.as_uri()
+
+    # When
+    result = search_flow(
+        filename=config.path_config.TEST_DATA,
+        halving=HalvingConfig(search_space=search_space, n_workers=1),
+        tracking_uri=tracking_uri,
+    )
+    mlflow.set_tracking_uri(tracking_uri)
+    runs = mlflow.search_runs(
+        experiment_names=[config.model_config.EXPERIMENT_NAME], output_format="list"
+    )
+
+    # Then
+    assert result.get("status") == "success"
+    assert result.get("params") in list(ParameterGrid(search_space))
+    assert len(runs) >= len(ParameterGrid(search_space))
+    assert all("RMSE" in run.data.metrics for run in runs)
+
+
+def test_ensure_concurrency_limit() -> None:
+    """This tests that the concurrency limit is created once and not changed."""
+    # When
+    created = ensure_concurrency_limit(tag="test-cpu-bound", limit=2)
+    created_again = ensure_concurrency_limit(tag="test-cpu-bound", limit=1)
+    run_flow(filename=config.path_config.TEST_DATA, save_estimator=False)
+
+    # Then
+    assert created
+    assert not created_again
+    assert read_concurrency_limit("test-cpu-bound") == 2
+    assert read_concurrency_limit(CPU_BOUND_TAG) == 1
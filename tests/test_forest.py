@@ -0,0 +1,44 @@
+"""
+This module is used to test the flat-array Random Forest engine.
+
+author: Chinedu Ezeofor
+"""
+import numpy as np
+import pandas as pd
+
+# Custom imports
+from src import make_predictions
+from src.train import train_model
+from src.config.core import config
+from src.processing.forest import export_forest
+from src.processing.data_manager import split_into_features_n_target
+
+
+def test_export_forest(train_data: pd.DataFrame) -> None:
+    """This tests that the flat-array engine gives the same
+    predictions as the fitted Random Forest."""
+    # Given
+    pipe, *_ = train_model(train_data=train_data)
+    X, _ = split_into_features_n_target(data=train_data, target=config.model_config.TARGET)
+    features = pipe[:-1].transform(X)
+    expected_output = pipe[-1].predict(features)
+
+    # When
+    forest = export_forest(pipe)
+    result = forest.predict(features, batch_size=1_000)  # Use several batches
+
+    # Then
+    assert forest.n_trees == config.model_config.N_ESTIMATORS
+    assert np.array_equal(expected_output, result)
+
+
+def test_make_compiled_predictions(test_data: pd.DataFrame) -> None:
+    """This tests the predictions made with the flat-array engine."""
+    # Given
+    expected_output = make_predictions(data=test_data)
+
+    # When
+    result = make_predictions(data=test_data, compiled=True)
+
+    # Then
+    assert expected_output == result
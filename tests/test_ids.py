@@ -0,0 +1,78 @@
+"""
+This module is used to test the generation of the trip IDs.
+
+author: Chinedu Ezeofor
+"""
+import uuid
+import filecmp
+
+import pandas as pd
+import pytest
+
+# Custom imports
+from src.config.core import ROOT, SRC_ROOT
+from src.processing.ids import generate_ids
+
+
+def test_generate_random_ids(test_data: pd.DataFrame) -> None:
+    """This tests that the random IDs are unique version 4 UUIDs."""
+    # When
+    ids = generate_ids(test_data, mode="random")
+
+    # Then
+    assert len(ids) == len(test_data) == len(set(ids))
+    assert all(uuid.UUID(id_).version == 4 and str(uuid.UUID(id_)) == id_ for id_ in ids)
+
+
+def test_generate_hash_ids(test_data: pd.DataFrame) -> None:
+    """This tests that the hash IDs only depend on the content of the rows
+    and that the duplicated rows get different IDs."""
+    # Given
+    test_data = test_data.iloc[:100].reset_index(drop=True)
+    expected_output = generate_ids(test_data, mode="hash")
+
+    # When
+    shuffled_data = test_data.sample(frac=1, random_state=1)
+    shuffled_ids = generate_ids(shuffled_data, mode="hash")
+    duplicated_ids = generate_ids(pd.concat([test_data, test_data.iloc[:10]]), mode="hash")
+
+    # Then
+    assert len(set(expected_output)) == 100
+    assert all(uuid.UUID(id_).version == 8 for id_ in expected_output)
+    assert list(shuffled_ids) == list(expected_output[shuffled_data.index])
+    assert list(duplicated_ids[:100]) == list(expected_output)
+    assert len(set(duplicated_ids)) == 110
+
+
+def test_generate_arrow_ids(test_data: pd.DataFrame) -> None:
+    """This tests that the Arrow IDs are the same as the str IDs."""
+    # Given
+    expected_output = generate_ids(test_data, mode="hash")
+
+    # When
+    result = generate_ids(test_data, mode="hash", arrow=True)
+
+    # Then
+    assert pd.Series(result).dtype == "string[pyarrow]"
+    assert list(result) == list(expected_output)
+    assert len(generate_ids(test_data.iloc[:0], arrow=True)) == 0
+
+
+def test_generate_ids_unsupported_mode(test_data: pd.DataFrame) -> None:
+    """This tests the error raised for an unsupported mode."""
+    with pytest.raises(ValueError, match="Unsupported ID mode"):
+        generate_ids(test_data, mode="sequential")
+
+
+def test_ids_copies_are_identical() -> None:
+    """This tests that the copies used by the streaming service are up to date."""
+    # Given
+    filepath = SRC_ROOT / "processing/ids.py"
+    copies = [
+        ROOT / "model_deployment/streaming/ids.py",
+        ROOT / "tests/integration/ids.py",
+    ]
+
+    # Then
+    for copy in copies:
+        assert filecmp.cmp(filepath, copy, shallow=False)
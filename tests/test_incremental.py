@@ -0,0 +1,96 @@
+"""
+This module is used to test the out-of-core statistics of the preprocessing steps.
+
+author: Chinedu Ezeofor
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+from feature_engine.imputation import MeanMedianImputer
+from feature_engine.transformation import YeoJohnsonTransformer
+
+# Custom Imports
+from src.pipeline import build_pipeline
+from src.config.core import config
+from src.processing.feat_engineering import SelectFeatures
+from src.processing.incremental import Moments, ValueCounts, PreprocessingStats
+
+
+def test_moments() -> None:
+    """This tests that the merged moments are the moments of all the values."""
+    # Given
+    rng = np.random.default_rng(0)
+    values = rng.normal(1e6, 3, size=(1_000, 3))
+    values[::7, 1] = np.nan
+
+    # When
+    result = Moments(3).update(values[:100]).merge(Moments(3).update(values[100:]))
+
+    # Then
+    np.testing.assert_allclose(result.count, [1_000, 857, 1_000])
+    np.testing.assert_allclose(result.mean, np.nanmean(values, axis=0))
+    np.testing.assert_allclose(result.var, np.nanvar(values, axis=0))
+
+
+@pytest.mark.parametrize("values", [[3, 1, np.nan, 2, 2], [4, 1, 3, 2, 2, 1]])
+def test_value_counts_median(values: list) -> None:
+    """This tests that the median of the counts is the median of the values."""
+    # Given
+    values = pd.Series(values, dtype=np.float64)
+    expected_output = values.median()
+
+    # When
+    result = ValueCounts().update(values[:2]).merge(ValueCounts().update(values[2:])).median()
+
+    # Then
+    assert result == expected_output
+
+
+def test_preprocessing_stats(train_data: pd.DataFrame) -> None:
+    """This tests that the preprocessing steps fitted batch by batch are
+    the steps fitted on all the data (the lambdas are on a grid)."""
+    # Given
+    X = train_data.drop(columns=[config.model_config.TARGET])
+    expected_output = build_pipeline(estimator="random_forest")[:-1].fit(X)
+
+    # When
+    pipe = build_pipeline(estimator="random_forest")[:-1]
+    first_stats = PreprocessingStats(steps=pipe.steps)
+    other_stats = PreprocessingStats(steps=pipe.steps)
+    for start in range(0, len(X), 3_000):
+        (first_stats if start < 5_000 else other_stats).update(X.iloc[start : start + 3_000])
+    first_stats.merge(other_stats).fit_steps()
+    X_scaled = pipe[:-1].transform(X)
+
+    # Then
+    for step in ["add na_flag", "impute num_vars"]:
+        assert str(pipe[step].__dict__) == str(expected_output[step].__dict__)
+    expected_lambdas = expected_output.named_steps["YeoJohnson transformation"].lambda_dict_
+    for var, lambda_ in pipe.named_steps["YeoJohnson transformation"].lambda_dict_.items():
+        assert abs(expected_lambdas[var] - lambda_) < 0.05
+    scaler, expected_scaler = pipe.named_steps["scale data"], StandardScaler().fit(X_scaled)
+    np.testing.assert_allclose(scaler.mean_, expected_scaler.mean_)
+    np.testing.assert_allclose(scaler.var_, expected_scaler.var_)
+    assert scaler.n_samples_seen_ == len(X)
+
+
+def test_preprocessing_stats_unsupported_steps() -> None:
+    """This tests that the unsupported steps are rejected."""
+    # Given
+    steps = [
+        ("YeoJohnson transformation", YeoJohnsonTransformer()),
+        ("impute num_vars", MeanMedianImputer(imputation_method="median")),
+    ]
+
+    # Then
+    with pytest.raises(ValueError, match="order"):
+        PreprocessingStats(steps=steps)
+    with pytest.raises(ValueError, match="median"):
+        PreprocessingStats(steps=[("impute num_vars", MeanMedianImputer(imputation_method="mean"))])
+    with pytest.raises(ValueError, match="last step"):
+        PreprocessingStats(
+            steps=[("scale data", StandardScaler()), ("input vars", SelectFeatures(features=[]))]
+        )
+    with pytest.raises(ValueError, match="No data"):
+        PreprocessingStats(steps=steps[::-1]).fit_steps()
@@ -0,0 +1,90 @@
+"""
+This module is used to test the fused inference plan.
+
+author: Chinedu Ezeofor
+"""
+import filecmp
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer
+
+# Custom imports
+from src.train import train_model
+from src.pipeline import build_pipeline
+from src.config.core import ROOT, SRC_ROOT, config
+from src.processing.inference_plan import compile_pipeline
+from src.processing.data_manager import split_into_features_n_target
+
+
+def test_compile_pipeline(train_data: pd.DataFrame) -> None:
+    """This tests that the inference plan gives exactly the same
+    features and predictions as the fitted pipeline."""
+    # Given
+    pipe, *_ = train_model(train_data=train_data)
+    X, _ = split_into_features_n_target(data=train_data, target=config.model_config.TARGET)
+    X = X[config.model_config.INPUT_FEATURES].reset_index(drop=True)
+    X.loc[:10, "RatecodeID"] = np.nan  # Imputed values
+    expected_features = pipe[:-1].transform(X)
+    expected_output = pipe.predict(X)
+
+    # When
+    plan = compile_pipeline(pipe)
+    features = plan.transform(X)
+    result = plan.predict(X)
+
+    # Then
+    assert plan.input_features == config.model_config.INPUT_FEATURES
+    assert len(plan.feature_names) == expected_features.shape[1]
+    assert np.array_equal(expected_features, features)
+    assert np.array_equal(expected_output, result)
+
+
+def test_compile_pipeline_gradient_boosting(train_data: pd.DataFrame) -> None:
+    """This tests the inference plan of the gradient boosting pipeline
+    (encoded location IDs, no scaling)."""
+    # Given
+    X, y = split_into_features_n_target(data=train_data, target=config.model_config.TARGET)
+    X = X[config.model_config.INPUT_FEATURES].reset_index(drop=True)
+    pipe = build_pipeline(estimator="hist_gradient_boosting").fit(X, y.to_numpy())
+    X.loc[:10, "PULocationID"] = 999  # Unknown location
+    expected_features = pipe[:-1].transform(X).to_numpy(dtype=np.float64)
+    expected_output = pipe.predict(X)
+
+    # When
+    plan = compile_pipeline(pipe)
+    features = plan.transform(X)
+    result = plan.predict(X)
+
+    # Then
+    assert np.array_equal(expected_features, features, equal_nan=True)
+    assert np.array_equal(expected_output, result)
+
+
+def test_compile_pipeline_unsupported_step(train_data: pd.DataFrame) -> None:
+    """This tests that the unknown pipeline steps are rejected."""
+    # Given
+    pipe, *_ = train_model(train_data=train_data)
+    pipe = Pipeline(
+        steps=[*pipe.steps[:-1], ("unknown step", FunctionTransformer()), pipe.steps[-1]]
+    )
+
+    # Then
+    with pytest.raises(NotImplementedError):
+        compile_pipeline(pipe)
+
+
+def test_inference_plan_copies_are_identical() -> None:
+    """This tests that the copies used by the streaming service are up to date."""
+    # Given
+    filepath = SRC_ROOT / "processing/inference_plan.py"
+    copies = [
+        ROOT / "model_deployment/streaming/inference_plan.py",
+        ROOT / "tests/integration/inference_plan.py",
+    ]
+
+    # Then
+    for copy in copies:
+        assert filecmp.cmp(filepath, copy, shallow=False)
@@ -0,0 +1,94 @@
+"""
+This module is used to test the configuration of the parallelism.
+
+author: Chinedu Ezeofor
+"""
+import threading
+
+import pytest
+from sklearn.base import clone
+from threadpoolctl import threadpool_info
+
+# Custom Imports
+from src.pipeline import rf_pipe
+from src.config.core import config
+from src.utilities.parallel import (
+    get_n_jobs,
+    set_n_jobs,
+    limit_threads,
+    get_thread_limit,
+)
+
+
+@pytest.mark.parametrize(
+    "n_jobs, n_cpus, expected_output", [(-1, 8, 8), (-2, 8, 7), (4, 8, 4), (16, 8, 8), (0, 8, 1)]
+)
+def test_get_n_jobs(
+    monkeypatch: pytest.MonkeyPatch, n_jobs: int, n_cpus: int, expected_output: int
+) -> None:
+    """This tests the number of workers (joblib convention, at most the CPUs)."""
+    # Given
+    monkeypatch.setattr("src.utilities.parallel.get_n_cpus", lambda: n_cpus)
+
+    # When
+    result = get_n_jobs(n_jobs)
+
+    # Then
+    assert result == expected_output
+    assert get_thread_limit(n_jobs=n_jobs) == max(n_cpus // expected_output, 1)
+    assert get_thread_limit(n_jobs=n_jobs, thread_limit=2) == 2
+
+
+def test_limit_threads() -> None:
+    """This tests that the BLAS/OpenMP libraries are limited inside the section only."""
+    # Given
+    expected_output = 2
+    threads_before = [info["num_threads"] for info in threadpool_info()]
+
+    # When
+    with limit_threads(thread_limit=expected_output):
+        result = [info["num_threads"] for info in threadpool_info()]
+
+    # Then
+    assert result and all(num_threads == expected_output for num_threads in result)
+    assert [info["num_threads"] for info in threadpool_info()] == threads_before
+
+
+def test_limit_threads_concurrent() -> None:
+    """This tests that the sections of two threads run at the same time with the
+    smallest limit and that the original limits are restored when both are done."""
+    # Given
+    threads_before = [info["num_threads"] for info in threadpool_info()]
+    barrier = threading.Barrier(2, timeout=10)
+    results = {}
+
+    def run_section(thread_limit: int) -> None:
+        with limit_threads(thread_limit=thread_limit):
+            barrier.wait()  # Both sections are running
+            results[thread_limit] = [info["num_threads"] for info in threadpool_info()]
+            barrier.wait()
+
+    # When
+    threads = [threading.Thread(target=run_section, args=(limit,)) for limit in (1, 2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Then
+    assert sorted(results) == [1, 2]
+    assert all(num_threads == 1 for result in results.values() for num_threads in result)
+    assert [info["num_threads"] for info in threadpool_info()] == threads_before
+
+
+def test_set_n_jobs() -> None:
+    """This tests that the n_jobs of the steps of a pipeline are set."""
+    # Given
+    pipe = clone(rf_pipe)
+
+    # When
+    result = set_n_jobs(pipe, 1)
+
+    # Then
+    assert rf_pipe.get_params()["RF model__n_jobs"] == config.model_config.N_JOBS
+    assert result.get_params()["RF model__n_jobs"] == 1
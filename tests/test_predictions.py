@@ -8,6 +8,9 @@ import pandas as pd
 
 # Custom imports
 from src import make_predictions
+from src.config.core import config
+from src.processing.cache import model_registry
+from src.processing.data_manager import validate_input
 from src.utilities.experiment import eval_metrics
 
 
@@ -25,6 +28,23 @@ def test_make_predictions(test_data: pd.DataFrame) -> None:
     assert pred.get("errors") is None
 
 
+def test_make_predictions_rounding(test_data: pd.DataFrame) -> None:
+    """This tests that the predictions are rounded like `round(x, 1)` and that
+    the validated data gives the same predictions."""
+    # Given
+    validated_data, _ = validate_input(data=test_data.iloc[:100])
+    model = model_registry.get_model(filename=config.path_config.MODEL_PATH)
+    expected_output = [round(x, 1) for x in list(np.expm1(model.predict(validated_data)))]
+
+    # When
+    pred = make_predictions(data=test_data.iloc[:100])
+    validated_pred = make_predictions(data=validated_data, validated=True)
+
+    # Then
+    assert expected_output == pred["trip_duration"]
+    assert pred == validated_pred
+
+
 def test_evaluate_metrics() -> None:
     """This tests the function for calculating
     the evaluation metrics."""
@@ -0,0 +1,60 @@
+"""
+This module is used to test the hyperparameter search.
+
+author: Chinedu Ezeofor
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+# Custom Imports
+from src.config.core import config
+from src.search import HalvingConfig, run_search, fit_candidate, fit_preprocessing
+
+
+def test_fit_preprocessing(train_data: pd.DataFrame, tmp_path: Path) -> None:
+    """This tests that the preprocessed data is saved once for the candidates."""
+    # Given
+    n_validate = int(np.ceil(len(train_data) * config.model_config.TEST_SIZE))
+
+    # When
+    preprocessing = fit_preprocessing(train_data=train_data, data_dir=tmp_path)
+    result = fit_candidate(data_dir=tmp_path, params={"n_estimators": 2}, n_rows=1_000)
+
+    # Then
+    assert np.load(tmp_path / "X_train.npy").dtype == np.float32
+    assert len(np.load(tmp_path / "y_validate.npy")) == n_validate
+    assert preprocessing.steps[-1][0] == "scale data"
+    assert result["n_rows"] == 1_000
+    assert set(result["metrics"]) == {"RMSE", "MSE", "MAE", "R2", "fit_time"}
+
+
+def test_run_search(train_data: pd.DataFrame, tmp_path: Path) -> None:
+    """This tests the rounds of the successive halving."""
+    # Given
+    search_space = {"n_estimators": [2, 4], "max_depth": [2, 3, 4]}
+    fit_preprocessing(train_data=train_data, data_dir=tmp_path)
+    n_train = len(np.load(tmp_path / "y_train.npy"))
+
+    # When
+    trials, model = run_search(
+        data_dir=tmp_path,
+        halving=HalvingConfig(search_space=search_space, min_rows=1_000, factor=3, n_workers=2),
+    )
+    rounds = pd.DataFrame(
+        [{"round": trial["round"], "n_rows": trial["n_rows"]} for trial in trials]
+    )
+
+    # Then
+    assert rounds.groupby("round")["n_rows"].agg(["size", "first"]).to_dict("list") == {
+        "size": [6, 2, 1],
+        "first": [1_000, 3_000, n_train],
+    }
+    assert isinstance(model, RandomForestRegressor)
+    assert model.get_params() == {**model.get_params(), **trials[-1]["params"]}
+    assert model.n_jobs == config.model_config.N_JOBS
+    with pytest.raises(ValueError, match="factor"):
+        run_search(data_dir=tmp_path, halving=HalvingConfig(search_space=search_space, factor=1))
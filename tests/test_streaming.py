@@ -0,0 +1,102 @@
+"""
+This module is used to test the streaming (NDJSON) predictions.
+
+author: Chinedu Ezeofor
+"""
+import json
+import asyncio
+import typing as tp
+
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from src.api.config import settings
+from src.config.core import config
+from src.api.streaming import NDJSON_MEDIA_TYPE, score_chunk, iter_ndjson_chunks
+
+
+def mock_predict(*, data: pd.DataFrame) -> tp.Dict:
+    """Mock `make_predictions`. It returns the total_amount of each row and an
+    error for the rows with a negative total_amount."""
+    invalid_rows = np.flatnonzero(data["total_amount"] < 0).tolist()
+    if invalid_rows:
+        errors = [
+            {"loc": ["inputs", row, "total_amount"], "msg": "negative", "type": "value_error"}
+            for row in invalid_rows
+        ]
+        return {"trip_duration": None, "model_version": "0.1.0", "errors": json.dumps(errors)}
+    return {
+        "trip_duration": data["total_amount"].to_list(),
+        "model_version": "0.1.0",
+        "errors": None,
+    }
+
+
+def test_iter_ndjson_chunks() -> None:
+    """This tests that the lines split across the body messages are decoded."""
+    # Given
+    body = b'{"a": 1}\n{"a": 2}\n\n{"a": 3}\nnot json\n{"a": 5}'
+    messages = [body[idx : idx + 5] for idx in range(0, len(body), 5)]
+
+    async def stream() -> tp.AsyncIterator[bytes]:
+        for message in messages:
+            yield message
+
+    async def collect() -> tp.List[tp.List]:
+        return [chunk async for chunk in iter_ndjson_chunks(stream(), chunk_rows=2)]
+
+    # When
+    chunks = asyncio.run(collect())
+
+    # Then
+    assert chunks == [[{"a": 1}, {"a": 2}], [{"a": 3}, None], [{"a": 5}]]
+
+
+def test_score_chunk() -> None:
+    """This tests that the valid rows are scored and that the errors
+    contain the index of the row in the request."""
+    # Given
+    records = [{"total_amount": 1.0}, {"total_amount": -1.0}, None, {"total_amount": 2.0}]
+
+    # When
+    lines = score_chunk(records=records, offset=10, predict_fn=mock_predict).splitlines()
+    result = [json.loads(line) for line in lines]
+
+    # Then
+    assert result[0] == {"trip_duration": 1.0}
+    assert result[1]["trip_duration"] is None
+    assert result[1]["errors"][0]["loc"] == ["inputs", 11, "total_amount"]
+    assert result[2]["errors"][0]["loc"] == ["inputs", 12]
+    assert result[3] == {"trip_duration": 2.0}
+
+
+def test_make_api_stream_prediction(client: TestClient, test_data: pd.DataFrame) -> None:
+    """This tests the streaming predictions endpoint."""
+    # Given
+    test_data = test_data.iloc[:50][config.model_config.INPUT_FEATURES]
+    pickup_time = config.model_config.TEMPORAL_VAR
+    test_data[pickup_time] = test_data[pickup_time].astype(str)
+    records = test_data.replace({np.nan: None}).to_dict(orient="records")
+    expected_output = client.post(
+        "http://localhost:8001/api/v1/predict", json={"inputs": records}
+    ).json()
+    body = "".join(json.dumps(record) + "\n" for record in records) + "[]\n"
+    chunk_rows, settings.STREAM_CHUNK_ROWS = settings.STREAM_CHUNK_ROWS, 16
+
+    # When
+    try:
+        response = client.post(
+            "http://localhost:8001/api/v1/predict/stream",
+            content=body.encode(),
+            headers={"Content-Type": NDJSON_MEDIA_TYPE},
+        )
+    finally:
+        settings.STREAM_CHUNK_ROWS = chunk_rows
+    result = [json.loads(line) for line in response.iter_lines()]
+
+    # Then
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(NDJSON_MEDIA_TYPE)
+    assert [row["trip_duration"] for row in result[:-1]] == expected_output["trip_duration"]
+    assert result[-1]["trip_duration"] is None and result[-1]["errors"][0]["loc"] == ["inputs", 50]
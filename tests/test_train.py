@@ -3,8 +3,12 @@ This module is used to test the model training functions.
 
 author: Chinedu Ezeofor
 """
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
+import pytest
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
 from sklearn.preprocessing import StandardScaler
 from feature_engine.selection import DropFeatures
 
@@ -15,9 +19,18 @@ from feature_engine.transformation import YeoJohnsonTransformer
 import src.processing.feat_engineering as fe
 
 # Custom imports
-from src.train import train_model
+from src.train import train_model, train_model_incremental
+from src.pipeline import rf_pipe, build_pipeline
 from src.config.core import config
-from src.processing.data_manager import save_model, remove_old_pipelines
+from src.processing import cache
+from src.processing.cache import TransformerCache
+from src.processing.data_manager import (
+    LOAD_COLUMNS,
+    load_data,
+    load_model,
+    save_model,
+    remove_old_pipelines,
+)
 
 
 def test_train_model(train_data: pd.DataFrame) -> None:
@@ -85,12 +98,14 @@ def test_train_pipeline(train_data: pd.DataFrame) -> None:
                 "tpep_pickup_datetime",
                 "trip_distance",
                 "VendorID",
-            ]
+            ],
+            copy=False,
         ),
         "add na_flag": AddMissingIndicator(variables=["RatecodeID"]),
         "impute num_vars": MeanMedianImputer(variables=["RatecodeID"]),
-        "cal day_of_week": fe.CalculateDayOfWeek(feature="tpep_pickup_datetime"),
-        "cal hour_of_day": fe.CalculateHourOfDay(feature="tpep_pickup_datetime"),
+        "cal temporal features": fe.CalculateTemporalFeatures(
+            feature="tpep_pickup_datetime", copy=False
+        ),
         "important vars": fe.SelectFeatures(
             features=[
                 "day_of_week",
@@ -104,16 +119,15 @@ def test_train_pipeline(train_data: pd.DataFrame) -> None:
                 "tpep_pickup_datetime",
                 "trip_distance",
                 "VendorID",
-            ]
+            ],
+            copy=False,
         ),
         "drop features": DropFeatures(features_to_drop=["tpep_pickup_datetime"]),
         "YeoJohnson transformation": YeoJohnsonTransformer(
             variables=["trip_distance", "total_amount"]
         ),
         "scale data": StandardScaler(),
-        "RF model": RandomForestRegressor(
-            max_depth=10, n_estimators=10, random_state=123
-        ),
+        "RF model": RandomForestRegressor(max_depth=10, n_estimators=10, random_state=123),
     }
 
     # When
@@ -124,3 +138,100 @@ def test_train_pipeline(train_data: pd.DataFrame) -> None:
     assert str(expected_output.get("drop features")) == str(result.get("drop features"))
     assert str(expected_output.get("input vars")) == str(result.get("input vars"))
     assert set(expected_features) == set(expected_output.get("input vars").features)
+
+
+def test_build_pipeline(train_data: pd.DataFrame) -> None:
+    """This tests that the factory returns new pipelines of the selected model."""
+    # Given
+    X = train_data.drop(columns=[config.model_config.TARGET])
+    y = train_data[config.model_config.TARGET]
+
+    # When
+    pipe = build_pipeline(estimator="hist_gradient_boosting").fit(X, y)
+    rf_result = build_pipeline(estimator="random_forest", model_params={"max_depth": 3})
+
+    # Then
+    model, rf_model = pipe.steps[-1][1], rf_result.steps[-1][1]
+    assert isinstance(model, HistGradientBoostingRegressor)
+    assert model.is_categorical_.sum() == len(config.model_config.HGB_CATEGORICAL_VARS)
+    assert model.n_iter_ <= config.model_config.HGB_MAX_ITER
+    assert isinstance(rf_model, RandomForestRegressor)
+    assert rf_model.max_depth == 3
+    assert rf_result is not build_pipeline(estimator="random_forest")
+    assert rf_pipe.steps[-1][1].max_depth == config.model_config.MAX_DEPTH  # Not modified
+    assert rf_pipe.memory is None  # Not cached by default
+    with pytest.raises(ValueError, match="Unsupported estimator"):
+        build_pipeline(estimator="linear")
+
+
+def test_build_pipeline_cache(
+    train_data: pd.DataFrame, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """This tests that the fitted preprocessing steps are loaded from the cache when
+    only the model hyperparameters change and that the cache isn't saved with the model."""
+    # Given
+    monkeypatch.setattr(cache, "transformer_cache", TransformerCache(cache_dir=tmp_path))
+    X = train_data.drop(columns=[config.model_config.TARGET])
+    y = train_data[config.model_config.TARGET]
+    expected_output = build_pipeline().fit(X, y)
+    n_transformers = len(expected_output) - 1
+
+    # When
+    build_pipeline(use_cache=True).fit(X, y)
+    n_misses = cache.transformer_cache.misses
+    result = build_pipeline(model_params={"max_depth": 3}, use_cache=True).fit(X, y)
+    save_model(filename=config.path_config.TEST_MODEL_PATH, pipe=result)
+    saved_result = load_model(filename=config.path_config.TEST_MODEL_PATH)
+    remove_old_pipelines(files_to_remove=None)
+    build_pipeline(use_cache=True).fit(X.iloc[:5_000], y.iloc[:5_000])
+
+    # Then
+    assert n_misses == n_transformers
+    assert cache.transformer_cache.hits == n_transformers
+    assert cache.transformer_cache.misses == 2 * n_transformers
+    assert result.steps[-1][1].max_depth == 3
+    np.testing.assert_array_equal(result[:-1].transform(X), expected_output[:-1].transform(X))
+    assert saved_result.memory is None
+    assert result.memory is cache.transformer_cache
+    assert expected_output.memory is None
+
+
+def test_train_model_cache_reloaded_data(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """This tests that retraining on the same file loaded again (i.e. with other
+    random IDs) reuses the fitted preprocessing steps."""
+    # Given
+    monkeypatch.setattr(cache, "transformer_cache", TransformerCache(cache_dir=tmp_path))
+    train_data = load_data(filename=config.path_config.TEST_DATA, columns=LOAD_COLUMNS)
+    train_model(train_data=train_data, use_cache=True)
+    n_misses = cache.transformer_cache.misses
+
+    # When
+    reloaded_data = load_data(filename=config.path_config.TEST_DATA, columns=LOAD_COLUMNS)
+    pipe, *_ = train_model(train_data=reloaded_data, use_cache=True)
+
+    # Then
+    assert not train_data["id"].isin(reloaded_data["id"]).any()
+    assert cache.transformer_cache.misses == n_misses == len(pipe) - 1
+    assert cache.transformer_cache.hits == len(pipe) - 1
+
+
+def test_train_model_incremental() -> None:
+    """This tests that the trees are added per chunk of the files and that
+    the pipeline can be saved."""
+    # Given
+    filenames = [config.path_config.TRAIN_DATA, config.path_config.TEST_DATA]
+    n_rows = sum(len(load_data(filename=filename)) for filename in filenames)
+
+    # When
+    pipe, y_validate, y_pred = train_model_incremental(
+        filename=filenames, batch_rows=50_000, chunk_rows=150_000
+    )
+    save_model(filename=config.path_config.TEST_MODEL_PATH, pipe=pipe)
+    remove_old_pipelines(files_to_remove=None)
+
+    # Then
+    assert len(pipe.steps[-1][1].estimators_) == config.model_config.N_ESTIMATORS
+    assert not pipe.steps[-1][1].warm_start
+    assert len(y_validate) == len(y_pred)
+    assert len(y_validate) / n_rows == pytest.approx(config.model_config.TEST_SIZE, abs=1e-3)
+    assert ((y_pred > 0) & (y_pred < y_validate.max())).all()